@@ -1,26 +1,54 @@
-import pandas as pd
-import numpy as np
+import os
+import time
+
 import streamlit as st
-import sqlite3
 from datetime import datetime as dt
-import hashlib
-from google import genai
+
+from krenova_core import metrics
+from krenova_core.metrics import timer
+from krenova_core.startup import PHASES, mark, phase
+
+# Hanya yang dipakai halaman publik (login & skrining satu anak); modul admin, analitik & grid
+# diimport di cabang halamannya sehingga pengunjung tidak ikut membayar waktu import-nya
+with phase('import krenova_core'):
+    from krenova_core import (
+        age_in_months, get_child_history, get_measurement_by_id, init_database, save_measurement,
+        score_measurement, target_gap_table, verify_login,
+    )
+    from krenova_core import admission
+    from krenova_core.assets import asset_bytes, build_assets, picture_html, supported_formats
+    from krenova_core.plausibility import flag_labels
+    from krenova_core.status import local_explanation
 
 # ========= INTEGRASI GEMINI AI
 ### ======= KONFIGURASI AI
-try:
-    client = genai.Client(api_key=st.secrets["GEMINI_API_KEY"])
-except Exception as e:
-    st.error(f"Opps Konfigurasi AI gagal: {e}")
-    st.error(f"Silahkan lakukan pendampingan hasil screening dengan pihak medis atau bidan")
-    client = None
+# Klien (dan modul google.genai yang berat) baru dibuat saat analisis pertama, sekali per proses
+@st.cache_resource
+def get_ai_client():
+    # Uji beban (krenova loadtest): klien tiruan lokal, tanpa kuota Gemini
+    if os.environ.get('KRENOVA_AI_STUB') is not None:
+        from krenova_core.loadtest import StubClient
+        return StubClient.from_spec(os.environ['KRENOVA_AI_STUB'])
+    with phase('import google.genai'):
+        from google import genai
+    return genai.Client(api_key=st.secrets["GEMINI_API_KEY"])
 
 ### ======= FUNGSI ANALISIS AI
+@st.cache_data
 def load_prompt(path='prompt.txt'):
     with open(path, "r", encoding="utf-8") as f:
         return f.read()
     
+@metrics.timed('ai.get_ai_analysis')
 def get_ai_analysis(data_anak, status_z):
+    try:
+        client = get_ai_client()
+    except Exception as e:
+        metrics.count('ai_failures_total', reason='konfigurasi')
+        st.error(f"Opps Konfigurasi AI gagal: {e}")
+        st.error(f"Silahkan lakukan pendampingan hasil screening dengan pihak medis atau bidan")
+        return f"Oops. Gagal mendapatkan saran Gemini: {str(e)}"
+
     template = load_prompt()
 
     prompt = template.format(
@@ -38,149 +66,66 @@ def get_ai_analysis(data_anak, status_z):
     )
     
     try:
-        response = client.models.generate_content(
+        # Lewat antrean AI terbatas; saat penuh/terlalu lama dipakai penjelasan lokal (admission.py)
+        response, served = admission.run_ai(
+            client.models.generate_content,
             model="gemini-2.5-flash",
             contents=prompt
         )
+        if not served:
+            return local_explanation(data_anak, status_z)
         return response.text
     except Exception as e:
+        metrics.count('ai_failures_total', reason='permintaan')
         return f"Oops. Gagal mendapatkan saran Gemini: {str(e)}"
 
 
-# ========= DATABASE SETUP
-def init_database():
-    conn = sqlite3.connect('krenova_data.db')
-    c = conn.cursor()
-    
-    # Tabel Users
-    c.execute('''CREATE TABLE IF NOT EXISTS users
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  username TEXT UNIQUE NOT NULL,
-                  password TEXT NOT NULL,
-                  role TEXT NOT NULL,
-                  nama_lengkap TEXT)''')
-    
-    # Tabel Measurements
-    c.execute('''CREATE TABLE IF NOT EXISTS measurements
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  tanggal_pengukuran DATE,
-                  nama_anak TEXT,
-                  usia_bulan INTEGER,
-                  gender TEXT,
-                  alamat TEXT,
-                  berat_badan REAL,
-                  tinggi_badan REAL,
-                  lingkar_kepala REAL,
-                  wfa_zscore REAL,
-                  wfa_status TEXT,
-                  hfa_zscore REAL,
-                  hfa_status TEXT,
-                  wfh_zscore REAL,
-                  wfh_status TEXT,
-                  hcfa_zscore REAL,
-                  hcfa_status TEXT,
-                  risiko_stunting_persen INTEGER,
-                  status_stunting TEXT,
-                  created_by TEXT,
-                  tanggal_lahir DATE,
-                  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
-
-    # Migration for existing tables
+# Pengunjung publik dibatasi laju simpannya (per sesi & global, lihat krenova_core/admission.py);
+# kader yang login tidak. Mengembalikan 0 jika diterima, atau detik tunggu
+def admit_public_submit():
+    if st.session_state.logged_in:
+        return 0
+    if 'submit_bucket' not in st.session_state:
+        st.session_state.submit_bucket = admission.session_bucket()
+    admitted, retry_after, _ = admission.admit_submit(st.session_state.submit_bucket)
+    return 0 if admitted else max(1, round(retry_after))
+
+# Initialize database (sekali per proses, bukan setiap rerun)
+@st.cache_resource
+def init_app():
+    with phase('init_database'):
+        init_database()
+    # Varian AVIF/WebP header & foto profil (hanya dibuat ulang jika PNG sumber berubah)
+    with phase('build_assets'):
+        build_assets()
+    # Backup online terjadwal jika folder backup diatur (lihat krenova_core/archive.py)
+    if os.environ.get('KRENOVA_BACKUP_DIR'):
+        from krenova_core.archive import start_backup_scheduler
+        start_backup_scheduler(os.environ['KRENOVA_BACKUP_DIR'],
+                               interval_hours=float(os.environ.get('KRENOVA_BACKUP_INTERVAL', 24)))
+    # Cermin analitik Parquet diperbarui berkala jika intervalnya diatur (lihat krenova_core/mirror.py)
+    if os.environ.get('KRENOVA_MIRROR_INTERVAL'):
+        from krenova_core.mirror import start_mirror_scheduler
+        start_mirror_scheduler(interval_minutes=float(os.environ['KRENOVA_MIRROR_INTERVAL']))
+
+init_app()
+
+@st.cache_resource
+def static_formats():
+    # Handler static Streamlit versi tornado mengirim .avif sebagai text/plain + nosniff (ditolak browser)
     try:
-        c.execute("SELECT tanggal_lahir FROM measurements LIMIT 1")
-    except sqlite3.OperationalError:
-        c.execute("ALTER TABLE measurements ADD COLUMN tanggal_lahir DATE")
-
-    
-    # Insert default admin jika belum ada
-    c.execute("SELECT * FROM users WHERE username='tumbuh'")
-    if not c.fetchone():
-        admin_pass = hashlib.sha256('12345'.encode()).hexdigest()
-        c.execute("INSERT INTO users (username, password, role, nama_lengkap) VALUES (?, ?, ?, ?)",
-                  ('tumbuh', admin_pass, 'admin', 'Administrator'))
-    
-    # Insert default user jika belum ada
-    c.execute("SELECT * FROM users WHERE username='user'")
-    if not c.fetchone():
-        user_pass = hashlib.sha256('user123'.encode()).hexdigest()
-        c.execute("INSERT INTO users (username, password, role, nama_lengkap) VALUES (?, ?, ?, ?)",
-                  ('user', user_pass, 'user', 'User Biasa'))
-    
-    conn.commit()
-    conn.close()
-
-# ========= AUTHENTICATION FUNCTIONS
-def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
-
-def verify_login(username, password):
-    conn = sqlite3.connect('krenova_data.db')
-    c = conn.cursor()
-    hashed_pw = hash_password(password)
-    c.execute("SELECT * FROM users WHERE username=? AND password=?", (username, hashed_pw))
-    user = c.fetchone()
-    conn.close()
-    return user
-
-def save_measurement(data, z_scores, statuses, risk, status_stunting, username):
-    conn = sqlite3.connect('krenova_data.db')
-    c = conn.cursor()
-    c.execute('''INSERT INTO measurements 
-                 (tanggal_pengukuran, nama_anak, usia_bulan, gender, alamat, berat_badan, tinggi_badan, 
-                  lingkar_kepala, wfa_zscore, wfa_status, hfa_zscore, hfa_status, wfh_zscore, 
-                  wfh_status, hcfa_zscore, hcfa_status, risiko_stunting_persen, status_stunting, created_by, tanggal_lahir)
-
-                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-              (data['date'], data['name'], data['age'], data['sex'], data['alamat'], data['weight'], data['height'],
-               data['hc'], z_scores['wfa'], statuses['wfa'], z_scores['hfa'], statuses['hfa'],
-               z_scores['wfh'], statuses['wfh'], z_scores['hcfa'], statuses['hcfa'],
-               risk, status_stunting, username, data.get('birth_date')))
-
-    conn.commit()
-    conn.close()
-
-def get_all_measurements():
-    conn = sqlite3.connect('krenova_data.db')
-    df = pd.read_sql_query("SELECT * FROM measurements ORDER BY created_at DESC", conn)
-    conn.close()
-    return df
-
-def update_measurement(record_id, data, z_scores, statuses, risk, status_stunting):
-    conn = sqlite3.connect('krenova_data.db')
-    c = conn.cursor()
-    c.execute('''UPDATE measurements 
-                 SET tanggal_pengukuran=?, nama_anak=?, usia_bulan=?, gender=?, alamat=?, 
-                     berat_badan=?, tinggi_badan=?, lingkar_kepala=?,
-                     wfa_zscore=?, wfa_status=?, hfa_zscore=?, hfa_status=?, 
-                     wfh_zscore=?, wfh_status=?, hcfa_zscore=?, hcfa_status=?,
-                     risiko_stunting_persen=?, status_stunting=?, tanggal_lahir=?
-                 WHERE id=?''',
-              (data['date'], data['name'], data['age'], data['sex'], data['alamat'], 
-               data['weight'], data['height'], data['hc'],
-               z_scores['wfa'], statuses['wfa'], z_scores['hfa'], statuses['hfa'],
-               z_scores['wfh'], statuses['wfh'], z_scores['hcfa'], statuses['hcfa'],
-               risk, status_stunting, data.get('birth_date'), record_id))
-
-    conn.commit()
-    conn.close()
-
-def delete_measurement(record_id):
-    conn = sqlite3.connect('krenova_data.db')
-    c = conn.cursor()
-    c.execute('DELETE FROM measurements WHERE id=?', (record_id,))
-    conn.commit()
-    conn.close()
-
-def get_measurement_by_id(record_id):
-    conn = sqlite3.connect('krenova_data.db')
-    c = conn.cursor()
-    c.execute('SELECT * FROM measurements WHERE id=?', (record_id,))
-    result = c.fetchone()
-    conn.close()
-    return result
-
-# Initialize database
-init_database()
+        from streamlit.web.server.app_static_file_handler import SAFE_APP_STATIC_FILE_EXTENSIONS
+    except ImportError:
+        return supported_formats()
+    return [fmt for fmt in supported_formats() if f'.{fmt}' in SAFE_APP_STATIC_FILE_EXTENSIONS]
+
+def show_asset(name, alt, lazy=False):
+    # Static serving: file di-cache browser (URL ?v=hash), kunjungan berikutnya tanpa unduh ulang.
+    # Tanpa static serving: byte WebP dari cache memori, tetap jauh lebih kecil dari PNG asli
+    if st.get_option('server.enableStaticServing'):
+        st.markdown(picture_html(name, alt, lazy=lazy, formats=static_formats()), unsafe_allow_html=True)
+    else:
+        st.image(asset_bytes(name), use_container_width=True)
 
 # ========= SESSION STATE
 if 'logged_in' not in st.session_state:
@@ -198,152 +143,6 @@ if 'edit_record_id' not in st.session_state:
 if 'delete_confirm_id' not in st.session_state:
     st.session_state.delete_confirm_id = None
 
-# ========= BACA DATA
-wfa = pd.read_csv("wfa-all.csv")
-hfa = pd.read_csv("lhfa-all.csv")
-wfh = pd.read_csv("wfh-all.csv")
-hcfa = pd.read_csv("hcfa-all.csv")
-
-# ========== FUNGSI Z-Score
-def who_zscore(x, L, M, S):
-    if L == 0:
-        return np.log(x/M)/S
-    return ((x / M) ** L - 1) / (L * S)
-
-# ========== FUNGSI INDIKATOR
-## BB Terhadap Usia
-def calc_wfa(age, sex, weight):
-    ref = wfa[
-        (wfa['Usia'] == age) &
-        (wfa['Gender'] == sex)
-    ]
-    if ref.empty:
-        return None
-
-    L, M, S = ref[["L", "M", "S"]].values[0]
-    return who_zscore(weight, L, M, S)
-
-## TB Terhadap Usia
-def calc_hfa(age, sex, height):
-    ref = hfa[
-        (hfa['Usia'] == age) &
-        (hfa['Gender'] == sex)
-        ]
-    if ref.empty:
-        return None
-
-    L, M, S = ref[["L", "M", "S"]].values[0]
-    return who_zscore(height, L, M, S)
-
-## BB Terhadap Panjang/Tinggi Badan
-def calc_wfh(age, sex, weight, body_cm):
-    # Tentukan tipe pengukuran berdasarkan usia
-    m_type = "Length" if age < 24 else "Height"
-
-    rounded_height = round(body_cm * 2) / 2  # Pembulatan ke 0.5 terdekat
-
-    # Filter data WHO sesuai kolom dataset kamu
-    ref = wfh[
-        (wfh["Gender"] == sex) &
-        (wfh["Pengukuran"] == m_type) &
-        (wfh["Tinggi"] == rounded_height)
-    ]
-
-    if ref.empty:
-        return None
-
-    L, M, S = ref[["L", "M", "S"]].values[0]
-    return who_zscore(weight, L, M, S)
-
-## LK Berdasarkan Usia
-def calc_hcfa(age, sex, hc):
-    ref = hcfa[
-        (hcfa['Usia'] == age) &
-        (hcfa['Gender'] == sex)
-    ]
-    if ref.empty:
-        return None
-    L, M, S = ref[["L", "M", "S"]].values[0]
-    return who_zscore(hc, L, M, S)
-
-## ======= STATUS STUNTING (HFA)
-def stunting_status(z):
-    if z < -2:
-        return "Berisiko Stunting"
-    return "Tidak Berisiko Stunting"
-
-## ======= EVALUASI GIZI
-### Berat/Usia
-def wfa_status(z):
-    
-    if z is None:
-        return None
-    elif z < -3 :
-        return "Berat Anak Sangat Kurang\n(Z-Score normal -2 s/d +2)"
-    elif z < -2:
-        return "Berat Anak Kurang\n(Z-Score normal -2 s/d +2)"
-    elif z > 3:
-        return "Anak Obesitas\n(Z-Score normal -2 s/d +2)"
-    elif z > 2:
-        return "Berat Badan Anak Berlebih\n(Z-Score normal -2 s/d +2)"
-    else:
-        return "Berat Badan Anak Normal\n(Z-Score normal -2 s/d +2)"
-
-### Tinggi/Usia
-def hfa_status(z):
-    if z is None:
-        return None
-    elif z < -3:
-        return "Anak Sangat Pendek\n(Z-Score normal -2 s/d +3)"
-    elif z < -2:
-        return "Anak Pendek\n(Z-Score normal -2 s/d +3)"
-    elif z > 3:
-        return "Anak Tinggi\n(Z-Score normal -2 s/d +3)"
-    else:
-        return "Tinggi Anak Normal\n(Z-Score normal -2 s/d +3)"
-
-### Berat/Tinggi
-def wfh_status(z):
-    if z is None:
-        return "Tinggi Badan atau Berat Badan Di Luar Rentang Database"
-    elif z < -3:
-        return "Gizi Anak Buruk\n(Z-Score normal -2 s/d +2)"
-    elif z < -2:
-        return "Gizi Anak Kurang\n(Z-Score normal -2 s/d +2)"
-    elif z > 3:
-        return  "Anak Obesitas\n(Z-Score normal -2 s/d +2)"
-    elif z > 2:
-        return "Anak Overweight\n(Z-Score normal -2 s/d +2)"
-    else:
-        return "Gizi Anak Baik/Normal\n(Z-Score normal -2 s/d +2) "
-
-### Lingkar Kepala/Usia
-def hcaf_status(z):
-    if z is None:
-        return None
-    elif z < -2:
-        return "Anak Terindikasi Microcephaly. Berisiko keterlambatan kognitif, motorik, dan belajar jangka panjang, serta gangguan neurologis\n(Z-Score normal -2 s/d +2)"
-    elif z > 2:
-        return "Anak Terindikasi Macrocephaly. Indikasi adanya hydrocephalus atau masalah genetik, memerlukan skrining dini\n(Z-Score normal -2 s/d +2)"
-    else:
-        return "Lingkar Kepala Anak Normal\n(Z-Score normal -2 s/d +2)"
-
-## ======= SAFE ROUND
-def safe_round(x):
-    return round(x, 2) if x is not None else None
-
-## ======= RISK STUNTING (%)
-def stunting_risk(hfa):
-    # score = 0
-
-    # if hfa < -2:
-    #     score += 60
-    # if wfa < -2:
-    #     score += 40
-    # return min(score, 100)
-    return hfa
-
-
 ## ========= STREAMLIT
 st.set_page_config(page_title="SI Tumbuh")
 
@@ -552,7 +351,8 @@ if st.session_state.view_mode == 'public':
     # Mode Publik - Tampilkan header dengan tombol login admin
     col1, col2 = st.columns([4, 1])
     with col1:
-        st.image("header situmbuh.png")
+        show_asset('header', "SI Tumbuh")
+        mark('first_paint')
         # st.markdown(f"<h1 class='main-header'> SI Tumbuh</h1>", unsafe_allow_html=True)
         # st.markdown("<p class='sub-header'>Berdasarkan Standar WHO</p>", unsafe_allow_html=True)
     with col2:
@@ -566,7 +366,7 @@ else:
     col1, col2, col3 = st.columns([3, 1, 1])
     with col1:
         # st.markdown(f"<h1 class='main-header'> SI Tumbuh</h1>", unsafe_allow_html=True)
-        st.image("header situmbuh.png")
+        show_asset('header', "SI Tumbuh")
     with col2:
         st.write(f"**{st.session_state.nama_lengkap}**")
         st.caption(f"Role: {st.session_state.role.upper()}")
@@ -631,27 +431,59 @@ else:
 menu_options = [" Skrining Balita", " Cara Pengukuran", " Profile"]
 if st.session_state.view_mode == 'admin' and st.session_state.role == 'admin':
     menu_options.append(" Database (Admin)")
+    menu_options.append(" Analitik (Admin)")
     
 page = st.sidebar.radio("Pilih Menu:", menu_options)
 
+# Kader yang login bisa mengetik satu antrian posyandu sekaligus (grid)
+input_mode = "Satu anak"
+if page == " Skrining Balita" and st.session_state.logged_in:
+    input_mode = st.sidebar.radio("Mode Input:", ["Satu anak", "Antrian (grid)"])
+
 # ========= ADMIN DATABASE PAGE
 if page == " Database (Admin)" and st.session_state.view_mode == 'admin' and st.session_state.role == 'admin':
+    with phase('import halaman admin'):
+        import pandas as pd
+        from krenova_core import (
+            DuplicateMeasurement, delete_measurement, get_all_measurements, get_dukuh_stats, get_growth_alerts,
+            resolve_growth_alert, update_measurement,
+        )
+        from krenova_core.archive import archive_files, archive_summary
+        from krenova_core.charts import build_mean_z_trend_chart, build_zscore_distribution_chart
+        from krenova_core.db import get_zscore_summary
+        from krenova_core.distribution import AGE_BANDS, INDICATORS, WHO_REFERENCE, distribution_table, moment_stats
+        from krenova_core.linkage import (
+            find_duplicate_children, get_child_merges, get_duplicate_measurements, merge_children,
+            resolve_duplicate_measurement, unmerge_children, use_duplicate_measurement,
+        )
+        from krenova_core.sync import get_sync_conflicts, resolve_sync_conflict
+
     st.title(" Database Hasil Pengukuran")
     st.markdown("Dashboard untuk melihat semua data pengukuran yang telah direkam")
     
-    df = get_all_measurements()
+    include_archive = False
+    if archive_files():
+        include_archive = st.toggle("Sertakan arsip tahunan", value=False,
+                                    help="Data lama yang sudah dipindah ke database arsip per tahun")
+    df = get_all_measurements(include_archive=include_archive)
     
     if not df.empty:
+        # Nilai tidak wajar (kemungkinan salah ketik) tidak ikut statistik & diagram
+        implausible = df['biv_flags'].fillna(0) != 0
+        valid_df = df[~implausible]
+
         # Statistik
-        col1, col2, col3 = st.columns(3)
+        col1, col2, col3, col4 = st.columns(4)
         with col1:
             st.metric("Total Pengukuran", len(df))
         with col2:
-            stunting_count = len(df[df['status_stunting'] != 'Tidak Berisiko Stunting'])
+            stunting_count = len(valid_df[valid_df['status_stunting'] != 'Tidak Berisiko Stunting'])
             st.metric("Risiko Stunting", stunting_count)
         with col3:
-            avg_age = df['usia_bulan'].mean()
+            avg_age = valid_df['usia_bulan'].mean()
             st.metric("Rata-rata Usia", f"{avg_age:.1f} bulan")
+        with col4:
+            st.metric("Nilai Tidak Wajar", int(implausible.sum()))
         
         st.markdown("---")
         
@@ -662,10 +494,11 @@ if page == " Database (Admin)" and st.session_state.view_mode == 'admin' and st.
         
         with col1:
             # Pie Chart - Status Stunting
-            status_counts = df['status_stunting'].value_counts()
+            status_counts = valid_df['status_stunting'].value_counts()
             
             # Create data for pie chart
-            import plotly.graph_objects as go
+            with phase('import plotly'):
+                import plotly.graph_objects as go
             
             colors = {
                 'Tidak Berisiko Stunting': '#8AA624',
@@ -691,15 +524,9 @@ if page == " Database (Admin)" and st.session_state.view_mode == 'admin' and st.
         
         with col2:
             if 'alamat' in df.columns:
-                # Hitung statistik per alamat
-                alamat_stats = df.groupby('alamat').agg(
-                    total_anak=('id', 'count'),
-                    berisiko_stunting=('status_stunting', lambda x: (x != 'Tidak Berisiko Stunting').sum())
-                ).reset_index()
-
-                alamat_stats['persentase'] = (
-                    alamat_stats['berisiko_stunting'] / alamat_stats['total_anak'] * 100
-                ).round(1)
+                # Statistik per alamat dihitung di database (SQL GROUP BY), bukan dari seluruh baris
+                with timer('ui.dashboard_agregasi'):
+                    alamat_stats = get_dukuh_stats().dropna(subset=['alamat'])
 
                 # Bar Chart
                 fig_bar = go.Figure(data=[
@@ -726,20 +553,234 @@ if page == " Database (Admin)" and st.session_state.view_mode == 'admin' and st.
         # Statistik per Daerah
         st.subheader(" Statistik Risiko Stunting per Daerah")
         if 'alamat' in df.columns:
-            alamat_stats = df.groupby('alamat').agg({
-                'id': 'count',
-                'status_stunting': lambda x: (x != 'Tidak Berisiko Stunting').sum(),
-                'risiko_stunting_persen': 'mean'
-            }).rename(columns={
-                'id': 'Total Anak',
-                'status_stunting': 'Berisiko Stunting',
-                'risiko_stunting_persen': 'Rata-rata Z-Score TB'
-            }).sort_values('Berisiko Stunting', ascending=False)
+            with timer('ui.dashboard_agregasi'):
+                alamat_stats = get_dukuh_stats().dropna(subset=['alamat']).set_index('alamat').rename(columns={
+                    'total_anak': 'Total Anak',
+                    'berisiko_stunting': 'Berisiko Stunting',
+                    'rata_rata_haz': 'Rata-rata Z-Score TB',
+                    'rata_rata_waz': 'Rata-rata Z-Score BB',
+                    'persentase': 'Persentase Risiko'
+                })
             
-            alamat_stats['Persentase Risiko'] = (alamat_stats['Berisiko Stunting'] / alamat_stats['Total Anak'] * 100).round(1)
             st.dataframe(alamat_stats, use_container_width=True)
         
         st.markdown("---")
+
+        # Distribusi Z-Score vs Standar WHO (dari tabel ringkasan, bukan data mentah)
+        st.subheader(" Distribusi Z-Score vs Standar WHO")
+        st.caption("Standar WHO adalah normal baku: rata-rata 0, SD 1, 2,3% di bawah -2 SD dan 0,1% di bawah -3 SD. "
+                   "Kurva data yang bergeser ke kiri berarti seluruh populasi tertinggal, bukan hanya anak yang berisiko. "
+                   "Unit hitungan adalah pengukuran; nilai tidak wajar tidak dihitung.")
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            dist_indicator = st.selectbox("Indikator", list(INDICATORS), index=1, format_func=INDICATORS.get,
+                                          key="dist_indikator")
+        with col2:
+            dist_gender = st.selectbox("Jenis Kelamin", ["Semua", "L", "P"], key="dist_gender")
+        with col3:
+            dist_band = st.selectbox("Kelompok Usia (bulan)", ["Semua"] + [label for _, label in AGE_BANDS],
+                                     key="dist_usia")
+        with timer('ui.distribusi_zscore'):
+            histogram, moments = get_zscore_summary(
+                dist_indicator, gender=None if dist_gender == "Semua" else dist_gender,
+                age_band=None if dist_band == "Semua" else dist_band)
+        with col4:
+            dist_year = st.selectbox("Tahun", sorted(histogram['tahun'].unique(), reverse=True) or ["-"],
+                                     key="dist_tahun")
+
+        dist_dukuh = st.multiselect("Dukuh", sorted(histogram['alamat'].unique()), key="dist_dukuh",
+                                    placeholder="Semua dukuh")
+        if dist_dukuh:
+            histogram = histogram[histogram['alamat'].isin(dist_dukuh)]
+            moments = moments[moments['alamat'].isin(dist_dukuh)]
+        year_histogram = histogram[histogram['tahun'] == dist_year]
+        year_moments = moments[moments['bulan'].str[:4] == dist_year]
+
+        if year_histogram.empty:
+            st.info("Belum ada data Z-Score untuk pilihan ini.")
+        else:
+            name = INDICATORS[dist_indicator]
+            table = distribution_table(year_histogram, year_moments)
+            overall = table.iloc[-1]
+            m1, m2, m3, m4 = st.columns(4)
+            m1.metric("Rata-rata Z", f"{overall['rata_rata']:.2f}", f"{overall['selisih_rata_rata']:+.2f} SD dari WHO",
+                      delta_color="normal")
+            m2.metric("SD", f"{overall['sd']:.2f}" if pd.notna(overall['sd']) else "-", "WHO: 1,00",
+                      delta_color="off")
+            m3.metric("< -2 SD", f"{overall['persen_bawah_2sd']}%",
+                      f"{overall['selisih_2sd']:+.1f} poin dari WHO ({WHO_REFERENCE['persen_bawah_2sd']:.1f}%)",
+                      delta_color="inverse")
+            m4.metric("< -3 SD", f"{overall['persen_bawah_3sd']}%",
+                      f"{overall['selisih_3sd']:+.1f} poin dari WHO ({WHO_REFERENCE['persen_bawah_3sd']:.1f}%)",
+                      delta_color="inverse")
+
+            col1, col2 = st.columns(2)
+            with col1:
+                st.plotly_chart(build_zscore_distribution_chart(year_histogram, f"Distribusi {name} {dist_year}"),
+                                use_container_width=True)
+            with col2:
+                st.plotly_chart(build_mean_z_trend_chart(moment_stats(moments), f"Tren Rata-rata {name} per Bulan"),
+                                use_container_width=True)
+
+            st.dataframe(table.set_index('alamat').rename(columns={
+                'n': 'Pengukuran', 'rata_rata': 'Rata-rata Z', 'sd': 'SD',
+                'persen_bawah_2sd': '% < -2 SD', 'persen_bawah_3sd': '% < -3 SD',
+                'selisih_rata_rata': 'Selisih Rata-rata', 'selisih_sd': 'Selisih SD',
+                'selisih_2sd': 'Selisih % < -2 SD', 'selisih_3sd': 'Selisih % < -3 SD'
+            }), use_container_width=True)
+
+        st.markdown("---")
+
+        # Nilai Tidak Wajar
+        st.subheader(" Nilai Tidak Wajar")
+        if not implausible.any():
+            st.success("Tidak ada pengukuran dengan nilai tidak wajar.")
+        else:
+            st.caption("Pengukuran di luar batas pembersihan WHO atau berubah tidak wajar dari kunjungan sebelumnya. "
+                       "Koreksi lewat tombol Edit Data (ID) di bawah; setelah diperbaiki data kembali dihitung di statistik.")
+            flagged = df.loc[implausible, ['id', 'tanggal_pengukuran', 'nama_anak', 'alamat', 'berat_badan',
+                                           'tinggi_badan', 'lingkar_kepala', 'wfa_zscore', 'hfa_zscore',
+                                           'wfh_zscore', 'biv_flags']]
+            flagged['alasan'] = flagged['biv_flags'].map(lambda mask: "; ".join(flag_labels(mask)))
+            st.dataframe(flagged.drop(columns='biv_flags').rename(columns={
+                'id': 'ID', 'tanggal_pengukuran': 'Tanggal', 'nama_anak': 'Nama', 'alamat': 'Alamat',
+                'berat_badan': 'BB', 'tinggi_badan': 'TB', 'lingkar_kepala': 'LK', 'wfa_zscore': 'BB/U',
+                'hfa_zscore': 'TB/U', 'wfh_zscore': 'BB/TB', 'alasan': 'Alasan'
+            }), use_container_width=True, hide_index=True, height=200)
+
+        st.markdown("---")
+
+        # Peringatan Gagal Tumbuh
+        st.subheader(" Peringatan Gagal Tumbuh")
+        alerts_df = get_growth_alerts()
+        if alerts_df.empty:
+            st.success("Tidak ada peringatan gagal tumbuh yang terbuka.")
+        else:
+            st.caption("Anak dengan penurunan Z-Score signifikan atau melewati batas -2/-3 SD dibanding kunjungan sebelumnya.")
+            alerts_display = alerts_df.rename(columns={
+                'id': 'ID', 'tanggal_pengukuran': 'Tanggal', 'nama_anak': 'Nama', 'alamat': 'Alamat',
+                'indikator': 'Indikator', 'jenis': 'Peringatan', 'z_sebelum': 'Z Sebelum',
+                'z_sekarang': 'Z Sekarang', 'perubahan': 'Perubahan', 'kecepatan': 'Z/bulan',
+                'measurement_id': 'ID Pengukuran'
+            })
+            st.dataframe(alerts_display, use_container_width=True, height=250)
+
+            col1, col2 = st.columns([1, 3])
+            with col1:
+                alert_id = st.number_input("ID Peringatan", min_value=0, step=1, value=0, key="id_alert")
+                if st.button(" Tandai Selesai", use_container_width=True):
+                    if alert_id > 0:
+                        resolve_growth_alert(alert_id)
+                        st.rerun()
+                    else:
+                        st.warning("Masukkan ID yang valid")
+
+        st.markdown("---")
+
+        # Duplikasi Data Anak
+        st.subheader(" Duplikasi Data Anak")
+        st.caption("Nama anak yang diketik berbeda tiap kunjungan (mis. \"Aisyah\" / \"Aisah\") dengan dukuh, jenis kelamin, dan tanggal lahir yang sama.")
+        if st.button(" Cari Data Duplikat"):
+            st.session_state.duplicate_candidates = find_duplicate_children()
+
+        dup_df = st.session_state.get('duplicate_candidates')
+        if dup_df is not None:
+            if dup_df.empty:
+                st.success("Tidak ditemukan kandidat data duplikat.")
+            else:
+                st.dataframe(dup_df[['keep_nama', 'keep_kunjungan', 'drop_nama', 'drop_kunjungan',
+                                     'alamat', 'gender', 'tanggal_lahir', 'skor']].rename(columns={
+                    'keep_nama': 'Nama Utama', 'keep_kunjungan': 'Kunjungan Utama',
+                    'drop_nama': 'Nama Duplikat', 'drop_kunjungan': 'Kunjungan Duplikat',
+                    'alamat': 'Alamat', 'gender': 'Gender', 'tanggal_lahir': 'Tgl Lahir', 'skor': 'Skor'
+                }), use_container_width=True, height=250)
+
+                col1, col2 = st.columns([3, 1])
+                with col1:
+                    merge_idx = st.selectbox("Pilih pasangan yang akan digabung", dup_df.index,
+                                             format_func=lambda i: f"{dup_df.loc[i, 'drop_nama']} → {dup_df.loc[i, 'keep_nama']} ({dup_df.loc[i, 'alamat']})")
+                with col2:
+                    st.write("")
+                    st.write("")
+                    if st.button(" Gabungkan", use_container_width=True):
+                        moved = merge_children(dup_df.loc[merge_idx, 'keep_key'], dup_df.loc[merge_idx, 'drop_key'],
+                                               st.session_state.username)
+                        merged_key = dup_df.loc[merge_idx, 'drop_key']
+                        st.session_state.duplicate_candidates = dup_df[
+                            (dup_df['drop_key'] != merged_key) & (dup_df['keep_key'] != merged_key)
+                        ]
+                        st.success(f" {moved} data pengukuran berhasil digabungkan!")
+                        st.rerun()
+
+        # Pengukuran anak yang sama pada tanggal yang sama (migrasi kunci alami, penggabungan)
+        duplicates_df = get_duplicate_measurements()
+        if not duplicates_df.empty:
+            st.markdown("**Pengukuran Ganda (tanggal sama)**")
+            st.caption("Nilainya berbeda dari data yang tersimpan. Data yang tersimpan tetap dipakai; pilih data yang disisihkan jika justru itu yang benar.")
+            st.dataframe(duplicates_df[['id', 'alasan', 'tanggal_pengukuran', 'nama_anak',
+                                        'berat_badan', 'tinggi_badan', 'lingkar_kepala',
+                                        'berat_badan_disisihkan', 'tinggi_badan_disisihkan',
+                                        'lingkar_kepala_disisihkan']].rename(columns={
+                'id': 'ID', 'alasan': 'Asal', 'tanggal_pengukuran': 'Tgl Ukur', 'nama_anak': 'Nama',
+                'berat_badan': 'BB Tersimpan', 'tinggi_badan': 'TB Tersimpan', 'lingkar_kepala': 'LK Tersimpan',
+                'berat_badan_disisihkan': 'BB Disisihkan', 'tinggi_badan_disisihkan': 'TB Disisihkan',
+                'lingkar_kepala_disisihkan': 'LK Disisihkan'
+            }), use_container_width=True, height=200)
+            col1, col2, col3 = st.columns([1, 1, 2])
+            with col1:
+                duplicate_id = st.number_input("ID Data Ganda", min_value=0, step=1, value=0, key="id_duplicate")
+            with col2:
+                if st.button(" Pakai Data Disisihkan", use_container_width=True):
+                    if duplicate_id in duplicates_df['id'].values:
+                        try:
+                            use_duplicate_measurement(duplicate_id)
+                            st.rerun()
+                        except DuplicateMeasurement as e:
+                            st.error(f" {e}")
+                    else:
+                        st.warning("Masukkan ID yang valid")
+                if st.button(" Tandai Ditangani", key="resolve_duplicate", use_container_width=True):
+                    if duplicate_id in duplicates_df['id'].values:
+                        resolve_duplicate_measurement(duplicate_id)
+                        st.rerun()
+                    else:
+                        st.warning("Masukkan ID yang valid")
+
+        merges_df = get_child_merges()
+        if not merges_df.empty:
+            with st.expander(f"Riwayat Penggabungan ({len(merges_df)})"):
+                st.dataframe(merges_df[['from_nama', 'to_nama', 'merged_by', 'merged_at']].rename(columns={
+                    'from_nama': 'Nama Duplikat', 'to_nama': 'Nama Utama', 'merged_by': 'Oleh', 'merged_at': 'Waktu'
+                }), use_container_width=True, height=200)
+                unmerge_key = st.selectbox("Penggabungan yang dibatalkan", merges_df['from_key'],
+                                           format_func=lambda k: k.replace('|', ' · '))
+                if st.button(" Batalkan Penggabungan"):
+                    moved = unmerge_children(unmerge_key)
+                    st.session_state.duplicate_candidates = None
+                    st.success(f" {moved} data pengukuran dipisahkan kembali.")
+                    st.rerun()
+
+        st.markdown("---")
+
+        # Konflik sinkronisasi perangkat offline (hanya tampil jika ada)
+        conflicts_df = get_sync_conflicts()
+        if not conflicts_df.empty:
+            st.subheader(" Konflik Sinkronisasi")
+            st.caption("Perubahan dari perangkat posyandu yang ditolak karena data yang sama sudah diubah/dihapus di pusat. Periksa data perangkat, lalu perbaiki manual jika perlu.")
+            st.dataframe(conflicts_df.drop(columns=['uid']).rename(columns={
+                'id': 'ID', 'created_at': 'Waktu', 'device': 'Perangkat', 'op': 'Operasi', 'alasan': 'Alasan',
+                'base_revision': 'Revisi Perangkat', 'central_revision': 'Revisi Pusat', 'data': 'Data Perangkat'
+            }), use_container_width=True, height=200)
+            col1, col2 = st.columns([1, 3])
+            with col1:
+                conflict_id = st.number_input("ID Konflik", min_value=0, step=1, value=0, key="id_conflict")
+                if st.button(" Tandai Ditangani", use_container_width=True):
+                    if conflict_id > 0:
+                        resolve_sync_conflict(conflict_id)
+                        st.rerun()
+                    else:
+                        st.warning("Masukkan ID yang valid")
+            st.markdown("---")
         
         # Filter
         col1, col2, col3, col4 = st.columns(4)
@@ -776,7 +817,7 @@ if page == " Database (Admin)" and st.session_state.view_mode == 'admin' and st.
                 with st.form("edit_form"):
                     col1, col2 = st.columns(2)
 
-                    raw_birth_date = record[-1] 
+                    raw_birth_date = record['tanggal_lahir']
         
                     try:
                         if raw_birth_date:
@@ -828,30 +869,16 @@ if page == " Database (Admin)" and st.session_state.view_mode == 'admin' and st.
                         }
 
                         
-                        waz_z = calc_wfa(edit_data["age"], edit_data["sex"], edit_data["weight"])
-                        waz_label = wfa_status(waz_z)
-                        haz_z = calc_hfa(edit_data["age"], edit_data["sex"], edit_data["height"])
-                        haz_label = hfa_status(haz_z)
-                        whz_z = calc_wfh(edit_data["age"], edit_data["sex"], edit_data["weight"], edit_data["height"])
-                        whz_label = wfh_status(whz_z)
-                        hcz_z = calc_hcfa(edit_data["age"], edit_data["sex"], edit_data["hc"])
-                        hcz_label = hcaf_status(hcz_z)
-                        
-                        risk = stunting_risk(safe_round(haz_z)) if haz_z else None
-                        status = stunting_status(haz_z) if haz_z else None
-                        
-                        WFA = safe_round(waz_z)
-                        HFA = safe_round(haz_z)
-                        WFH = safe_round(whz_z)
-                        HCFA = safe_round(hcz_z)
+                        z_scores, statuses, risk, status = score_measurement(edit_data)
                         
-                        z_scores = {'wfa': WFA, 'hfa': HFA, 'wfh': WFH, 'hcfa': HCFA}
-                        statuses = {'wfa': waz_label, 'hfa': haz_label, 'wfh': whz_label, 'hcfa': hcz_label}
-                        
-                        update_measurement(st.session_state.edit_record_id, edit_data, z_scores, statuses, risk, status)
-                        st.success(" Data berhasil diupdate!")
-                        st.session_state.edit_record_id = None
-                        st.rerun()
+                        try:
+                            update_measurement(st.session_state.edit_record_id, edit_data, z_scores, statuses, risk, status)
+                        except DuplicateMeasurement as e:
+                            st.error(f" {e}. Edit data tersebut, atau hapus salah satunya.")
+                        else:
+                            st.success(" Data berhasil diupdate!")
+                            st.session_state.edit_record_id = None
+                            st.rerun()
                     
                     if cancel_edit:
                         st.session_state.edit_record_id = None
@@ -942,6 +969,127 @@ if page == " Database (Admin)" and st.session_state.view_mode == 'admin' and st.
     else:
         st.info("Belum ada data pengukuran yang tersimpan.")
 
+    with st.expander("Profil Startup"):
+        st.caption("Waktu tiap fase saat pertama kali dijalankan di proses server ini (cold start), dalam milidetik.")
+        st.table(pd.DataFrame(list(PHASES.items()), columns=['Fase', 'Waktu (ms)']))
+
+    with st.expander("Backup & Arsip"):
+        backup_dir = os.environ.get('KRENOVA_BACKUP_DIR')
+        if backup_dir:
+            st.caption(f"Backup otomatis tiap {os.environ.get('KRENOVA_BACKUP_INTERVAL', 24)} jam ke `{backup_dir}`.")
+        else:
+            st.caption("Backup otomatis nonaktif. Atur KRENOVA_BACKUP_DIR, atau jalankan "
+                       "`python -m krenova_core backup` dari cron.")
+        summary = archive_summary()
+        if summary:
+            st.dataframe(pd.DataFrame(summary).rename(columns={
+                'tahun': 'Tahun', 'baris': 'Baris', 'ukuran_mb': 'Ukuran (MB)', 'file': 'File'
+            }), use_container_width=True, hide_index=True)
+        else:
+            st.info("Belum ada arsip tahunan. Jalankan `python -m krenova_core archive --older-than 5`.")
+
+    with st.expander("Beban & Antrian AI"):
+        load = admission.load_status()
+        if not load['aktif']:
+            st.caption("Kontrol penerimaan nonaktif (KRENOVA_ADMISSION=0).")
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Simpan Publik / Menit", load['simpan_per_menit'],
+                    help=f"Batas global {load['batas_per_menit']:g} per menit (sisa token {load['token_global']:g}/{load['burst_global']})")
+        col2.metric("AI Berjalan", f"{load['berjalan']}/{load['pekerja']}")
+        col3.metric("Antrean AI", load['antre'], help=f"Maksimal {load['kapasitas'] - load['pekerja']} menunggu")
+        col4.metric("Penjelasan Lokal", load['ai_dialihkan'], help="Antrean AI penuh/terlalu lama sejak server start")
+        st.caption(f"Sejak server start: {load['diterima']} submit publik diterima, "
+                   f"{load['ditolak_sesi']} ditolak (batas per sesi), {load['ditolak_global']} ditolak (batas global), "
+                   f"{load['ai_dilayani']} dijawab AI.")
+        if st.button("Muat Ulang", key="reload_load"):
+            st.rerun()
+
+    with st.expander("Performance"):
+        st.caption("Durasi skoring, query database, grafik, dan analisis AI di proses server ini (semua sesi). "
+                   "Saat nonaktif, instrumentasi hampir tanpa overhead.")
+        enabled = st.toggle("Aktifkan instrumentasi", value=metrics.ENABLED, key="metrics_enabled")
+        if enabled and not metrics.ENABLED:
+            metrics.enable()
+        elif not enabled and metrics.ENABLED:
+            metrics.disable()
+        timings, counters = metrics.summary()
+        if timings:
+            st.dataframe(pd.DataFrame(timings).rename(columns={
+                'fungsi': 'Fungsi', 'panggilan': 'Panggilan', 'total_ms': 'Total (ms)', 'rata_ms': 'Rata-rata (ms)',
+                'p50_ms': 'p50 (ms)', 'p95_ms': 'p95 (ms)', 'p99_ms': 'p99 (ms)', 'maks_ms': 'Maks (ms)'
+            }).sort_values('Total (ms)', ascending=False), use_container_width=True, hide_index=True)
+        else:
+            st.info("Belum ada data durasi. Aktifkan instrumentasi lalu gunakan aplikasi.")
+        if counters:
+            st.dataframe(pd.DataFrame(counters).rename(columns={'counter': 'Counter', 'label': 'Label', 'nilai': 'Nilai'}),
+                         use_container_width=True, hide_index=True)
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button("Unduh Metrik (Prometheus)", metrics.prometheus_text(),
+                               file_name="krenova_metrics.prom", mime="text/plain", use_container_width=True)
+        with col2:
+            if st.button("Reset Metrik", use_container_width=True):
+                metrics.reset()
+                st.rerun()
+
+# ========= ANALITIK PAGE (cermin Parquet + DuckDB)
+elif page == " Analitik (Admin)" and st.session_state.view_mode == 'admin' and st.session_state.role == 'admin':
+    from krenova_core.mirror import (
+        REPORTS, MirrorUnavailable, mirror_status, missing_packages, refresh_mirror, run_query,
+    )
+
+    st.title(" Analitik Data Pengukuran")
+    st.markdown("Query ad-hoc atas salinan kolumnar data pengukuran (Parquet). "
+                "Query berat di sini tidak membebani database skrining.")
+
+    missing = missing_packages()
+    if missing:
+        st.info(f"Fitur analitik membutuhkan paket tambahan: `pip install {' '.join(missing)}`")
+        st.stop()
+
+    status = mirror_status()
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        if status:
+            interval = os.environ.get('KRENOVA_MIRROR_INTERVAL')
+            schedule = f"diperbarui otomatis tiap {interval} menit" if interval else "atur KRENOVA_MIRROR_INTERVAL untuk pembaruan otomatis"
+            st.caption(f"Data per {status['diperbarui']:%d-%m-%Y %H:%M} · {status['baris']:,} pengukuran · {schedule}")
+        else:
+            st.warning("Cermin analitik belum dibangun.")
+    with col2:
+        if st.button("Perbarui Sekarang", use_container_width=True):
+            with st.spinner("Menyalin data pengukuran ke Parquet..."):
+                refresh_mirror()
+            st.rerun()
+
+    if status:
+        st.subheader(" Laporan Siap Pakai")
+        report = st.selectbox("Pilih laporan:", list(REPORTS))
+        sql = REPORTS[report]
+        with st.expander("SQL laporan"):
+            st.code(sql.strip(), language='sql')
+
+        st.subheader(" Query SQL")
+        st.caption("SQL DuckDB atas view `measurements`. Nama & kunci anak diganti `anak_id`; "
+                   "`tahun` = tahun pengukuran. Baris dengan `biv_flags` ≠ 0 adalah nilai tidak wajar.")
+        custom = st.text_area("SQL:", value="", height=120,
+                              placeholder="SELECT alamat, AVG(hfa_zscore) FROM measurements WHERE biv_flags = 0 GROUP BY alamat")
+        if custom.strip():
+            sql = custom
+
+        if st.button("Jalankan", type="primary"):
+            start = time.perf_counter()
+            try:
+                result, truncated = run_query(sql)
+            except (MirrorUnavailable, ValueError) as e:
+                st.error(str(e))
+            else:
+                st.caption(f"{len(result):,} baris · {(time.perf_counter() - start) * 1000:.0f} ms"
+                           + (" · hasil dipotong" if truncated else ""))
+                st.dataframe(result, use_container_width=True, hide_index=True)
+                st.download_button(" Download Hasil (CSV)", result.to_csv(index=False),
+                                   file_name=f"analitik_{dt.now().strftime('%Y%m%d_%H%M%S')}.csv", mime="text/csv")
+
 # ========= CARA PENGUKURAN PAGE
 elif page == " Cara Pengukuran":
     # st.image("header situmbuh.png", width=400)
@@ -950,6 +1098,92 @@ elif page == " Cara Pengukuran":
     st.video('https://youtu.be/D-_JimQkBuA?si=Un2gdqlYUfy1fTQ6')
     st.markdown("---")
 
+# ========= SKRINING ANTRIAN (GRID)
+elif page == " Skrining Balita" and input_mode == "Antrian (grid)":
+    from krenova_core.db import save_measurements_bulk
+    from krenova_core.entry import DUKUH, empty_queue, prepare_queue, queue_flags, queue_records, score_queue
+
+    st.title("Skrining Antrian Posyandu")
+    st.markdown("Ketik seluruh antrian balita, periksa hasil Z-Score di bawah tabel, lalu simpan sekaligus.")
+    st.markdown("---")
+
+    if 'grid_version' not in st.session_state:
+        st.session_state.grid_version = 0
+        st.session_state.grid_scores = {}
+    if 'grid_flags' not in st.session_state:
+        st.session_state.grid_flags = {}
+    if 'grid_saved' in st.session_state:
+        st.success(st.session_state.pop('grid_saved'))
+
+    col1, col2 = st.columns(2)
+    with col1:
+        grid_date = st.date_input("Tanggal Pengukuran", value=dt.now().date(), max_value=dt.now().date())
+    with col2:
+        grid_dukuh = st.selectbox("Dukuh Posyandu", DUKUH)
+
+    st.caption("Usia dihitung dari tanggal lahir; isi kolom usia hanya jika tanggal lahir tidak diketahui.")
+    grid = st.data_editor(
+        empty_queue(5),
+        key=f"grid_{st.session_state.grid_version}",
+        num_rows="dynamic",
+        use_container_width=True,
+        column_config={
+            'nama_anak': st.column_config.TextColumn("Nama Anak", width="medium"),
+            'tanggal_lahir': st.column_config.DateColumn("Tanggal Lahir", max_value=grid_date, format="DD/MM/YYYY"),
+            'usia_bulan': st.column_config.NumberColumn("Usia (bulan)", min_value=0, max_value=60, step=1),
+            'gender': st.column_config.SelectboxColumn("JK", options=["L", "P"]),
+            'alamat': st.column_config.SelectboxColumn("Dukuh", options=DUKUH, default=grid_dukuh),
+            'berat_badan': st.column_config.NumberColumn("BB (kg)", min_value=0.0, max_value=50.0, step=0.1, format="%.1f"),
+            'tinggi_badan': st.column_config.NumberColumn("TB (cm)", min_value=0.0, max_value=150.0, step=0.1, format="%.1f"),
+            'lingkar_kepala': st.column_config.NumberColumn("LK (cm)", min_value=0.0, max_value=60.0, step=0.1, format="%.1f"),
+        },
+    )
+
+    # Hanya baris yang baru diketik/diubah yang diskor; sisanya diambil dari cache sesi
+    queue = prepare_queue(grid, grid_date)
+    scored = score_queue(queue, st.session_state.grid_scores)
+    scored['tidak_wajar'] = queue_flags(scored, st.session_state.grid_flags)
+    ready = scored['catatan'] == ''
+
+    if not scored.empty:
+        st.subheader(" Hasil Sementara")
+        preview = scored[['nama_anak', 'usia_bulan', 'wfa_zscore', 'hfa_zscore', 'wfh_zscore', 'hcfa_zscore',
+                          'status_stunting', 'catatan', 'tidak_wajar']].rename(columns={
+            'nama_anak': 'Nama', 'usia_bulan': 'Usia', 'wfa_zscore': 'BB/U', 'hfa_zscore': 'TB/U',
+            'wfh_zscore': 'BB/TB', 'hcfa_zscore': 'LK/U', 'status_stunting': 'Status Stunting', 'catatan': 'Catatan',
+            'tidak_wajar': 'Nilai Tidak Wajar'})
+        st.dataframe(preview, use_container_width=True, hide_index=True)
+
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Siap Disimpan", int(ready.sum()))
+        col2.metric("Perlu Dilengkapi", int((~ready).sum()))
+        col3.metric("Berisiko Stunting", int((scored['status_stunting'].notna()
+                                              & (scored['status_stunting'] != "Tidak Berisiko Stunting")).sum()))
+        col4.metric("Nilai Tidak Wajar", int((scored['tidak_wajar'] != '').sum()))
+        if (scored['tidak_wajar'] != '').any():
+            st.warning(" Periksa kembali baris dengan nilai tidak wajar (kemungkinan salah ketik). "
+                       "Baris tersebut tetap bisa disimpan, tetapi tidak dihitung di statistik dashboard.")
+
+    st.markdown("---")
+    col1, col2, col3 = st.columns([1, 1, 1])
+    with col2:
+        save_grid = st.button(f" Simpan {int(ready.sum())} Anak", type="primary", use_container_width=True,
+                              disabled=scored.empty)
+
+    if save_grid:
+        if not ready.all():
+            st.error(" Lengkapi atau hapus baris yang masih memiliki catatan sebelum menyimpan.")
+        else:
+            # Satu transaksi untuk seluruh antrian: gagal satu, tidak ada yang tersimpan
+            ids = save_measurements_bulk(queue_records(scored), st.session_state.username)
+            st.session_state.grid_saved = f" {len(ids)} pengukuran tanggal {grid_date} berhasil disimpan!"
+            st.session_state.grid_version += 1
+            st.session_state.grid_scores = {}
+            st.session_state.grid_flags = {}
+            st.rerun()
+
+    st.caption(" Penjelasan AI per anak tersedia di mode \"Satu anak\".")
+
 # ========= SKRINING GIZI PAGE
 elif page == " Skrining Balita":
     # col1, col2 = st.columns([2, 1])
@@ -977,11 +1211,7 @@ elif page == " Skrining Balita":
             today = dt.now().date()
             if birth_date <= today:
                 # Calculate age in months
-                age_val = (today.year - birth_date.year) * 12 + (today.month - birth_date.month)
-                # Adjust if day is before birth day
-                if today.day < birth_date.day:
-                    age_val -= 1
-                if age_val < 0: age_val = 0
+                age_val = age_in_months(birth_date, today)
         
         if birth_date:
             if age_val > 60:
@@ -1015,6 +1245,8 @@ elif page == " Skrining Balita":
     if analyze_button:
         if not name or not alamat or age == 0 or weight == 0 or height == 0 or hc == 0:
             st.error(" Mohon lengkapi semua data pengukuran!")
+        elif (retry_after := admit_public_submit()):
+            st.warning(f" Terlalu banyak permintaan skrining saat ini. Silakan coba lagi dalam {retry_after} detik.")
         else:
             data = {
                 "date": date,
@@ -1030,22 +1262,10 @@ elif page == " Skrining Balita":
 
 
             # Hitung Z-Scores
-            waz_z = calc_wfa(data["age"], data["sex"], data["weight"])
-            waz_label = wfa_status(waz_z)
-            haz_z = calc_hfa(data["age"], data["sex"], data["height"])
-            haz_label = hfa_status(haz_z)
-            whz_z = calc_wfh(data["age"], data["sex"], data["weight"], data["height"])
-            whz_label = wfh_status(whz_z)
-            hcz_z = calc_hcfa(data["age"], data["sex"], data["hc"])
-            hcz_label = hcaf_status(hcz_z)
-
-            risk = stunting_risk(safe_round(haz_z)) if haz_z else None
-            status = stunting_status(haz_z) if haz_z else None
-
-            WFA = safe_round(waz_z)
-            HFA = safe_round(haz_z)
-            WFH = safe_round(whz_z)
-            HCFA = safe_round(hcz_z)
+            z_scores, statuses, risk, status = score_measurement(data)
+            WFA, HFA, WFH, HCFA = z_scores['wfa'], z_scores['hfa'], z_scores['wfh'], z_scores['hcfa']
+            waz_label, haz_label = statuses['wfa'], statuses['hfa']
+            whz_label, hcz_label = statuses['wfh'], statuses['hcfa']
 
             status_z = {
             "waz_z": WFA, "waz_label": waz_label,
@@ -1054,11 +1274,13 @@ elif page == " Skrining Balita":
             "hcz_z": HCFA, "hcz_label": hcz_label }
             
             # Save to database
-            z_scores = {'wfa': WFA, 'hfa': HFA, 'wfh': WFH, 'hcfa': HCFA}
-            statuses = {'wfa': waz_label, 'hfa': haz_label, 'wfh': whz_label, 'hcfa': hcz_label}
-            save_measurement(data, z_scores, statuses, risk, status, st.session_state.username)
+            record_id = save_measurement(data, z_scores, statuses, risk, status, st.session_state.username)
             
             st.success(" Data berhasil dianalisis dan disimpan!")
+            implausible = flag_labels(get_measurement_by_id(record_id)['biv_flags'])
+            if implausible:
+                st.warning(" Nilai tidak wajar terdeteksi: " + "; ".join(implausible) + ". "
+                           "Periksa kembali pengukuran (kemungkinan salah ketik). Data ini tidak dihitung di statistik dashboard.")
             st.markdown("---")
             
             # Header Hasil
@@ -1136,6 +1358,36 @@ elif page == " Skrining Balita":
             #     </div>
             #     """, unsafe_allow_html=True)
             
+            st.markdown("---")
+
+            # Target Pengukuran
+            st.subheader(" Target Pengukuran")
+            st.caption("Nilai pengukuran pada batas -2 SD dan median WHO untuk usia/tinggi anak saat ini. Selisih negatif berarti anak masih di bawah batas tersebut.")
+            gap_df = target_gap_table(data)
+            if not gap_df.empty:
+                st.dataframe(gap_df, use_container_width=True, hide_index=True)
+
+            st.markdown("---")
+
+            # Grafik Pertumbuhan WHO
+            st.subheader(" Grafik Pertumbuhan (Standar WHO)")
+            from krenova_core.charts import build_growth_chart
+            history = get_child_history(data)
+            m_type = "Length" if data["age"] < 24 else "Height"
+            tab_wfa, tab_hfa, tab_wfh, tab_hcfa = st.tabs(["BB/U", "TB/U", "BB/TB", "LK/U"])
+            with tab_wfa:
+                st.plotly_chart(build_growth_chart('wfa', data['sex'], history['usia_bulan'], history['berat_badan']),
+                                use_container_width=True)
+            with tab_hfa:
+                st.plotly_chart(build_growth_chart('hfa', data['sex'], history['usia_bulan'], history['tinggi_badan']),
+                                use_container_width=True)
+            with tab_wfh:
+                st.plotly_chart(build_growth_chart('wfh', data['sex'], history['tinggi_badan'], history['berat_badan'], m_type),
+                                use_container_width=True)
+            with tab_hcfa:
+                st.plotly_chart(build_growth_chart('hcfa', data['sex'], history['usia_bulan'], history['lingkar_kepala']),
+                                use_container_width=True)
+
             st.markdown("---")
             st.caption(" Hasil ini merupakan skrining awal. Untuk diagnosis dan penanganan lebih lanjut, konsultasikan dengan tenaga kesehatan profesional.")
 
@@ -1178,7 +1430,7 @@ elif page == " Profile":
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        st.image("Khusna.png", use_container_width=True)
+        show_asset('khusna', "Khusna", lazy=True)
         st.markdown("""
         <div style='text-align: center; margin-top: 1rem;'>
             <a href='mailto:khusnalathifah@gmail.com' style='text-decoration: none;'>
@@ -1191,7 +1443,7 @@ elif page == " Profile":
         """, unsafe_allow_html=True)
     
     with col2:
-        st.image("Mayang.png", use_container_width=True)
+        show_asset('mayang', "Mayang", lazy=True)
         st.markdown("""
         <div style='text-align: center; margin-top: 1rem;'>
             <a href='mailto:gumelarmayang@gmail.com' style='text-decoration: none;'>
@@ -1204,7 +1456,7 @@ elif page == " Profile":
         """, unsafe_allow_html=True)
     
     with col3:
-        st.image("Via.png", use_container_width=True)
+        show_asset('via', "Via", lazy=True)
         st.markdown("""
         <div style='text-align: center; margin-top: 1rem;'>
             <a href='mailto:setyoriniokviana@gmail.com' style='text-decoration: none;'>
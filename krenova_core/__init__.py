@@ -0,0 +1,17 @@
+"""Inti skoring & penyimpanan SI Tumbuh tanpa ketergantungan Streamlit.
+
+Dipakai oleh aplikasi Streamlit (krenova.py) maupun job batch: ``python -m krenova_core``.
+"""
+from .db import (
+    DuplicateMeasurement, delete_measurement, get_all_measurements, get_child_history, get_connection,
+    get_dukuh_stats, get_growth_alerts, get_measurement_by_id, hash_password, init_database,
+    resolve_growth_alert, save_measurement, update_measurement, verify_login,
+)
+from .reference import (
+    age_in_months, calc_hcfa, calc_hfa, calc_wfa, calc_wfh, get_target_table, inverse_lms_table,
+    target_measurements, who_inverse, who_zscore,
+)
+from .scoring import SCORE_COLUMNS, score_frame, score_measurement, scoring_version, target_gap_table
+from .status import (
+    hcaf_status, hfa_status, safe_round, stunting_risk, stunting_status, wfa_status, wfh_status,
+)
@@ -0,0 +1,172 @@
+"""Kontrol penerimaan (admission control) untuk halaman skrining publik.
+
+Setiap submit menulis satu baris dan memanggil Gemini. Agar skrip atau keramaian acara tidak
+menghabiskan kuota API dan menahan SQLite untuk semua orang:
+
+- token bucket per sesi dan global (semua sesi publik di proses ini) membatasi laju simpan;
+- panggilan AI dijalankan oleh sejumlah pekerja tetap dengan antrean terbatas. Jika antrean
+  penuh, atau giliran tidak datang dalam AI_WAIT detik, penjelasan lokal dipakai (load shedding).
+
+Batas diatur lewat environment; rate 0 berarti tanpa batas, ``KRENOVA_ADMISSION=0`` mematikan
+semua batas (mis. untuk uji beban kapasitas murni).
+"""
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from .metrics import count
+
+ENABLED = os.environ.get('KRENOVA_ADMISSION', '1') != '0'
+# Simpan per menit & burst: per sesi (kader di posyandu ±1 anak per menit) dan global
+SESSION_RATE = float(os.environ.get('KRENOVA_RATE_SESI', 6))
+SESSION_BURST = int(os.environ.get('KRENOVA_BURST_SESI', 3))
+GLOBAL_RATE = float(os.environ.get('KRENOVA_RATE_GLOBAL', 120))
+GLOBAL_BURST = int(os.environ.get('KRENOVA_BURST_GLOBAL', 20))
+# Panggilan Gemini bersamaan, antrean di belakangnya, dan batas tunggu (detik)
+AI_WORKERS = int(os.environ.get('KRENOVA_AI_WORKERS', 4))
+AI_QUEUE = int(os.environ.get('KRENOVA_AI_QUEUE', 8))
+AI_WAIT = float(os.environ.get('KRENOVA_AI_WAIT', 20))
+
+class TokenBucket:
+    """Token bucket thread-safe: `rate` token per menit, maksimal `burst` token tersimpan."""
+    def __init__(self, rate, burst):
+        self.rate = rate / 60
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self):
+        """Ambil satu token. Mengembalikan 0 jika diterima, atau detik sampai token berikutnya."""
+        if self.rate <= 0:
+            return 0.0
+        with self.lock:
+            self.refill(time.monotonic())
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def refund(self):
+        with self.lock:
+            self.tokens = min(self.burst, self.tokens + 1)
+
+    def level(self):
+        with self.lock:
+            self.refill(time.monotonic())
+            return self.tokens
+
+class AIQueue:
+    """Pekerja AI tetap + antrean terbatas; pekerjaan di luar kapasitas langsung ditolak."""
+    def __init__(self, workers, queue):
+        self.workers = workers
+        self.capacity = workers + queue
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix='krenova-ai')
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.running = 0
+
+    def submit(self, fn, *args, **kwargs):
+        """Future hasil fn, atau None jika pekerja & antrean penuh."""
+        with self.lock:
+            if self.pending >= self.capacity:
+                return None
+            self.pending += 1
+
+        def run():
+            with self.lock:
+                self.running += 1
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self.lock:
+                    self.running -= 1
+
+        future = self.executor.submit(run)
+        # Dipanggil juga saat future dibatalkan sebelum sempat berjalan
+        future.add_done_callback(self.release)
+        return future
+
+    def release(self, future):
+        with self.lock:
+            self.pending -= 1
+
+    def status(self):
+        with self.lock:
+            return {'berjalan': self.running, 'antre': self.pending - self.running,
+                    'pekerja': self.workers, 'kapasitas': self.capacity}
+
+# Satu bucket global & satu antrean AI per proses server (dipakai bersama semua sesi)
+global_bucket = TokenBucket(GLOBAL_RATE, GLOBAL_BURST)
+ai_queue = AIQueue(AI_WORKERS, AI_QUEUE)
+_stats = {'diterima': 0, 'ditolak_sesi': 0, 'ditolak_global': 0, 'ai_dilayani': 0, 'ai_dialihkan': 0}
+_recent = deque(maxlen=10_000)
+_stats_lock = threading.Lock()
+
+def record(name):
+    with _stats_lock:
+        _stats[name] += 1
+        if name == 'diterima':
+            _recent.append(time.monotonic())
+
+def session_bucket():
+    """Bucket baru untuk satu sesi (disimpan di st.session_state oleh krenova.py)."""
+    return TokenBucket(SESSION_RATE, SESSION_BURST)
+
+def admit_submit(bucket):
+    """Cek bucket sesi lalu global. Mengembalikan (diterima?, detik tunggu, alasan)."""
+    if not ENABLED:
+        return True, 0.0, None
+    wait = bucket.take()
+    if wait:
+        record('ditolak_sesi')
+        count('admission_rejected_total', scope='sesi')
+        return False, wait, 'sesi'
+    wait = global_bucket.take()
+    if wait:
+        # Ditolak karena beban global: jatah sesi tidak ikut terpakai
+        bucket.refund()
+        record('ditolak_global')
+        count('admission_rejected_total', scope='global')
+        return False, wait, 'global'
+    record('diterima')
+    return True, 0.0, None
+
+def run_ai(fn, *args, timeout=AI_WAIT, **kwargs):
+    """Jalankan fn lewat antrean AI. Mengembalikan (hasil, True) atau (None, False) jika dialihkan.
+
+    Exception dari fn diteruskan ke pemanggil (gagal ≠ dialihkan).
+    """
+    if not ENABLED:
+        return fn(*args, **kwargs), True
+    future = ai_queue.submit(fn, *args, **kwargs)
+    if future is None:
+        record('ai_dialihkan')
+        count('ai_shed_total', reason='penuh')
+        return None, False
+    try:
+        result = future.result(timeout=timeout)
+    except TimeoutError:
+        # Masih di antrean: dibatalkan. Sudah berjalan: hasilnya dibuang saat selesai
+        future.cancel()
+        record('ai_dialihkan')
+        count('ai_shed_total', reason='timeout')
+        return None, False
+    record('ai_dilayani')
+    return result, True
+
+def load_status():
+    """Ringkasan untuk halaman admin: laju simpan, isi bucket global, antrean AI, penolakan."""
+    now = time.monotonic()
+    with _stats_lock:
+        stats = dict(_stats)
+        per_minute = sum(1 for t in _recent if now - t <= 60)
+    return {'aktif': ENABLED, 'simpan_per_menit': per_minute, 'batas_per_menit': GLOBAL_RATE,
+            'token_global': round(global_bucket.level(), 1), 'burst_global': GLOBAL_BURST,
+            **ai_queue.status(), **stats}
@@ -0,0 +1,217 @@
+"""Layanan HTTP JSON untuk skoring antropometri WHO, untuk integrasi dengan sistem lain.
+
+    POST /score          satu anak (objek JSON) atau banyak anak (list / {"children": [...]})
+    POST /measurements   ingest massal ke database, dinilai dengan aturan yang sama
+    POST /sync           batch delta terkompresi dari perangkat offline (krenova sync push)
+    GET  /metrics        metrik performa format Prometheus (aktif dengan KRENOVA_METRICS=1)
+    GET  /health
+
+Jalankan dengan ``python -m krenova_core serve``.
+"""
+import asyncio
+import json
+import queue
+
+import pandas as pd
+from aiohttp import web
+
+from . import db, metrics, sync
+from .scoring import SCORE_COLUMNS, score_arrays, score_frame, scored_records
+
+SCORE_FIELDS = ['gender', 'berat_badan', 'tinggi_badan', 'lingkar_kepala']
+INGEST_FIELDS = ['nama_anak', 'alamat', 'tanggal_pengukuran'] + SCORE_FIELDS
+
+# ========= MICRO-BATCHING
+# Permintaan satu anak yang datang bersamaan dikumpulkan lalu diskor sekaligus dengan
+# score_arrays, sehingga biaya per permintaan tidak didominasi overhead per panggilan.
+class MicroBatcher:
+    def __init__(self, max_batch=512, max_wait=0.002):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = asyncio.Queue()
+        self.task = None
+
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+
+    async def score(self, rows):
+        if len(rows) >= self.max_batch:
+            # Batch besar sudah efisien sendiri; diskor di thread agar event loop tetap responsif
+            return await asyncio.to_thread(score_records, rows)
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((rows, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            size = len(batch[0][0])
+            deadline = loop.time() + self.max_wait
+            while size < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(item)
+                size += len(item[0])
+
+            try:
+                results = score_records([row for rows, _ in batch for row in rows])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            start = 0
+            for rows, future in batch:
+                future.set_result(results[start:start + len(rows)])
+                start += len(rows)
+
+@metrics.timed('api.score_records')
+def score_records(rows):
+    # Jalur cepat tanpa DataFrame; baris dengan tanggal (tanpa usia_bulan) lewat score_frame
+    if any(row.get('usia_bulan') is None for row in rows):
+        result = score_frame(pd.DataFrame(rows))[SCORE_COLUMNS].astype(object)
+        return result.where(result.notna(), None).to_dict('records')
+
+    def column(name):
+        return [row.get(name) for row in rows]
+
+    scores = score_arrays(
+        pd.to_numeric(column('usia_bulan'), errors='coerce'), column('gender'),
+        pd.to_numeric(column('berat_badan'), errors='coerce'),
+        pd.to_numeric(column('tinggi_badan'), errors='coerce'),
+        pd.to_numeric(column('lingkar_kepala'), errors='coerce'),
+    )
+    values = [[None if v is None or v != v else v.item() if hasattr(v, 'item') else v for v in scores[c]]
+              for c in SCORE_COLUMNS]
+    return [dict(zip(SCORE_COLUMNS, row)) for row in zip(*values)]
+
+# ========= VALIDASI INPUT
+def parse_children(payload):
+    if isinstance(payload, dict) and 'children' in payload:
+        payload = payload['children']
+    single = isinstance(payload, dict)
+    rows = [payload] if single else payload
+    if not isinstance(rows, list) or not all(isinstance(r, dict) for r in rows):
+        raise web.HTTPBadRequest(text=json.dumps({'error': "Body harus objek anak, list, atau {\"children\": [...]}"}),
+                                 content_type='application/json')
+    return rows, single
+
+def check_fields(rows, fields):
+    for i, row in enumerate(rows):
+        missing = [f for f in fields if row.get(f) in (None, '')]
+        if row.get('usia_bulan') is None and not (row.get('tanggal_lahir') and row.get('tanggal_pengukuran')):
+            missing.append('usia_bulan (atau tanggal_lahir + tanggal_pengukuran)')
+        if missing:
+            raise web.HTTPBadRequest(text=json.dumps({'error': f"Baris {i}: kolom wajib kosong: {', '.join(missing)}"}),
+                                     content_type='application/json')
+
+def check_dates(rows):
+    # Tanggal tak terbaca atau usia yang tak bisa ditentukan ditolak di sini (400), bukan saat skoring
+    for i, row in enumerate(rows):
+        dates = {name: pd.to_datetime(row[name], errors='coerce') for name in ('tanggal_lahir', 'tanggal_pengukuran')
+                 if row.get(name) not in (None, '')}
+        problems = [f"{name} bukan tanggal (YYYY-MM-DD)" for name, value in dates.items() if pd.isna(value)]
+        if row.get('usia_bulan') is not None:
+            age = pd.to_numeric(row['usia_bulan'], errors='coerce')
+            if pd.isna(age) or age < 0:
+                problems.append("usia_bulan harus angka >= 0")
+        elif not problems and dates['tanggal_lahir'] > dates['tanggal_pengukuran']:
+            problems.append("tanggal_lahir setelah tanggal_pengukuran")
+        if problems:
+            raise web.HTTPBadRequest(text=json.dumps({'error': f"Baris {i}: {'; '.join(problems)}"}),
+                                     content_type='application/json')
+
+async def read_json(request):
+    try:
+        return await request.json()
+    except json.JSONDecodeError:
+        raise web.HTTPBadRequest(text=json.dumps({'error': "Body bukan JSON yang valid"}),
+                                 content_type='application/json')
+
+# ========= HANDLER
+async def handle_score(request):
+    rows, single = parse_children(await read_json(request))
+    check_fields(rows, SCORE_FIELDS)
+    check_dates(rows)
+    results = await request.app[BATCHER].score(rows)
+    return web.json_response(results[0] if single else {'results': results})
+
+async def handle_measurements(request):
+    rows, _ = parse_children(await read_json(request))
+    check_fields(rows, INGEST_FIELDS)
+    check_dates(rows)
+    username = request.headers.get('X-Krenova-User', 'api')
+
+    def write():
+        # Skoring ikut di thread: batch besar tidak menahan event loop
+        records = list(scored_records(score_frame(pd.DataFrame(rows))))
+        with db.pooled_connection(request.app[POOL]) as conn:
+            return db.save_measurements_bulk(records, username, conn=conn)
+
+    ids = await asyncio.to_thread(write)
+    return web.json_response({'inserted': len(ids), 'ids': ids}, status=201)
+
+async def handle_sync(request):
+    # Batch delta dari perangkat offline (gzip JSON, lihat krenova_core.sync)
+    try:
+        batch = sync.decode(await request.read())
+    except (OSError, ValueError):
+        raise web.HTTPBadRequest(text=json.dumps({'error': "Body bukan batch gzip JSON yang valid"}),
+                                 content_type='application/json')
+
+    def apply():
+        with db.pooled_connection(request.app[POOL]) as conn:
+            return sync.apply_batch(batch, conn)
+
+    try:
+        result = await asyncio.to_thread(apply)
+    except (KeyError, ValueError) as e:
+        raise web.HTTPBadRequest(text=json.dumps({'error': f"Batch tidak valid: {e}"}),
+                                 content_type='application/json')
+    return web.Response(body=sync.encode(result), content_type='application/gzip')
+
+async def handle_metrics(request):
+    return web.Response(text=metrics.prometheus_text(), content_type='text/plain', charset='utf-8',
+                        headers={'X-Content-Type-Options': 'nosniff'})
+
+async def handle_health(request):
+    return web.json_response({'status': 'ok'})
+
+# ========= APLIKASI
+POOL = web.AppKey('pool', queue.Queue)
+BATCHER = web.AppKey('batcher', MicroBatcher)
+
+def create_app(pool_size=4):
+    app = web.Application(client_max_size=64 * 1024 * 1024)
+    app.router.add_post('/score', handle_score)
+    app.router.add_post('/measurements', handle_measurements)
+    app.router.add_post('/sync', handle_sync)
+    app.router.add_get('/metrics', handle_metrics)
+    app.router.add_get('/health', handle_health)
+
+    async def on_startup(app):
+        db.init_database()
+        app[POOL] = db.create_pool(pool_size)
+        app[BATCHER] = MicroBatcher()
+        app[BATCHER].start()
+
+    async def on_cleanup(app):
+        await app[BATCHER].stop()
+        while not app[POOL].empty():
+            app[POOL].get_nowait().close()
+
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+def serve(host='0.0.0.0', port=8502, pool_size=4):
+    web.run_app(create_app(pool_size), host=host, port=port)
@@ -0,0 +1,251 @@
+"""Backup online & arsip tahunan untuk database SQLite.
+
+Backup memakai API backup SQLite beberapa halaman per langkah dengan jeda di antaranya, jadi
+penulis (form skrining, API) tidak pernah menunggu lama. Pengukuran yang lebih tua dari batas
+usia dipindah ke database arsip per tahun (``krenova_data_arsip_2021.db``) yang di-ATTACH
+read-only untuk query riwayat, sehingga tabel measurements utama tetap kecil.
+
+PostgreSQL tidak memakai modul ini: gunakan pg_dump / backup server database.
+"""
+import glob
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+from urllib.parse import quote
+
+from . import db, storage
+from .distribution import delete_trigger_sql
+from .metrics import count, timed
+
+# Halaman per langkah backup (halaman 4 KB → ±1 MB) dan jeda antar langkah (detik)
+BACKUP_PAGES = 256
+BACKUP_SLEEP = 0.02
+# Setiap penulisan dari koneksi lain membuat backup mulai ulang; setelah batas ini sisa
+# backup disalin dalam satu langkah (di mode WAL tetap tidak memblokir penulis)
+BACKUP_MAX_RESTARTS = 5
+BACKUP_KEEP = int(os.environ.get('KRENOVA_BACKUP_KEEP', 7))
+# Pengukuran lebih tua dari ini (tahun) dipindah ke arsip; anak sudah lewat usia balita
+ARCHIVE_AGE_YEARS = int(os.environ.get('KRENOVA_ARSIP_TAHUN', 5))
+# Batas bawaan SQLite adalah 10 database ATTACH per koneksi
+MAX_ATTACHED = 10
+ARCHIVE_VIEW = 'measurements_semua'
+
+def require_sqlite(db_path):
+    if storage.is_postgres(db_path):
+        raise ValueError("Backup & arsip hanya untuk SQLite; untuk PostgreSQL gunakan pg_dump")
+
+# ========= BACKUP ONLINE
+class BackupRestarted(Exception):
+    pass
+
+@timed()
+def backup_database(dest, db_path=None, pages=BACKUP_PAGES, sleep=BACKUP_SLEEP):
+    """Salin database ke `dest` saat aplikasi tetap berjalan. Mengembalikan jumlah mulai ulang."""
+    db_path = db_path or db.DB_PATH
+    require_sqlite(db_path)
+    # Ditulis ke file sementara dulu: backup lama tetap utuh jika proses terhenti di tengah
+    tmp = f"{dest}.tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    state = {'remaining': None, 'restarts': 0}
+
+    def progress(status, remaining, total):
+        if state['remaining'] is not None and remaining > state['remaining']:
+            state['restarts'] += 1
+            if state['restarts'] > BACKUP_MAX_RESTARTS:
+                raise BackupRestarted()
+        state['remaining'] = remaining
+
+    src = sqlite3.connect(db_path)
+    dst = sqlite3.connect(tmp)
+    try:
+        try:
+            src.backup(dst, pages=pages, sleep=sleep, progress=progress)
+        except BackupRestarted:
+            count('backup_restarts_total', state['restarts'])
+            src.backup(dst)
+        # File backup berdiri sendiri (tanpa -wal) agar bisa langsung disalin/dipulihkan
+        dst.execute("PRAGMA journal_mode=DELETE")
+    finally:
+        dst.close()
+        src.close()
+    os.replace(tmp, dest)
+    return state['restarts']
+
+def backup_name(db_path, when=None):
+    stem = os.path.splitext(os.path.basename(db_path))[0]
+    return f"{stem}-{(when or datetime.now()).strftime('%Y%m%d-%H%M%S')}.db"
+
+def list_backups(directory, db_path=None):
+    stem = os.path.splitext(os.path.basename(db_path or db.DB_PATH))[0]
+    return sorted(glob.glob(os.path.join(directory, f"{stem}-*.db")))
+
+def backup_to_directory(directory, keep=BACKUP_KEEP, db_path=None):
+    """Backup bertanda waktu ke `directory`, lalu hapus backup lama melebihi `keep` file."""
+    db_path = db_path or db.DB_PATH
+    os.makedirs(directory, exist_ok=True)
+    dest = os.path.join(directory, backup_name(db_path))
+    backup_database(dest, db_path)
+    for old in list_backups(directory, db_path)[:-keep] if keep > 0 else []:
+        os.remove(old)
+    return dest
+
+_scheduler = None
+
+def start_backup_scheduler(directory, interval_hours=24, keep=BACKUP_KEEP):
+    """Backup berkala di thread latar (sekali per proses), mis. dari krenova.py."""
+    global _scheduler
+    if _scheduler is not None:
+        return
+
+    def run():
+        while True:
+            backups = list_backups(directory)
+            last = os.path.getmtime(backups[-1]) if backups else 0
+            wait = last + interval_hours * 3600 - time.time()
+            if wait > 0:
+                time.sleep(min(wait, 3600))
+                continue
+            try:
+                backup_to_directory(directory, keep)
+            except (OSError, sqlite3.Error):
+                count('backup_failures_total')
+                time.sleep(600)
+
+    _scheduler = threading.Thread(target=run, name='krenova-backup', daemon=True)
+    _scheduler.start()
+
+# ========= ARSIP TAHUNAN
+def archive_path(year, db_path=None):
+    db_path = db_path or db.DB_PATH
+    stem = os.path.splitext(os.path.basename(db_path))[0]
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), f"{stem}_arsip_{year}.db")
+
+def archive_files(db_path=None):
+    """{tahun: path} untuk semua database arsip di samping database utama."""
+    if storage.is_postgres(db_path or db.DB_PATH):
+        return {}
+    pattern = re.compile(r'_arsip_(\d{4})\.db$')
+    files = {}
+    for path in glob.glob(archive_path('*', db_path)):
+        match = pattern.search(path)
+        if match:
+            files[int(match.group(1))] = path
+    return dict(sorted(files.items()))
+
+def years_ago(today, years):
+    try:
+        return today.replace(year=today.year - years)
+    except ValueError:
+        # 29 Februari
+        return today.replace(year=today.year - years, day=28)
+
+def table_columns(c, schema='main'):
+    return [row[1] for row in c.execute(f"PRAGMA {schema}.table_info(measurements)")]
+
+@timed()
+def archive_measurements(older_than_years=ARCHIVE_AGE_YEARS, today=None, db_path=None):
+    """Pindahkan pengukuran lebih tua dari `older_than_years` ke database arsip per tahun.
+
+    Mengembalikan {tahun: jumlah baris dipindah}. Aman dijalankan ulang: baris disalin dulu
+    (INSERT OR IGNORE berdasarkan id), baru dihapus dari tabel utama.
+    """
+    db_path = db_path or db.DB_PATH
+    require_sqlite(db_path)
+    cutoff = years_ago(today or date.today(), older_than_years).isoformat()
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA busy_timeout=5000")
+    c = conn.cursor()
+    columns = table_columns(c)
+    types = {row[1]: row[2] for row in c.execute("PRAGMA main.table_info(measurements)")}
+    schema = c.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name='measurements'").fetchone()[0]
+    schema = re.sub(r'^CREATE TABLE\s+("?)measurements\1', 'CREATE TABLE IF NOT EXISTS arsip.measurements', schema)
+
+    # Perangkat offline: baris yang perubahannya belum terkirim ke pusat tidak diarsipkan, dan
+    # penghapusan karena arsip tidak dicatat ke jurnal sinkronisasi
+    journal = c.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='change_log'").fetchone()
+    where = "tanggal_pengukuran < ? AND substr(tanggal_pengukuran, 1, 4) = ?"
+    if journal:
+        where += " AND uid NOT IN (SELECT uid FROM change_log)"
+
+    years = [row[0] for row in c.execute(f'''SELECT DISTINCT substr(tanggal_pengukuran, 1, 4) FROM measurements
+                                              WHERE tanggal_pengukuran < ? ORDER BY 1''', (cutoff,))]
+    moved = {}
+    for year in years:
+        c.execute("ATTACH DATABASE ? AS arsip", (archive_path(year, db_path),))
+        try:
+            c.execute(schema)
+            # Kolom yang ditambahkan migrasi setelah arsip dibuat
+            existing = set(table_columns(c, 'arsip'))
+            for name in columns:
+                if name not in existing:
+                    c.execute(f"ALTER TABLE arsip.measurements ADD COLUMN {name} {types[name]}")
+            c.execute("CREATE INDEX IF NOT EXISTS arsip.idx_arsip_child ON measurements(child_key, tanggal_pengukuran)")
+            c.execute("CREATE INDEX IF NOT EXISTS arsip.idx_arsip_alamat ON measurements(alamat)")
+            cols = ', '.join(columns)
+            c.execute(f"INSERT OR IGNORE INTO arsip.measurements ({cols}) SELECT {cols} FROM main.measurements WHERE {where}",
+                      (cutoff, year))
+            # Di mode WAL commit lintas file tidak atomik: salinan di-commit sebelum penghapusan
+            conn.commit()
+
+            last_seq = c.execute("SELECT COALESCE(MAX(seq), 0) FROM change_log").fetchone()[0] if journal else 0
+            # Ringkasan distribusi Z-Score tetap memuat tahun yang diarsipkan: trigger hapusnya
+            # dilepas hanya di dalam transaksi ini (DDL SQLite ikut transaksi)
+            summaries = c.execute("SELECT 1 FROM sqlite_master WHERE type='trigger' AND name='zscore_summary_delete'"
+                                  ).fetchone()
+            drop_trigger, create_trigger = delete_trigger_sql()
+            c.execute("BEGIN")
+            if summaries:
+                c.execute(drop_trigger)
+            c.execute(f'''DELETE FROM main.measurements
+                          WHERE {where} AND id IN (SELECT id FROM arsip.measurements)''', (cutoff, year))
+            moved[int(year)] = c.rowcount
+            if summaries:
+                c.execute(create_trigger)
+            if journal:
+                c.execute("DELETE FROM change_log WHERE seq > ?", (last_seq,))
+            conn.commit()
+        finally:
+            c.execute("DETACH DATABASE arsip")
+    conn.close()
+    count('archived_rows_total', sum(moved.values()))
+    return moved
+
+def attach_archives(conn, db_path=None):
+    """ATTACH arsip tahunan (read-only) ke koneksi SQLite dan buat view sementara gabungan.
+
+    Mengembalikan nama tabel/view yang dipakai untuk query: ``measurements`` jika belum ada arsip.
+    Koneksi harus dibuka dengan ``uri=True`` (lihat db.get_connection).
+    """
+    files = archive_files(db_path)
+    if not files:
+        return 'measurements'
+    c = conn.cursor()
+    columns = table_columns(c)
+    parts = [f"SELECT {', '.join(columns)} FROM main.measurements"]
+    attached = {row[1] for row in c.execute("PRAGMA database_list")}
+    # Arsip terbaru diutamakan jika jumlah tahun melebihi batas ATTACH SQLite
+    for year, path in list(files.items())[-MAX_ATTACHED:]:
+        alias = f"arsip_{year}"
+        if alias not in attached:
+            c.execute(f"ATTACH DATABASE ? AS {alias}", (f"file:{quote(os.path.abspath(path))}?mode=ro",))
+        existing = set(table_columns(c, alias))
+        select = ', '.join(name if name in existing else f"NULL AS {name}" for name in columns)
+        # Baris yang (karena arsip terhenti di tengah) masih ada di tabel utama tidak dihitung dua kali
+        parts.append(f"SELECT {select} FROM {alias}.measurements WHERE id NOT IN (SELECT id FROM main.measurements)")
+    c.execute(f"DROP VIEW IF EXISTS temp.{ARCHIVE_VIEW}")
+    c.execute(f"CREATE TEMP VIEW {ARCHIVE_VIEW} AS {' UNION ALL '.join(parts)}")
+    return ARCHIVE_VIEW
+
+def archive_summary(db_path=None):
+    """Jumlah baris & ukuran file per database arsip."""
+    rows = []
+    for year, path in archive_files(db_path).items():
+        conn = sqlite3.connect(f"file:{quote(os.path.abspath(path))}?mode=ro", uri=True)
+        n = conn.execute("SELECT COUNT(*) FROM measurements").fetchone()[0]
+        conn.close()
+        rows.append({'tahun': year, 'baris': n, 'ukuran_mb': round(os.path.getsize(path) / 2**20, 2), 'file': path})
+    return rows
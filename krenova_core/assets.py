@@ -0,0 +1,103 @@
+"""Varian gambar statis (header & foto profil) yang diperkecil dan dikompres.
+
+PNG asli (header 2,5 MB) diubah ke AVIF & WebP selebar tampilan aslinya ×2 (layar HiDPI),
+lalu ditulis ke folder ``static/`` yang dilayani langsung oleh Streamlit
+(``server.enableStaticServing``). URL diberi ``?v=<hash isi>`` sehingga browser boleh
+menyimpan file selamanya dan cukup mengunduh ulang jika gambarnya berubah. Tanpa static
+serving, byte WebP dari cache memori dikirim lewat ``st.image``.
+"""
+import hashlib
+import io
+import os
+from functools import lru_cache
+from pathlib import Path
+
+from .metrics import register_cache, timed
+
+# Relatif terhadap krenova.py, bukan direktori kerja proses (aplikasi bisa dijalankan dari mana saja)
+APP_DIR = Path(__file__).resolve().parent.parent
+STATIC_DIR = str(APP_DIR / 'static')
+# nama -> (file sumber, lebar varian px)
+ASSETS = {
+    'header': ('header situmbuh.png', 1200),
+    'khusna': ('Khusna.png', 500),
+    'mayang': ('Mayang.png', 500),
+    'via': ('Via.png', 500),
+}
+# Urutan = prioritas di <picture>: browser memakai format pertama yang didukung.
+# speed/method dipilih agar seluruh varian dibuat < 1 detik saat start pertama
+FORMATS = {
+    'avif': {'quality': 55, 'speed': 8},
+    'webp': {'quality': 80, 'method': 4},
+}
+
+@lru_cache(maxsize=None)
+def supported_formats():
+    from PIL import features
+    return [fmt for fmt in FORMATS if features.check(fmt)]
+
+def variant_name(name, fmt):
+    return f"{name}-{ASSETS[name][1]}.{fmt}"
+
+@timed()
+def build_assets(source_dir=str(APP_DIR), static_dir=STATIC_DIR, force=False):
+    """Buat varian yang belum ada atau lebih tua dari sumbernya. Mengembalikan ringkasan ukuran."""
+    from PIL import Image
+
+    os.makedirs(static_dir, exist_ok=True)
+    formats = supported_formats()
+    rows = []
+    for name, (source, width) in ASSETS.items():
+        source_path = os.path.join(source_dir, source)
+        if not os.path.exists(source_path):
+            continue
+        image = None
+        for fmt in formats:
+            path = os.path.join(static_dir, variant_name(name, fmt))
+            if force or not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(source_path):
+                if image is None:
+                    image = Image.open(source_path)
+                    image.thumbnail((width, image.height), Image.LANCZOS)
+                # Tulis lewat file sementara: sesi lain bisa sedang membaca varian lama, dan
+                # beberapa proses bisa membuat varian yang sama bersamaan (nama per proses)
+                tmp = f"{path}.{os.getpid()}.tmp"
+                image.save(tmp, format=fmt.upper(), **FORMATS[fmt])
+                os.replace(tmp, path)
+            rows.append({'gambar': name, 'format': fmt, 'asli_kb': round(os.path.getsize(source_path) / 1024, 1),
+                         'varian_kb': round(os.path.getsize(path) / 1024, 1)})
+    for cached in (asset_bytes, asset_url, image_size):
+        cached.cache_clear()
+    return rows
+
+@lru_cache(maxsize=None)
+def asset_bytes(name, fmt='webp', static_dir=STATIC_DIR):
+    """Isi varian (dibaca sekali per proses)."""
+    path = os.path.join(static_dir, variant_name(name, fmt))
+    if not os.path.exists(path):
+        build_assets(static_dir=static_dir)
+    with open(path, 'rb') as f:
+        return f.read()
+
+register_cache('asset_bytes', asset_bytes)
+
+@lru_cache(maxsize=None)
+def asset_url(name, fmt):
+    version = hashlib.sha1(asset_bytes(name, fmt)).hexdigest()[:12]
+    return f"app/static/{variant_name(name, fmt)}?v={version}"
+
+def picture_html(name, alt, lazy=False, formats=None):
+    """Tag <picture> AVIF/WebP untuk static serving Streamlit. Format terakhir menjadi <img> cadangan."""
+    formats = formats or supported_formats()
+    sources = ''.join(f'<source srcset="{asset_url(name, fmt)}" type="image/{fmt}">' for fmt in formats[:-1])
+    width, height = image_size(name)
+    loading = ' loading="lazy"' if lazy else ''
+    return (f'<picture>{sources}<img src="{asset_url(name, formats[-1])}" alt="{alt}" width="{width}" '
+            f'height="{height}" decoding="async"{loading} style="width: 100%; height: auto;"></picture>')
+
+@lru_cache(maxsize=None)
+def image_size(name):
+    # Dimensi varian untuk atribut width/height (mencegah layout bergeser saat gambar dimuat)
+    from PIL import Image
+
+    with Image.open(io.BytesIO(asset_bytes(name))) as image:
+        return image.size
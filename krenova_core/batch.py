@@ -0,0 +1,184 @@
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+from . import db
+from .db import get_connection
+from .growth import rebuild_child_alerts, refresh_child_state
+from .plausibility import VISIT_MASK, WHO_LIMITS, cutoff_flags
+from .reference import age_in_months_array
+from .scoring import SCORE_COLUMNS, score_frame, scoring_version
+
+DEFAULT_CHUNKSIZE = 50_000
+
+# ========= UTILITAS BATCH
+def bounded_map(fn, iterable, jobs=1):
+    """Seperti executor.map berurutan, tetapi hanya 2 x jobs chunk yang ditahan di memori."""
+    if jobs <= 1:
+        for item in iterable:
+            yield fn(item)
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        pending = deque()
+        for item in iterable:
+            pending.append(executor.submit(fn, item))
+            if len(pending) >= 2 * jobs:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def db_rows(df, columns):
+    # NaN -> NULL dan tipe numpy -> tipe Python agar bisa dipakai executemany sqlite3
+    # (per kolom: Series.tolist() sudah menghasilkan tipe Python)
+    values = []
+    for col in columns:
+        missing = df[col].isna().to_numpy()
+        values.append([None if m else v for m, v in zip(missing, df[col].tolist())])
+    return list(zip(*values))
+
+def write_frames(frames, path):
+    """Tulis aliran DataFrame ke satu file Parquet atau CSV (berdasarkan ekstensi)."""
+    path = Path(path)
+    total = 0
+    if path.suffix.lower() == '.parquet':
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        writer, schema = None, None
+        try:
+            for frame in frames:
+                if writer is None:
+                    table = pa.Table.from_pandas(frame, preserve_index=False)
+                    # Kolom yang seluruhnya kosong di chunk pertama disimpan sebagai string
+                    schema = pa.schema([pa.field(f.name, pa.string()) if pa.types.is_null(f.type) else f
+                                        for f in table.schema])
+                    writer = pq.ParquetWriter(path, schema)
+                writer.write_table(pa.Table.from_pandas(frame, schema=schema, preserve_index=False))
+                total += len(frame)
+        finally:
+            if writer is not None:
+                writer.close()
+    else:
+        for i, frame in enumerate(frames):
+            frame.to_csv(path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+            total += len(frame)
+    return total
+
+# ========= SKORING FILE
+def score_file(input_path, output_path, jobs=1, chunksize=DEFAULT_CHUNKSIZE):
+    """Skor file CSV pengukuran secara streaming per chunk, opsional di beberapa core."""
+    chunks = pd.read_csv(input_path, chunksize=chunksize)
+    return write_frames(bounded_map(score_frame, chunks, jobs), output_path)
+
+# ========= SKORING ULANG DATABASE
+# Dijalankan setelah tabel WHO, aturan status, atau SCORING_REVISION berubah. Hanya baris dengan
+# scoring_version lama yang ditulis ulang; baris yang diedit/disimpan selama job berjalan sudah
+# memakai versi terbaru sehingga tidak ditimpa. Transaksi tulis dibuat kecil (per rentang id) dan
+# database memakai WAL, jadi skrining tetap bisa menyimpan data selama job berjalan.
+RESCORE_CHUNKSIZE = 2_000
+# Jeda setelah tiap commit: busy handler SQLite menunggu dengan backoff, tanpa jeda penulis lain
+# (form skrining, API) bisa kalah terus oleh job ini
+RESCORE_PAUSE = 0.05
+RESCORE_COLUMNS = ['usia_bulan'] + SCORE_COLUMNS + ['scoring_version', 'cutoff_flags', 'id', 'version_guard']
+# Bit batas WHO mengikuti Z-Score baru; bit antar kunjungan dipertahankan
+RESCORE_SQL = f'''UPDATE measurements
+                 SET usia_bulan=?, wfa_zscore=?, wfa_status=?, hfa_zscore=?, hfa_status=?,
+                     wfh_zscore=?, wfh_status=?, hcfa_zscore=?, hcfa_status=?,
+                     risiko_stunting_persen=?, status_stunting=?, scoring_version=?,
+                     biv_flags=(biv_flags & {VISIT_MASK}) | ?
+                 WHERE id=? AND (scoring_version IS NULL OR scoring_version <> ?)'''
+
+def rescore_range(task):
+    """Worker: baca & skor baris id (lo, hi] yang versinya lama. Hanya membaca database."""
+    db_path, lo, hi, version, recompute_age = task
+    conn = get_connection(db_path)
+    chunk = pd.read_sql_query('''SELECT id, child_key, usia_bulan, tanggal_lahir, tanggal_pengukuran, gender,
+                                        berat_badan, tinggi_badan, lingkar_kepala
+                                 FROM measurements
+                                 WHERE id > ? AND id <= ? AND (scoring_version IS NULL OR scoring_version <> ?)''',
+                              conn, params=(lo, hi, version))
+    if chunk.empty:
+        conn.close()
+        return hi, [], [], []
+    # Cache child_state hanya bergantung pada dua kunjungan terakhir anak: cukup segarkan anak
+    # yang salah satu kunjungan tersebut ada di rentang ini
+    latest = pd.read_sql_query('''SELECT child_key, id FROM (
+                                     SELECT child_key, id, ROW_NUMBER() OVER (
+                                         PARTITION BY child_key ORDER BY tanggal_pengukuran DESC, id DESC) AS rn
+                                     FROM measurements
+                                     WHERE child_key IN (SELECT child_key FROM measurements WHERE id > ? AND id <= ?))
+                                  WHERE rn <= 2''', conn, params=(lo, hi))
+    conn.close()
+    keys = latest.loc[latest['id'].isin(chunk['id']), 'child_key'].unique().tolist()
+
+    if recompute_age:
+        # Usia dihitung ulang dari tanggal lahir (jika ada) saat rumus usia berubah
+        ages = age_in_months_array(chunk['tanggal_lahir'], chunk['tanggal_pengukuran'])
+        chunk['usia_bulan'] = ages.where(chunk['tanggal_lahir'].notna(), chunk['usia_bulan']).values
+    scored = score_frame(chunk).assign(scoring_version=version, version_guard=version)
+    scored['cutoff_flags'] = cutoff_flags({k: scored[f'{k}_zscore'] for k in WHO_LIMITS})
+    # Peringatan gagal tumbuh bergantung pada setiap kunjungan: semua anak di rentang ini dihitung ulang
+    return hi, db_rows(scored, RESCORE_COLUMNS), keys, chunk['child_key'].dropna().unique().tolist()
+
+def rescore_measurements(db_path=None, chunksize=RESCORE_CHUNKSIZE, jobs=1, recompute_age=False, progress=None,
+                         pause=RESCORE_PAUSE):
+    """Skor ulang measurements ke scoring_version() terbaru, per rentang id di beberapa proses.
+
+    Progres disimpan di rescore_checkpoints dalam transaksi yang sama dengan hasil skoring,
+    sehingga job yang terhenti dilanjutkan dari rentang id terakhir yang selesai.
+    Mengembalikan (jumlah baris diskor ulang pada run ini, True jika melanjutkan checkpoint).
+    """
+    db_path = db_path or db.DB_PATH
+    version = scoring_version()
+    conn = get_connection(db_path)
+    c = conn.cursor()
+    max_id = c.execute("SELECT COALESCE(MAX(id), 0) FROM measurements").fetchone()[0]
+    checkpoint = c.execute('''SELECT last_id FROM rescore_checkpoints
+                              WHERE scoring_version=? AND finished_at IS NULL''', (version,)).fetchone()
+    resumed = checkpoint is not None
+    last_id = checkpoint[0] if resumed else 0
+    c.execute('''INSERT INTO rescore_checkpoints (scoring_version, last_id, max_id, rows_done, updated_at)
+                 VALUES (?, ?, ?, 0, CURRENT_TIMESTAMP)
+                 ON CONFLICT(scoring_version) DO UPDATE
+                 SET last_id=excluded.last_id, max_id=excluded.max_id, finished_at=NULL,
+                     rows_done=CASE WHEN ? THEN rescore_checkpoints.rows_done ELSE 0 END,
+                     updated_at=CURRENT_TIMESTAMP''', (version, last_id, max_id, resumed))
+    conn.commit()
+
+    tasks = ((db_path, lo, min(lo + chunksize, max_id), version, recompute_age)
+             for lo in range(last_id, max_id, chunksize))
+    total = 0
+    for hi, rows, keys, alert_keys in bounded_map(rescore_range, tasks, jobs):
+        c.executemany(RESCORE_SQL, rows)
+        changed = max(c.rowcount, 0)
+        # Cache z-score terakhir anak & peringatan dari z-score lama ikut diperbarui dalam transaksi yang sama
+        for key in keys:
+            refresh_child_state(c, key)
+        for key in alert_keys:
+            rebuild_child_alerts(c, key)
+        c.execute('''UPDATE rescore_checkpoints
+                     SET last_id=?, rows_done=rows_done + ?, updated_at=CURRENT_TIMESTAMP
+                     WHERE scoring_version=?''', (hi, changed, version))
+        conn.commit()
+        time.sleep(pause)
+        total += changed
+        if progress:
+            progress(total, hi, max_id)
+
+    c.execute("UPDATE rescore_checkpoints SET finished_at=CURRENT_TIMESTAMP WHERE scoring_version=?", (version,))
+    conn.commit()
+    conn.close()
+    return total, resumed
+
+def rescore_status(db_path=None):
+    """Jumlah baris per scoring_version dan riwayat checkpoint job skoring ulang."""
+    conn = get_connection(db_path)
+    versions = pd.read_sql_query('''SELECT scoring_version, COUNT(*) AS jumlah
+                                    FROM measurements GROUP BY scoring_version ORDER BY jumlah DESC''', conn)
+    checkpoints = pd.read_sql_query("SELECT * FROM rescore_checkpoints ORDER BY started_at DESC", conn)
+    conn.close()
+    return versions, checkpoints
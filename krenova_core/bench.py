@@ -0,0 +1,236 @@
+"""Benchmark SI Tumbuh dengan populasi balita sintetis dari distribusi LMS WHO.
+
+    python -m krenova_core bench --sizes 1k,100k -o hasil.json [--compare baseline.json]
+    python -m krenova_core generate 100k -o populasi.csv
+
+Setiap ukuran populasi ditulis ke database sementara, lalu skoring (satu anak & batch),
+save_measurement, get_all_measurements, agregasi dashboard, ekspor CSV, dan pencarian nama
+diukur beberapa kali. Hasil disimpan sebagai JSON agar bisa dibandingkan antar-run.
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from . import db
+from .growth import make_child_key
+from .reference import age_in_months_array, lookup_lms, measurement_type, who_inverse
+from .scoring import SCORE_COLUMNS, score_frame, score_measurement, scoring_version
+
+SIZES = {'1k': 1_000, '100k': 100_000, '1m': 1_000_000}
+DUKUH = ["Karangasem", "Bentak", "Gonggangan", "Sukolelo", "Pijinan"]
+VISITS_PER_CHILD = 6
+REFERENCE_DATE = np.datetime64('2026-01-01')
+
+# Sebaran Z-Score populasi (rata-rata, SD): sedikit di bawah median WHO, seperti data posyandu
+POPULATION_Z = {'hfa': (-1.0, 1.1), 'wfh': (-0.3, 1.0), 'hcfa': (-0.2, 1.0)}
+
+FIRST_NAMES = ["Aisyah", "Ahmad", "Bima", "Citra", "Dewi", "Dimas", "Eka", "Fajar", "Gilang", "Hana",
+               "Intan", "Joko", "Kirana", "Laras", "Mayang", "Nadia", "Putri", "Raka", "Sari", "Tegar",
+               "Umi", "Vina", "Wahyu", "Yoga", "Zahra", "Bagus", "Dinda", "Rizky", "Salsa", "Arya"]
+LAST_NAMES = ["Pratama", "Lestari", "Saputra", "Wulandari", "Nugroho", "Rahmawati", "Setiawan",
+              "Kusuma", "Hidayat", "Anggraini", "Santoso", "Permata", "Ramadhan", "Maharani",
+              "Wijaya", "Utami", "Prasetyo", "Puspita", "Firmansyah", "Safitri"]
+
+# ========= POPULASI SINTETIS
+def generate_population(n, n_dukuh=40, visits=VISITS_PER_CHILD, seed=0):
+    """`n` baris pengukuran: anak dengan kunjungan bulanan, ukuran tubuh ditarik dari LMS WHO.
+
+    Z-Score laten tiap anak (TB/U, BB/TB, LK/U) diubah menjadi tinggi, berat, dan lingkar
+    kepala dengan kebalikan rumus LMS, ditambah sedikit noise antar kunjungan.
+    """
+    rng = np.random.default_rng(seed)
+    dukuh = DUKUH[:n_dukuh] + [f"Dukuh {i:02d}" for i in range(len(DUKUH) + 1, n_dukuh + 1)]
+    n_children = -(-n // visits)
+
+    sex = rng.choice(np.array(['L', 'P'], dtype=object), n_children)
+    first_age = rng.integers(0, 61 - visits, n_children)
+    birth = REFERENCE_DATE - (first_age + visits) * 30 - rng.integers(0, 30, n_children)
+    names = (rng.choice(np.array(FIRST_NAMES, dtype=object), n_children) + " "
+             + rng.choice(np.array(LAST_NAMES, dtype=object), n_children))
+    latent = {ind: rng.normal(mean, sd, n_children) for ind, (mean, sd) in POPULATION_Z.items()}
+
+    child = np.repeat(np.arange(n_children), visits)[:n]
+    visit = np.tile(np.arange(visits), n_children)[:n]
+    measured = birth[child] + np.rint((first_age[child] + visit) * 30.4375).astype(int) + rng.integers(0, 7, n)
+    age = age_in_months_array(birth[child], measured).to_numpy(dtype=float)
+    sex_rows = sex[child]
+
+    def draw(indicator, x, m_type=None, noise=0.15):
+        z = np.clip(latent[indicator][child] + rng.normal(0, noise, n), -4.5, 4.5)
+        return who_inverse(z, *lookup_lms(indicator, x, sex_rows, m_type))
+
+    height = np.round(draw('hfa', age), 1)
+    m_type = np.where(age < 24, measurement_type(0), measurement_type(24)).astype(object)
+    # Tabel BB/TB hanya 45-110 cm (terlentang) dan 65-120 cm (berdiri)
+    wfh_height = np.clip(np.round(height * 2) / 2, np.where(age < 24, 45, 65), np.where(age < 24, 110, 120))
+    weight = np.round(draw('wfh', wfh_height, m_type), 1)
+    hc = np.round(draw('hcfa', age), 1)
+
+    return pd.DataFrame({
+        'tanggal_pengukuran': pd.to_datetime(measured).strftime('%Y-%m-%d'),
+        'nama_anak': names[child],
+        'usia_bulan': age.astype(int),
+        'gender': sex_rows,
+        'alamat': rng.choice(np.array(dukuh, dtype=object), n_children)[child],
+        'berat_badan': weight,
+        'tinggi_badan': height,
+        'lingkar_kepala': hc,
+        'tanggal_lahir': pd.to_datetime(birth[child]).strftime('%Y-%m-%d'),
+    })
+
+SEED_COLUMNS = ['tanggal_pengukuran', 'nama_anak', 'usia_bulan', 'gender', 'alamat', 'berat_badan',
+                'tinggi_badan', 'lingkar_kepala', 'tanggal_lahir'] + SCORE_COLUMNS + [
+                'created_by', 'child_key', 'scoring_version', 'uid']
+
+def seed_database(population, db_path):
+    """Isi database baru dengan populasi yang sudah diskor (insert massal, bukan per baris).
+
+    Cache child_state diisi dari kunjungan terakhir tiap anak agar save_measurement berikutnya
+    berjalan seperti di database produksi.
+    """
+    from .batch import db_rows
+
+    db.DB_PATH = str(db_path)
+    db.init_database()
+    scored = score_frame(population).assign(created_by='bench', scoring_version=scoring_version())
+    scored['child_key'] = [make_child_key(*r) for r in
+                           zip(scored['nama_anak'], scored['tanggal_lahir'], scored['gender'], scored['alamat'])]
+    scored['uid'] = [uuid.uuid4().hex for _ in range(len(scored))]
+
+    conn = db.get_connection()
+    c = conn.cursor()
+    # Nama, tanggal lahir & dukuh acak bisa kebetulan sama: duplikat kunci alami dilewati
+    c.executemany(f"INSERT OR IGNORE INTO measurements ({', '.join(SEED_COLUMNS)}) VALUES ({', '.join('?' * len(SEED_COLUMNS))})",
+                  db_rows(scored, SEED_COLUMNS))
+    c.execute('''INSERT OR REPLACE INTO child_state
+                 (child_key, last_measurement_id, last_date, last_age, wfa_zscore, hfa_zscore)
+                 SELECT child_key, id, tanggal_pengukuran, usia_bulan, wfa_zscore, hfa_zscore FROM (
+                     SELECT *, ROW_NUMBER() OVER (
+                         PARTITION BY child_key ORDER BY tanggal_pengukuran DESC, id DESC) AS rn
+                     FROM measurements)
+                 WHERE rn = 1''')
+    conn.commit()
+    conn.close()
+
+# ========= PENGUKURAN WAKTU
+def measure(fn, repeat, number=1):
+    """Jalankan fn `number` kali per ulangan; kembalikan detik per panggilan untuk tiap ulangan."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - start) / number)
+    return times
+
+def summarize(name, size, rows, times, items=1):
+    return {
+        'size': size, 'rows': rows, 'benchmark': name, 'repeat': len(times), 'items': items,
+        'median_s': statistics.median(times), 'min_s': min(times), 'max_s': max(times),
+        'per_second': round(items / statistics.median(times), 1),
+    }
+
+# ========= SUITE
+def run_size(size, workdir, repeat=5, seed=0, log=print):
+    n = SIZES[size]
+    population = generate_population(n, seed=seed)
+    db_path = Path(workdir) / f"bench-{size}.db"
+    for suffix in ('', '-wal', '-shm'):
+        Path(f"{db_path}{suffix}").unlink(missing_ok=True)
+    start = time.perf_counter()
+    seed_database(population, db_path)
+    log(f"[{size}] {n} baris disiapkan ({time.perf_counter() - start:.1f} detik)")
+
+    results = []
+    def record(name, times, items=1):
+        results.append(summarize(name, size, n, times, items))
+        log(f"[{size}] {name:<24} median {results[-1]['median_s'] * 1000:10.2f} ms  ({results[-1]['per_second']}/detik)")
+
+    # Satu anak: form skrining memanggil score_measurement per submit
+    sample = population.sample(min(200, n), random_state=seed).to_dict('records')
+    children = iter([{'age': r['usia_bulan'], 'sex': r['gender'], 'weight': r['berat_badan'],
+                      'height': r['tinggi_badan'], 'hc': r['lingkar_kepala']} for r in sample] * repeat)
+    record('score_single', measure(lambda: score_measurement(next(children)), repeat, number=len(sample)))
+    record('score_batch', measure(lambda: score_frame(population), repeat), items=n)
+
+    # Simpan: baris baru untuk anak yang sudah ada (kunjungan berikutnya). Tiap ulangan memakai
+    # tanggal lain; tanggal yang sama akan menjadi upsert tanpa perubahan (kunci alami)
+    visits = iter(enumerate(sample * repeat))
+    def save():
+        i, r = next(visits)
+        day = str(REFERENCE_DATE + np.timedelta64(14 + i // len(sample), 'D'))
+        data = {'date': day, 'name': r['nama_anak'], 'age': r['usia_bulan'] + 1, 'sex': r['gender'],
+                'alamat': r['alamat'], 'weight': r['berat_badan'], 'height': r['tinggi_badan'],
+                'hc': r['lingkar_kepala'], 'birth_date': r['tanggal_lahir']}
+        z_scores, statuses, risk, status = score_measurement(data)
+        db.save_measurement(data, z_scores, statuses, risk, status, 'bench')
+    record('save_measurement', measure(save, repeat, number=len(sample)))
+
+    df = db.get_all_measurements()
+    record('get_all_measurements', measure(db.get_all_measurements, repeat), items=len(df))
+    # Dashboard: statistik per dukuh dari SQL + hitungan status untuk diagram lingkaran
+    record('dashboard_aggregation', measure(lambda: (db.get_dukuh_stats(), df['status_stunting'].value_counts()),
+                                            repeat), items=len(df))
+    record('csv_export', measure(lambda: df.to_csv(index=False), repeat), items=len(df))
+    # Pencarian nama seperti filter "Cari Nama Anak" (substring, tanpa membedakan huruf besar)
+    queries = iter(["sari", "putri pratama", "dim", "zzz"] * repeat)
+    record('name_search', measure(lambda: df['nama_anak'].str.contains(next(queries), case=False, na=False),
+                                  repeat), items=len(df))
+    return results
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=Path(__file__).resolve().parent, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.TimeoutExpired):
+        commit = None
+    return {
+        'created_at': datetime.now().isoformat(timespec='seconds'), 'git_commit': commit,
+        'python': platform.python_version(), 'platform': platform.platform(), 'cpu_count': os.cpu_count(),
+        'numpy': np.__version__, 'pandas': pd.__version__, 'scoring_version': scoring_version(),
+    }
+
+def run_suite(sizes=('1k', '100k'), repeat=5, seed=0, workdir=None, log=print):
+    """Jalankan semua benchmark untuk tiap ukuran; mengembalikan dict siap ditulis ke JSON."""
+    original_db = db.DB_PATH
+    results = []
+    try:
+        with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+            for size in sizes:
+                results.extend(run_size(size, tmp, repeat=repeat, seed=seed, log=log))
+    finally:
+        db.DB_PATH = original_db
+    return {'meta': {**environment(), 'repeat': repeat, 'seed': seed}, 'results': results}
+
+# ========= PERBANDINGAN
+def compare(baseline, current, threshold=0.2):
+    """Median tiap (ukuran, benchmark) dibanding baseline; regresi jika lebih lambat dari threshold."""
+    old = {(r['size'], r['benchmark']): r for r in baseline['results']}
+    rows = []
+    for r in current['results']:
+        base = old.get((r['size'], r['benchmark']))
+        if base is None:
+            continue
+        ratio = r['median_s'] / base['median_s']
+        rows.append({'size': r['size'], 'benchmark': r['benchmark'], 'baseline_ms': round(base['median_s'] * 1000, 3),
+                     'sekarang_ms': round(r['median_s'] * 1000, 3), 'rasio': round(ratio, 2),
+                     'regresi': ratio > 1 + threshold})
+    return pd.DataFrame(rows, columns=['size', 'benchmark', 'baseline_ms', 'sekarang_ms', 'rasio', 'regresi'])
+
+def write_results(results, path):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+
+def read_results(path):
+    with open(path) as f:
+        return json.load(f)
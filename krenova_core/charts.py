@@ -0,0 +1,105 @@
+from functools import lru_cache
+
+from .metrics import register_cache, timed
+from .reference import get_target_table
+
+## ======= GRAFIK PERTUMBUHAN WHO
+CHART_SD_LINES = {
+    -3: ('-3 SD', '#C62828', 'dot'),
+    -2: ('-2 SD', '#FEA405', 'dash'),
+    0: ('Median', '#8AA624', 'solid'),
+    2: ('+2 SD', '#FEA405', 'dash'),
+    3: ('+3 SD', '#C62828', 'dot'),
+}
+CHART_INDICATORS = {
+    'wfa': ('Berat Badan menurut Usia', 'Usia (bulan)', 'Berat Badan (kg)'),
+    'hfa': ('Panjang/Tinggi Badan menurut Usia', 'Usia (bulan)', 'Panjang/Tinggi Badan (cm)'),
+    'wfh': ('Berat Badan menurut Panjang/Tinggi Badan', 'Panjang/Tinggi Badan (cm)', 'Berat Badan (kg)'),
+    'hcfa': ('Lingkar Kepala menurut Usia', 'Usia (bulan)', 'Lingkar Kepala (cm)'),
+}
+
+@lru_cache(maxsize=None)
+def get_growth_chart_curves():
+    """Trace garis SD (-3/-2/0/+2/+3) per indikator & jenis kelamin, dibangun sekali dari tabel target."""
+    curves = {}
+    for indicator, frame in get_target_table()[0].items():
+        group_cols = ['Gender'] + (['Pengukuran'] if indicator == 'wfh' else [])
+        for group, ref in frame.groupby(group_cols):
+            ref = ref.sort_values('x')
+            traces = []
+            for z, (label, color, dash) in CHART_SD_LINES.items():
+                traces.append({
+                    'type': 'scatter', 'mode': 'lines', 'name': label,
+                    'x': ref['x'].tolist(), 'y': ref[f'sd_{z}'].tolist(),
+                    'line': {'color': color, 'dash': dash, 'width': 2 if z == 0 else 1.5},
+                    'hoverinfo': 'skip',
+                })
+            curves[(indicator,) + tuple(group)] = traces
+    return curves
+
+register_cache('growth_chart_curves', get_growth_chart_curves)
+
+@timed()
+def build_growth_chart(indicator, sex, points_x, points_y, m_type=None):
+    # Kurva referensi diambil dari cache, per permintaan hanya titik anak yang ditambahkan
+    import plotly.graph_objects as go
+
+    key = (indicator, sex, m_type) if indicator == 'wfh' else (indicator, sex)
+    title, x_title, y_title = CHART_INDICATORS[indicator]
+    fig = go.Figure(data=get_growth_chart_curves().get(key, []))
+    fig.add_trace(go.Scatter(
+        x=list(points_x), y=list(points_y), mode='lines+markers', name='Anak',
+        line=dict(color='#1565C0', width=2), marker=dict(size=9, color='#1565C0')
+    ))
+    fig.update_layout(title=title, xaxis_title=x_title, yaxis_title=y_title, height=420,
+                      legend=dict(orientation='h', y=-0.2))
+    return fig
+
+## ======= DISTRIBUSI Z-SCORE VS STANDAR WHO
+@timed()
+def build_zscore_distribution_chart(histogram, title):
+    """Histogram Z-Score (kepadatan per bin, semua dukuh terpilih) dengan kurva normal baku WHO."""
+    import numpy as np
+    import plotly.graph_objects as go
+
+    from .distribution import BIN_WIDTH, N_BINS, bin_edges
+
+    counts = histogram.groupby('bin')['n'].sum().reindex(range(N_BINS), fill_value=0)
+    total = histogram['n'].sum()
+    lower, upper = bin_edges(counts.index)
+    density = counts / (total * BIN_WIDTH) if total else counts
+    z = np.linspace(-6, 6, 241)
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=(lower + upper) / 2, y=density, width=BIN_WIDTH, name='Data',
+        marker=dict(color='#1565C0', opacity=0.6), customdata=counts,
+        hovertemplate='%{x:.2f} SD: %{customdata} pengukuran<extra></extra>'
+    ))
+    fig.add_trace(go.Scatter(
+        x=z, y=np.exp(-z ** 2 / 2) / np.sqrt(2 * np.pi), mode='lines', name='WHO N(0, 1)',
+        line=dict(color='#8AA624', width=2), hoverinfo='skip'
+    ))
+    for sd in (-3, -2):
+        label, color, dash = CHART_SD_LINES[sd]
+        fig.add_vline(x=sd, line=dict(color=color, dash=dash, width=1.5), annotation_text=label)
+    fig.update_layout(title=title, xaxis_title='Z-Score', yaxis_title='Kepadatan', height=420,
+                      bargap=0, legend=dict(orientation='h', y=-0.2))
+    return fig
+
+@timed()
+def build_mean_z_trend_chart(moments, title):
+    """Rata-rata Z-Score per bulan per dukuh; garis 0 = median WHO."""
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+    for alamat, frame in moments.groupby('alamat'):
+        fig.add_trace(go.Scatter(
+            x=frame['bulan'], y=frame['rata_rata'].round(2), mode='lines+markers', name=alamat or '-',
+            customdata=frame['n'], hovertemplate='%{x}: %{y} (n=%{customdata})<extra>%{fullData.name}</extra>'
+        ))
+    for sd in (0, -2):
+        label, color, dash = CHART_SD_LINES[sd]
+        fig.add_hline(y=sd, line=dict(color=color, dash=dash, width=1.5), annotation_text=label)
+    fig.update_layout(title=title, xaxis_title='Bulan', yaxis_title='Rata-rata Z-Score', height=420,
+                      legend=dict(orientation='h', y=-0.2))
+    return fig
@@ -0,0 +1,406 @@
+import argparse
+import os
+import sys
+import time
+
+from . import db
+from .archive import ARCHIVE_AGE_YEARS, BACKUP_KEEP, attach_archives
+from .assets import APP_DIR, STATIC_DIR
+from .batch import DEFAULT_CHUNKSIZE, RESCORE_CHUNKSIZE, rescore_measurements, rescore_status, score_file
+from .distribution import INDICATORS, distribution_table, rebuild_summaries
+from .mirror import MIRROR_DIR, QUERY_MAX_ROWS
+from .scoring import scoring_version
+
+# ========= PERINTAH CLI
+def cmd_score(args):
+    start = time.perf_counter()
+    total = score_file(args.input, args.output, jobs=args.jobs, chunksize=args.chunksize)
+    print(f"{total} baris diskor -> {args.output} ({time.perf_counter() - start:.1f} detik)")
+
+def cmd_rescore(args):
+    db.init_database()
+    if args.status:
+        versions, checkpoints = rescore_status()
+        print(f"Versi skoring saat ini: {scoring_version()}")
+        print(versions.to_string(index=False))
+        print()
+        print(checkpoints.to_string(index=False) if not checkpoints.empty else "Belum ada job skoring ulang.")
+        return
+
+    start = time.perf_counter()
+    total, resumed = rescore_measurements(
+        chunksize=args.chunksize, jobs=args.jobs, recompute_age=args.recompute_age,
+        progress=lambda n, last_id, max_id: print(f"  id {last_id}/{max_id}: {n} baris...", file=sys.stderr))
+    if resumed:
+        print("Melanjutkan job yang terhenti dari checkpoint terakhir.")
+    print(f"{total} baris measurements diskor ulang ke versi {scoring_version()} "
+          f"({time.perf_counter() - start:.1f} detik)")
+
+def cmd_stats(args):
+    db.init_database()
+    if args.rebuild:
+        conn = db.get_connection()
+        # Termasuk tahun yang sudah dipindah ke arsip (view gabungan; PostgreSQL tanpa arsip)
+        rows = rebuild_summaries(conn.cursor(), attach_archives(conn))
+        conn.commit()
+        conn.close()
+        print(f"Ringkasan distribusi Z-Score dihitung ulang: {rows} sel momen")
+    if args.distribution:
+        histogram, moments = db.get_zscore_summary(args.distribution)
+        year = args.year or (histogram['tahun'].max() if not histogram.empty else None)
+        histogram = histogram[histogram['tahun'] == str(year)]
+        if histogram.empty:
+            print(f"Belum ada data {INDICATORS[args.distribution]} tahun {year}.")
+            return
+        print(f"Distribusi {INDICATORS[args.distribution]} tahun {year} "
+              f"(WHO: rata-rata 0, SD 1, 2,3% < -2 SD, 0,1% < -3 SD)")
+        print(distribution_table(histogram, moments[moments['bulan'].str[:4] == str(year)]).to_string(index=False))
+        return
+    stats = db.get_dukuh_stats()
+    if stats.empty:
+        print("Belum ada data pengukuran.")
+        return
+    total = int(stats['total_anak'].sum())
+    at_risk = int(stats['berisiko_stunting'].sum())
+    print(f"Total pengukuran : {total}")
+    print(f"Risiko stunting  : {at_risk} ({at_risk / total * 100:.1f}%)")
+    print(f"Peringatan terbuka: {len(db.get_growth_alerts())}")
+    print()
+    print(stats.to_string(index=False))
+
+def cmd_profile_startup(args):
+    from .charts import get_growth_chart_curves
+    from .reference import get_target_table
+    from .startup import PHASES, import_profile, phase
+
+    for module in args.modules:
+        print(f"== import {module} (ms, kumulatif)")
+        for name, self_ms, cumulative_ms in import_profile(module, top=args.top):
+            print(f"{cumulative_ms:10.1f} {self_ms:10.1f}  {name}")
+        print()
+
+    with phase('init_database'):
+        db.init_database()
+    with phase('get_target_table'):
+        get_target_table()
+    with phase('get_growth_chart_curves'):
+        get_growth_chart_curves()
+    print("== fase startup (ms)")
+    for name, ms in PHASES.items():
+        print(f"{ms:10.1f}  {name}")
+
+def cmd_bench(args):
+    from . import bench
+
+    sizes = [s.strip().lower() for s in args.sizes.split(',')]
+    unknown = [s for s in sizes if s not in bench.SIZES]
+    if unknown:
+        sys.exit(f"Ukuran tidak dikenal: {', '.join(unknown)} (pilih dari {', '.join(bench.SIZES)})")
+    results = bench.run_suite(sizes, repeat=args.repeat, seed=args.seed, workdir=args.workdir)
+    bench.write_results(results, args.output)
+    print(f"Hasil -> {args.output}")
+    if args.compare:
+        comparison = bench.compare(bench.read_results(args.compare), results, threshold=args.threshold)
+        print()
+        print(comparison.to_string(index=False) if not comparison.empty else "Tidak ada benchmark yang sama dengan baseline.")
+        if comparison['regresi'].any():
+            sys.exit(f"Regresi performa > {args.threshold:.0%} dibanding {args.compare}")
+
+def cmd_generate(args):
+    from .batch import write_frames
+    from .bench import SIZES, generate_population
+
+    n = SIZES.get(args.size.lower()) or int(args.size)
+    total = write_frames([generate_population(n, n_dukuh=args.dukuh, seed=args.seed)], args.output)
+    print(f"{total} baris populasi sintetis -> {args.output}")
+
+def cmd_loadtest(args):
+    import json
+
+    from .loadtest import SCENARIOS, run_load_test
+
+    scenarios = dict(SCENARIOS)
+    if args.mix:
+        scenarios = {name: float(weight) for name, weight in (part.split('=') for part in args.mix.split(','))}
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            sys.exit(f"Skenario tidak dikenal: {', '.join(sorted(unknown))} (pilih dari {', '.join(SCENARIOS)})")
+    result = run_load_test(
+        sessions=args.sessions, duration=args.duration, scenarios=scenarios, think_time=args.think_time,
+        ai_latency=args.ai_latency, ai_error_rate=args.ai_error_rate, seed_rows=args.seed_rows,
+        db_path=args.target_db, admission=args.admission)
+
+    import pandas as pd
+    print()
+    print(pd.DataFrame(result['skenario']).to_string(index=False))
+    sqlite = result['sqlite']
+    print()
+    print(f"SQLite: lock tulis terpakai {sqlite['lock_tulis_terpakai_persen']}% waktu, "
+          f"{sqlite['error_database_locked']} error 'database is locked'")
+    if sqlite['tulis']:
+        print(pd.DataFrame(sqlite['tulis']).to_string(index=False))
+    for ai in result['ai']:
+        failed = sum(c['nilai'] for c in result['ai_gagal'])
+        shed = sum(c['nilai'] for c in result['ai_dialihkan'])
+        print(f"\nGemini (tiruan): {ai['panggilan']} panggilan, p50 {ai['p50_ms']} ms, p95 {ai['p95_ms']} ms, {failed} gagal, "
+              f"{shed} dialihkan ke penjelasan lokal")
+    rejected = sum(c['nilai'] for c in result['ditolak'])
+    if rejected:
+        print(f"Kontrol penerimaan: {rejected} submit ditolak")
+    if result['error_teratas']:
+        print()
+        print("Error teratas:")
+        for error, n in result['error_teratas'].items():
+            print(f"{n:6d}  {error}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2, default=str)
+        print(f"\nLaporan -> {args.output}")
+
+def cmd_backup(args):
+    from .archive import backup_database, backup_to_directory, require_sqlite
+
+    try:
+        require_sqlite(db.DB_PATH)
+    except ValueError as e:
+        sys.exit(str(e))
+    start = time.perf_counter()
+    if args.output:
+        restarts = backup_database(args.output)
+        dest = args.output
+    else:
+        dest, restarts = backup_to_directory(args.directory, keep=args.keep), 0
+    note = f", mulai ulang {restarts}x karena ada penulisan" if restarts else ''
+    print(f"Backup -> {dest} ({time.perf_counter() - start:.1f} detik{note})")
+
+def cmd_archive(args):
+    from .archive import archive_measurements, archive_summary, require_sqlite
+
+    try:
+        require_sqlite(db.DB_PATH)
+    except ValueError as e:
+        sys.exit(str(e))
+    db.init_database()
+    if not args.list:
+        moved = archive_measurements(older_than_years=args.older_than)
+        if not moved:
+            print(f"Tidak ada pengukuran lebih tua dari {args.older_than} tahun.")
+        for year, n in moved.items():
+            print(f"{year}: {n} baris dipindah ke arsip")
+    summary = archive_summary()
+    if summary:
+        import pandas as pd
+        print()
+        print(pd.DataFrame(summary).to_string(index=False))
+
+def cmd_assets(args):
+    import pandas as pd
+
+    from .assets import build_assets
+
+    rows = build_assets(source_dir=args.source, static_dir=args.output, force=args.force)
+    print(pd.DataFrame(rows).to_string(index=False) if rows else "Gambar sumber tidak ditemukan.")
+
+def cmd_mirror(args):
+    import pandas as pd
+
+    from . import mirror
+
+    directory = args.directory
+    if args.action == 'refresh':
+        db.init_database()
+        result = mirror.refresh_mirror(directory, include_archive=not args.no_archive)
+        if result['versi'] is None:
+            print("Database kosong; cermin tidak diperbarui.")
+            return
+        print(f"{result['baris']} baris -> {directory}/{result['versi']} "
+              f"({result['partisi']} partisi tahun, {result['detik']} detik)")
+    elif args.action == 'status':
+        status = mirror.mirror_status(directory)
+        if status is None:
+            sys.exit("Cermin belum dibangun: jalankan `krenova mirror refresh`")
+        print(f"Versi {status['versi']} ({status['baris']} baris, diperbarui {status['diperbarui']:%Y-%m-%d %H:%M})")
+        print(pd.DataFrame(status['partisi']).to_string(index=False))
+    else:
+        if args.action == 'report':
+            if args.name not in mirror.REPORTS:
+                sys.exit("Laporan tersedia:\n" + '\n'.join(f"  {name}" for name in mirror.REPORTS))
+            sql = mirror.REPORTS[args.name]
+        else:
+            sql = args.sql
+        try:
+            df, truncated = mirror.run_query(sql, directory, max_rows=args.max_rows)
+        except (mirror.MirrorUnavailable, ValueError) as e:
+            sys.exit(str(e))
+        print(df.to_string(index=False))
+        if truncated:
+            print(f"(dipotong pada {args.max_rows} baris)")
+
+def cmd_serve(args):
+    from .api import serve
+
+    serve(host=args.host, port=args.port, pool_size=args.pool_size)
+
+def cmd_sync(args):
+    from . import sync
+
+    db.init_database()
+    if args.action == 'init':
+        sync.init_journal(device=args.device, server=args.server)
+        print("Jurnal perubahan aktif. Jalankan `krenova sync push` saat ada koneksi.")
+    elif args.action == 'push':
+        result, sent = sync.push(server=args.server)
+        if result is None:
+            print("Tidak ada perubahan untuk dikirim.")
+            return
+        print(f"{result['applied']} perubahan diterima pusat, {result['skipped']} sudah pernah diterima, "
+              f"{len(result['conflicts'])} konflik ({sent / 1024:.1f} KB terkirim)")
+    elif args.action == 'export':
+        # Untuk lokasi tanpa internet: bawa file ke pusat lalu `sync import`
+        batch = sync.collect_batch()
+        body = sync.encode(batch)
+        with open(args.file, 'wb') as f:
+            f.write(body)
+        print(f"{len(batch['changes'])} perubahan -> {args.file} ({len(body) / 1024:.1f} KB)")
+    elif args.action == 'import':
+        with open(args.file, 'rb') as f:
+            batch = sync.decode(f.read())
+        conn = db.get_connection()
+        result = sync.apply_batch(batch, conn)
+        conn.close()
+        with open(args.output, 'wb') as f:
+            f.write(sync.encode(result))
+        print(f"{result['applied']} perubahan diterima, {len(result['conflicts'])} konflik; "
+              f"bawa {args.output} kembali ke perangkat lalu `sync ack`")
+    elif args.action == 'ack':
+        with open(args.file, 'rb') as f:
+            sync.acknowledge(sync.decode(f.read()))
+        print("Jurnal perangkat diperbarui.")
+    elif args.action == 'conflicts':
+        conflicts = sync.get_sync_conflicts()
+        print(conflicts.to_string(index=False) if not conflicts.empty else "Tidak ada konflik sinkronisasi.")
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='krenova', description="Skoring antropometri WHO SI Tumbuh tanpa Streamlit")
+    parser.add_argument('--db', help="Lokasi database SQLite (default: $KRENOVA_DB atau krenova_data.db)")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('score', help="Skor file CSV pengukuran ke Parquet/CSV")
+    p.add_argument('input', help="CSV berkolom usia_bulan (atau tanggal_lahir + tanggal_pengukuran), gender, berat_badan, tinggi_badan, lingkar_kepala")
+    p.add_argument('-o', '--output', required=True, help="File hasil (.parquet atau .csv)")
+    p.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1, help="Jumlah proses paralel")
+    p.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    p.set_defaults(func=cmd_score)
+
+    p = sub.add_parser('rescore', help="Hitung ulang Z-Score & status yang tersimpan di database")
+    p.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1, help="Jumlah proses paralel")
+    p.add_argument('--chunksize', type=int, default=RESCORE_CHUNKSIZE, help="Ukuran rentang id per transaksi")
+    p.add_argument('--recompute-age', action='store_true',
+                   help="Hitung ulang usia_bulan dari tanggal lahir (setelah rumus usia berubah)")
+    p.add_argument('--status', action='store_true', help="Tampilkan versi skoring & checkpoint, tanpa menjalankan job")
+    p.set_defaults(func=cmd_rescore)
+
+    p = sub.add_parser('stats', help="Ringkasan risiko stunting per dukuh")
+    p.add_argument('--distribution', choices=list(INDICATORS),
+                   help="Distribusi Z-Score per dukuh dibanding standar WHO untuk satu indikator")
+    p.add_argument('--year', help="Tahun untuk --distribution (default: tahun terakhir)")
+    p.add_argument('--rebuild', action='store_true', help="Hitung ulang tabel ringkasan distribusi dari measurements")
+    p.set_defaults(func=cmd_stats)
+
+    p = sub.add_parser('serve', help="Jalankan layanan HTTP JSON (POST /score, POST /measurements)")
+    p.add_argument('--host', default='0.0.0.0')
+    p.add_argument('--port', type=int, default=8502)
+    p.add_argument('--pool-size', type=int, default=4, help="Jumlah koneksi database bersama")
+    p.set_defaults(func=cmd_serve)
+
+    p = sub.add_parser('backup', help="Backup online database SQLite (aman saat aplikasi berjalan)")
+    p.add_argument('directory', nargs='?', default='backup', help="Folder backup bertanda waktu (default: backup/)")
+    p.add_argument('--keep', type=int, default=BACKUP_KEEP, help="Jumlah backup terbaru yang disimpan")
+    p.add_argument('-o', '--output', help="Tulis ke satu file ini saja (tanpa rotasi)")
+    p.set_defaults(func=cmd_backup)
+
+    p = sub.add_parser('archive', help="Pindahkan pengukuran lama ke database arsip per tahun")
+    p.add_argument('--older-than', type=int, default=ARCHIVE_AGE_YEARS,
+                   help="Batas usia data (tahun) yang dipindah ke arsip")
+    p.add_argument('--list', action='store_true', help="Tampilkan arsip yang ada, tanpa memindah data")
+    p.set_defaults(func=cmd_archive)
+
+    p = sub.add_parser('mirror', help="Cermin analitik Parquet + query DuckDB (tidak membebani database skrining)")
+    p.add_argument('--directory', default=MIRROR_DIR, help="Folder cermin (default: $KRENOVA_MIRROR atau analitik/)")
+    actions = p.add_subparsers(dest='action', required=True)
+    a = actions.add_parser('refresh', help="Bangun ulang cermin dari database (termasuk arsip tahunan)")
+    a.add_argument('--no-archive', action='store_true', help="Hanya tabel measurements utama")
+    actions.add_parser('status', help="Versi aktif & jumlah baris per partisi tahun")
+    a = actions.add_parser('report', help="Jalankan laporan siap pakai")
+    a.add_argument('name', nargs='?', default='', help="Nama laporan (kosongkan untuk daftar)")
+    a.add_argument('--max-rows', type=int, default=QUERY_MAX_ROWS)
+    a = actions.add_parser('query', help="Jalankan SQL DuckDB atas view `measurements`")
+    a.add_argument('sql')
+    a.add_argument('--max-rows', type=int, default=QUERY_MAX_ROWS)
+    p.set_defaults(func=cmd_mirror)
+
+    p = sub.add_parser('bench', help="Benchmark skoring, database, dashboard & ekspor dengan populasi sintetis")
+    p.add_argument('--sizes', default='1k,100k', help="Ukuran populasi: 1k, 100k, 1m (pisahkan dengan koma)")
+    p.add_argument('-o', '--output', default='bench.json', help="File hasil JSON")
+    p.add_argument('--repeat', type=int, default=5, help="Jumlah ulangan per benchmark")
+    p.add_argument('--seed', type=int, default=0)
+    p.add_argument('--workdir', help="Folder database sementara (default: folder temp sistem)")
+    p.add_argument('--compare', help="JSON hasil sebelumnya; keluar dengan kode 1 jika ada regresi")
+    p.add_argument('--threshold', type=float, default=0.2, help="Batas perlambatan median untuk regresi (0.2 = 20%%)")
+    p.set_defaults(func=cmd_bench)
+
+    p = sub.add_parser('loadtest', help="Uji beban: sesi kader bersamaan pada krenova.py dengan Gemini tiruan")
+    p.add_argument('--sessions', type=int, default=10, help="Jumlah sesi bersamaan")
+    p.add_argument('--duration', type=float, default=60, help="Lama uji (detik)")
+    p.add_argument('--mix', help="Bobot skenario, mis. skrining=7,filter=2,ekspor=1")
+    p.add_argument('--think-time', type=float, default=1.0, help="Rata-rata jeda antar aksi per sesi (detik)")
+    p.add_argument('--ai-latency', type=float, default=2.0, help="Median latensi Gemini tiruan (detik)")
+    p.add_argument('--ai-error-rate', type=float, default=0.02, help="Porsi permintaan Gemini tiruan yang gagal")
+    p.add_argument('--seed-rows', type=int, default=10_000, help="Jumlah pengukuran sintetis di database uji")
+    p.add_argument('--target-db', help="Pakai database ini (hati-hati: data uji ikut tersimpan)")
+    p.add_argument('--admission', action='store_true',
+                   help="Aktifkan batas laju & antrean AI (default nonaktif agar kapasitas murni terukur)")
+    p.add_argument('-o', '--output', help="Simpan laporan lengkap sebagai JSON")
+    p.set_defaults(func=cmd_loadtest)
+
+    p = sub.add_parser('generate', help="Tulis populasi balita sintetis (dari distribusi LMS WHO) ke CSV/Parquet")
+    p.add_argument('size', help="Jumlah baris, atau 1k / 100k / 1m")
+    p.add_argument('-o', '--output', required=True, help="File hasil (.parquet atau .csv)")
+    p.add_argument('--dukuh', type=int, default=40, help="Jumlah dukuh")
+    p.add_argument('--seed', type=int, default=0)
+    p.set_defaults(func=cmd_generate)
+
+    p = sub.add_parser('sync', help="Mode offline: jurnal perubahan lokal & sinkronisasi delta ke pusat")
+    actions = p.add_subparsers(dest='action', required=True)
+    a = actions.add_parser('init', help="Aktifkan jurnal di database perangkat")
+    a.add_argument('--device', help="Nama perangkat/posyandu (default: hostname)")
+    a.add_argument('--server', help="URL `krenova serve` pusat, mis. http://pusat:8502")
+    a = actions.add_parser('push', help="Kirim perubahan ke server pusat")
+    a.add_argument('--server', help="URL server pusat (default: dari sync init)")
+    a = actions.add_parser('export', help="Tulis batch perubahan ke file (tanpa koneksi)")
+    a.add_argument('file')
+    a = actions.add_parser('import', help="Terapkan file batch di database pusat")
+    a.add_argument('file')
+    a.add_argument('-o', '--output', required=True, help="File hasil untuk `sync ack` di perangkat")
+    a = actions.add_parser('ack', help="Terapkan file hasil dari pusat di perangkat")
+    a.add_argument('file')
+    actions.add_parser('conflicts', help="Daftar konflik sinkronisasi di pusat")
+    p.set_defaults(func=cmd_sync)
+
+    p = sub.add_parser('assets', help="Buat varian AVIF/WebP header & foto profil untuk static serving")
+    p.add_argument('--source', default=str(APP_DIR), help="Folder gambar PNG sumber (default: folder krenova.py)")
+    p.add_argument('-o', '--output', default=STATIC_DIR, help="Folder static/ di samping krenova.py")
+    p.add_argument('--force', action='store_true', help="Buat ulang meskipun varian sudah ada")
+    p.set_defaults(func=cmd_assets)
+
+    p = sub.add_parser('profile-startup', help="Profil waktu import & fase startup aplikasi")
+    p.add_argument('modules', nargs='*', default=['krenova_core', 'streamlit', 'google.genai', 'plotly.graph_objects'])
+    p.add_argument('--top', type=int, default=10)
+    p.set_defaults(func=cmd_profile_startup)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.db:
+        db.DB_PATH = args.db
+    args.func(args)
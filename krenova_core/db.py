@@ -0,0 +1,601 @@
+import hashlib
+import json
+import os
+import queue
+import sqlite3
+import uuid
+from contextlib import contextmanager
+
+import pandas as pd
+
+from . import storage
+from .distribution import get_zscore_histogram, get_zscore_moments, init_summaries
+from .growth import (
+    detect_growth_faltering, get_previous_state, iso_date, make_child_key, rebuild_child_alerts,
+    refresh_child_state, resolve_child_key, z_velocity,
+)
+from .metrics import count, timed
+from .plausibility import check_batch, cutoff_sql, record_columns
+from .scoring import scoring_version
+
+# Lokasi database bisa diganti lewat environment (mis. untuk job batch atau pengujian).
+# URL postgresql://... memakai backend PostgreSQL (lihat storage.py)
+DB_PATH = os.environ.get('KRENOVA_DB', 'krenova_data.db')
+
+def get_connection(db_path=None):
+    target = db_path or DB_PATH
+    if storage.is_postgres(target):
+        return storage.connect(target)
+    # uri=True: arsip tahunan di-ATTACH read-only lewat URI file:...?mode=ro (archive.py)
+    return sqlite3.connect(target, uri=True)
+
+# ========= POOL KONEKSI (untuk server API)
+def create_pool(size=4, db_path=None):
+    pool = queue.Queue()
+    for _ in range(size):
+        if storage.is_postgres(db_path or DB_PATH):
+            pool.put(get_connection(db_path))
+            continue
+        conn = sqlite3.connect(db_path or DB_PATH, check_same_thread=False)
+        conn.execute("PRAGMA busy_timeout=5000")
+        pool.put(conn)
+    return pool
+
+@contextmanager
+def pooled_connection(pool):
+    conn = pool.get()
+    try:
+        yield conn
+    finally:
+        pool.put(conn)
+
+# ========= DATABASE SETUP
+@timed()
+def init_database():
+    conn = get_connection()
+    c = conn.cursor()
+    if storage.is_postgres(conn):
+        storage.create_postgres_schema(c)
+    else:
+        create_sqlite_schema(c)
+
+    # Kunci alami pengukuran (anak + tanggal ukur), hanya untuk anak bertanggal lahir. Baris ganda
+    # lama disisihkan sekali ke measurement_duplicates sebelum indeks unik dibuat.
+    if not storage.index_exists(c, 'idx_measurements_natural'):
+        remove_duplicate_measurements(c)
+        c.execute(f'''CREATE UNIQUE INDEX idx_measurements_natural ON measurements(child_key, tanggal_pengukuran)
+                      WHERE {NATURAL_KEY_WHERE}''')
+
+    # Penanda nilai tidak wajar (plausibility.py): baris lama diperiksa sekali terhadap batas
+    # WHO; indeks dipakai agregat dashboard (biv_flags = 0) & daftar data tidak wajar
+    if not storage.index_exists(c, 'idx_measurements_biv'):
+        backfill_cutoff_flags(c)
+        c.execute("CREATE INDEX idx_measurements_biv ON measurements(biv_flags, alamat)")
+
+    # Ringkasan distribusi Z-Score (distribution.py): tabel & trigger dibuat lalu diisi sekali,
+    # termasuk tahun yang sudah dipindah ke arsip (ATTACH tidak boleh di tengah transaksi)
+    if not storage.index_exists(c, 'idx_zscore_histogram_key'):
+        source = 'measurements'
+        if not storage.is_postgres(conn):
+            from .archive import attach_archives
+            conn.commit()
+            source = attach_archives(conn)
+        init_summaries(c, source)
+
+    # Insert default admin jika belum ada
+    c.execute("SELECT * FROM users WHERE username='tumbuh'")
+    if not c.fetchone():
+        admin_pass = hashlib.sha256('12345'.encode()).hexdigest()
+        c.execute("INSERT INTO users (username, password, role, nama_lengkap) VALUES (?, ?, ?, ?)",
+                  ('tumbuh', admin_pass, 'admin', 'Administrator'))
+    
+    # Insert default user jika belum ada
+    c.execute("SELECT * FROM users WHERE username='user'")
+    if not c.fetchone():
+        user_pass = hashlib.sha256('user123'.encode()).hexdigest()
+        c.execute("INSERT INTO users (username, password, role, nama_lengkap) VALUES (?, ?, ?, ?)",
+                  ('user', user_pass, 'user', 'User Biasa'))
+    
+    conn.commit()
+    conn.close()
+
+def create_sqlite_schema(c):
+    # WAL: pembaca (dashboard, API) tidak memblokir penulis skrining
+    c.execute("PRAGMA journal_mode=WAL")
+    
+    # Tabel Users
+    c.execute('''CREATE TABLE IF NOT EXISTS users
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  username TEXT UNIQUE NOT NULL,
+                  password TEXT NOT NULL,
+                  role TEXT NOT NULL,
+                  nama_lengkap TEXT)''')
+    
+    # Tabel Measurements
+    c.execute('''CREATE TABLE IF NOT EXISTS measurements
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  tanggal_pengukuran DATE,
+                  nama_anak TEXT,
+                  usia_bulan INTEGER,
+                  gender TEXT,
+                  alamat TEXT,
+                  berat_badan REAL,
+                  tinggi_badan REAL,
+                  lingkar_kepala REAL,
+                  wfa_zscore REAL,
+                  wfa_status TEXT,
+                  hfa_zscore REAL,
+                  hfa_status TEXT,
+                  wfh_zscore REAL,
+                  wfh_status TEXT,
+                  hcfa_zscore REAL,
+                  hcfa_status TEXT,
+                  risiko_stunting_persen INTEGER,
+                  status_stunting TEXT,
+                  created_by TEXT,
+                  tanggal_lahir DATE,
+                  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+
+    # Migration for existing tables
+    try:
+        c.execute("SELECT tanggal_lahir FROM measurements LIMIT 1")
+    except sqlite3.OperationalError:
+        c.execute("ALTER TABLE measurements ADD COLUMN tanggal_lahir DATE")
+
+    # Tabel cache state terakhir per anak (untuk deteksi gagal tumbuh inkremental)
+    c.execute('''CREATE TABLE IF NOT EXISTS child_state
+                 (child_key TEXT PRIMARY KEY,
+                  last_measurement_id INTEGER,
+                  last_date DATE,
+                  last_age INTEGER,
+                  wfa_zscore REAL,
+                  hfa_zscore REAL,
+                  wfa_velocity REAL,
+                  hfa_velocity REAL,
+                  updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+
+    # Tabel peringatan gagal tumbuh
+    c.execute('''CREATE TABLE IF NOT EXISTS growth_alerts
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  measurement_id INTEGER,
+                  child_key TEXT,
+                  nama_anak TEXT,
+                  alamat TEXT,
+                  tanggal_pengukuran DATE,
+                  indikator TEXT,
+                  jenis TEXT,
+                  z_sebelum REAL,
+                  z_sekarang REAL,
+                  perubahan REAL,
+                  kecepatan REAL,
+                  selesai INTEGER DEFAULT 0,
+                  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_alerts_open ON growth_alerts(selesai, created_at)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_alerts_measurement ON growth_alerts(measurement_id)")
+
+    # Migration: kunci identitas anak untuk riwayat kunjungan
+    try:
+        c.execute("SELECT child_key FROM measurements LIMIT 1")
+    except sqlite3.OperationalError:
+        c.execute("ALTER TABLE measurements ADD COLUMN child_key TEXT")
+        c.execute("SELECT id, nama_anak, tanggal_lahir, gender, alamat FROM measurements")
+        keys = [(make_child_key(r[1], r[2], r[3], r[4]), r[0]) for r in c.fetchall()]
+        c.executemany("UPDATE measurements SET child_key=? WHERE id=?", keys)
+        for key in set(k for k, _ in keys):
+            refresh_child_state(c, key)
+
+    c.execute("CREATE INDEX IF NOT EXISTS idx_measurements_child ON measurements(child_key, tanggal_pengukuran)")
+
+    # Tabel alias hasil penggabungan duplikat (kunci lama -> kunci anak yang dipertahankan)
+    c.execute('''CREATE TABLE IF NOT EXISTS child_aliases
+                 (from_key TEXT PRIMARY KEY,
+                  to_key TEXT NOT NULL,
+                  merged_by TEXT,
+                  merged_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+
+    # Migration: versi tabel WHO & aturan status yang dipakai saat baris diskor
+    try:
+        c.execute("SELECT scoring_version FROM measurements LIMIT 1")
+    except sqlite3.OperationalError:
+        c.execute("ALTER TABLE measurements ADD COLUMN scoring_version TEXT")
+
+    # Migration: identitas global baris (uid) & revisi, untuk sinkronisasi perangkat offline
+    try:
+        c.execute("SELECT uid FROM measurements LIMIT 1")
+    except sqlite3.OperationalError:
+        c.execute("ALTER TABLE measurements ADD COLUMN uid TEXT")
+        c.execute("ALTER TABLE measurements ADD COLUMN revision INTEGER DEFAULT 0")
+        c.execute("ALTER TABLE measurements ADD COLUMN sync_revision INTEGER")
+        c.execute("UPDATE measurements SET uid=lower(hex(randomblob(16))) WHERE uid IS NULL")
+    c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_measurements_uid ON measurements(uid)")
+
+    # Migration: bitmask nilai tidak wajar secara biologis (0 = wajar)
+    try:
+        c.execute("SELECT biv_flags FROM measurements LIMIT 1")
+    except sqlite3.OperationalError:
+        c.execute("ALTER TABLE measurements ADD COLUMN biv_flags INTEGER NOT NULL DEFAULT 0")
+
+    # Sinkronisasi perangkat offline: seq terakhir yang diterima per perangkat & konflik untuk admin
+    c.execute('''CREATE TABLE IF NOT EXISTS sync_devices
+                 (device TEXT PRIMARY KEY,
+                  last_seq INTEGER,
+                  last_sync_at TIMESTAMP)''')
+    c.execute('''CREATE TABLE IF NOT EXISTS sync_conflicts
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  device TEXT,
+                  uid TEXT,
+                  op TEXT,
+                  base_revision INTEGER,
+                  central_revision INTEGER,
+                  data TEXT,
+                  alasan TEXT,
+                  selesai INTEGER DEFAULT 0,
+                  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+
+    # Pengukuran ganda yang disisihkan (migrasi kunci alami, penggabungan anak): baris utuh (JSON)
+    # untuk ditinjau admin & dipulihkan
+    c.execute('''CREATE TABLE IF NOT EXISTS measurement_duplicates
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  measurement_id INTEGER,
+                  kept_id INTEGER,
+                  child_key TEXT,
+                  tanggal_pengukuran DATE,
+                  alasan TEXT,
+                  identik INTEGER DEFAULT 0,
+                  data TEXT,
+                  selesai INTEGER DEFAULT 0,
+                  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+
+    # Checkpoint job skoring ulang (satu baris per versi skoring) agar bisa dilanjutkan setelah crash
+    c.execute('''CREATE TABLE IF NOT EXISTS rescore_checkpoints
+                 (scoring_version TEXT PRIMARY KEY,
+                  last_id INTEGER DEFAULT 0,
+                  max_id INTEGER,
+                  rows_done INTEGER DEFAULT 0,
+                  started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                  updated_at TIMESTAMP,
+                  finished_at TIMESTAMP)''')
+
+def remove_duplicate_measurements(c):
+    """Pengukuran ganda (klik ganda, unggah ulang) sebelum ada indeks unik.
+
+    Yang terakhir disimpan dipertahankan. Baris lain disisihkan ke measurement_duplicates: yang
+    nilainya sama langsung selesai, yang berbeda menunggu tinjauan admin (Duplikasi Data Anak).
+    """
+    c.execute("UPDATE measurements SET tanggal_lahir=NULL WHERE tanggal_lahir=''")
+    c.execute(f'''SELECT m.id, MAX(d.id) FROM measurements m
+                  JOIN measurements d ON d.child_key = m.child_key AND d.tanggal_pengukuran = m.tanggal_pengukuran
+                                     AND d.id > m.id
+                  WHERE m.{NATURAL_KEY_WHERE}
+                  GROUP BY m.id''')
+    duplicates = c.fetchall()
+    for record_id, kept_id in duplicates:
+        identical = set_aside_measurement(c, record_id, kept_id, 'migrasi kunci alami')
+        count('duplicate_measurements_removed_total', result='identik' if identical else 'berbeda')
+    return len(duplicates)
+
+# ========= PENGUKURAN GANDA YANG DISISIHKAN
+DUPLICATE_VALUES = ['usia_bulan', 'berat_badan', 'tinggi_badan', 'lingkar_kepala']
+
+def set_aside_measurement(c, record_id, kept_id, alasan, resolved=False):
+    """Salin baris utuh ke measurement_duplicates lalu hapus dari measurements.
+
+    Mengembalikan True jika nilainya sama dengan baris kept_id (langsung ditandai selesai).
+    """
+    c.execute("SELECT * FROM measurements WHERE id=?", (record_id,))
+    row = dict(zip([d[0] for d in c.description], c.fetchone()))
+    c.execute(f"SELECT {', '.join(DUPLICATE_VALUES)} FROM measurements WHERE id=?", (kept_id,))
+    kept = c.fetchone()
+    identical = kept is not None and tuple(kept) == tuple(row[k] for k in DUPLICATE_VALUES)
+    c.execute('''INSERT INTO measurement_duplicates
+                 (measurement_id, kept_id, child_key, tanggal_pengukuran, alasan, identik, data, selesai)
+                 VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
+              (record_id, kept_id, row['child_key'], row['tanggal_pengukuran'], alasan, int(identical),
+               json.dumps(row, default=str), int(identical or resolved)))
+    delete_measurement_row(c, record_id)
+    return identical
+
+def restore_measurement_row(c, data):
+    """Kembalikan baris yang disisihkan (dict kolom -> nilai) ke measurements dengan id aslinya.
+
+    DuplicateMeasurement jika kunci alaminya sudah terisi baris lain.
+    """
+    key = resolve_child_key(c, data['child_key'])
+    if data.get('tanggal_lahir'):
+        c.execute(f"SELECT id FROM measurements WHERE child_key=? AND tanggal_pengukuran=? AND {NATURAL_KEY_WHERE}",
+                  (key, data['tanggal_pengukuran']))
+        duplicate = c.fetchone()
+        if duplicate:
+            raise DuplicateMeasurement(f"Pengukuran {data['nama_anak']} tanggal {data['tanggal_pengukuran']} "
+                                       f"sudah tersimpan (ID {duplicate[0]})")
+    c.execute("SELECT * FROM measurements WHERE 1=0")
+    columns = [d[0] for d in c.description if d[0] in data]
+    c.execute(f"INSERT INTO measurements ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+              [key if name == 'child_key' else data[name] for name in columns])
+    refresh_child_state(c, key)
+    rebuild_child_alerts(c, key)
+    return data['id']
+
+def backfill_cutoff_flags(c):
+    # Hanya batas WHO (dihitung di SQL); pemeriksaan antar kunjungan berlaku untuk data baru
+    c.execute(f"UPDATE measurements SET biv_flags = {cutoff_sql()} WHERE biv_flags = 0")
+    c.execute("SELECT DISTINCT child_key FROM measurements WHERE biv_flags <> 0")
+    keys = [row[0] for row in c.fetchall()]
+    for key in keys:
+        refresh_child_state(c, key)
+    count('biv_flagged_total', len(keys), fn='backfill')
+
+class DuplicateMeasurement(ValueError):
+    """Edit yang membuat dua pengukuran anak yang sama pada tanggal yang sama."""
+
+# ========= AUTHENTICATION FUNCTIONS
+def hash_password(password):
+    return hashlib.sha256(password.encode()).hexdigest()
+
+@timed()
+def verify_login(username, password):
+    conn = get_connection()
+    c = conn.cursor()
+    hashed_pw = hash_password(password)
+    c.execute("SELECT * FROM users WHERE username=? AND password=?", (username, hashed_pw))
+    user = c.fetchone()
+    conn.close()
+    return user
+
+@timed()
+def save_measurement(data, z_scores, statuses, risk, status_stunting, username):
+    conn = get_connection()
+    record_id = insert_measurement(conn.cursor(), data, z_scores, statuses, risk, status_stunting, username)
+    conn.commit()
+    conn.close()
+    return record_id
+
+@timed()
+def save_measurements_bulk(records, username, conn=None):
+    """Simpan banyak pengukuran (data, z_scores, statuses, risk, status_stunting) dalam satu transaksi."""
+    own_conn = conn is None
+    conn = conn or get_connection()
+    c = conn.cursor()
+    try:
+        if storage.is_postgres(conn):
+            ids = storage.copy_measurements(c, records, username, scoring_version(), insert_measurement)
+        else:
+            keys = [resolve_child_key(c, make_child_key(d['name'], d.get('birth_date'), d['sex'], d['alamat']))
+                    for d, *_ in records]
+            # Nilai tidak wajar diperiksa sekali untuk seluruh batch (vektor), lalu ikut per baris
+            flags = check_batch(c, record_columns(keys, records)) if records else []
+            ids = [insert_measurement(c, *record, username, flags=int(flag)) for record, flag in zip(records, flags)]
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        if own_conn:
+            conn.close()
+    return ids
+
+# Kunci alami (child_key mencakup nama, tanggal lahir, jenis kelamin & dukuh) + tanggal ukur.
+# Tanpa tanggal lahir kunci anak hanya nama|JK|dukuh, sehingga dua anak senama di dukuh yang sama
+# akan bertabrakan: baris seperti itu tidak memakai kunci alami dan selalu disimpan sebagai baris baru.
+NATURAL_KEY_WHERE = "tanggal_lahir IS NOT NULL"
+
+# Baris yang sudah ada hanya ditulis ulang jika nilainya berbeda; RETURNING tidak menghasilkan
+# baris jika tidak ada yang berubah. revision 0 = baris baru.
+UPSERT_SQL = f'''INSERT INTO measurements
+                 (tanggal_pengukuran, nama_anak, usia_bulan, gender, alamat, berat_badan, tinggi_badan,
+                  lingkar_kepala, wfa_zscore, wfa_status, hfa_zscore, hfa_status, wfh_zscore,
+                  wfh_status, hcfa_zscore, hcfa_status, risiko_stunting_persen, status_stunting, created_by, tanggal_lahir,
+                  child_key, scoring_version, uid, biv_flags)
+                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                 ON CONFLICT(child_key, tanggal_pengukuran) WHERE {NATURAL_KEY_WHERE} DO UPDATE
+                 SET nama_anak=excluded.nama_anak, usia_bulan=excluded.usia_bulan,
+                     berat_badan=excluded.berat_badan, tinggi_badan=excluded.tinggi_badan,
+                     lingkar_kepala=excluded.lingkar_kepala,
+                     wfa_zscore=excluded.wfa_zscore, wfa_status=excluded.wfa_status,
+                     hfa_zscore=excluded.hfa_zscore, hfa_status=excluded.hfa_status,
+                     wfh_zscore=excluded.wfh_zscore, wfh_status=excluded.wfh_status,
+                     hcfa_zscore=excluded.hcfa_zscore, hcfa_status=excluded.hcfa_status,
+                     risiko_stunting_persen=excluded.risiko_stunting_persen, status_stunting=excluded.status_stunting,
+                     tanggal_lahir=excluded.tanggal_lahir, scoring_version=excluded.scoring_version,
+                     biv_flags=excluded.biv_flags, revision=measurements.revision + 1
+                 WHERE measurements.berat_badan IS NOT excluded.berat_badan
+                    OR measurements.tinggi_badan IS NOT excluded.tinggi_badan
+                    OR measurements.lingkar_kepala IS NOT excluded.lingkar_kepala
+                    OR measurements.usia_bulan IS NOT excluded.usia_bulan
+                    OR measurements.scoring_version IS NOT excluded.scoring_version
+                 RETURNING id, revision'''
+
+@timed()
+def insert_measurement(c, data, z_scores, statuses, risk, status_stunting, username, flags=None):
+    key = resolve_child_key(c, make_child_key(data['name'], data.get('birth_date'), data['sex'], data['alamat']))
+    if flags is None:
+        flags = int(check_batch(c, record_columns([key], [(data, z_scores)]))[0])
+    c.execute(UPSERT_SQL,
+              (data['date'], data['name'], data['age'], data['sex'], data['alamat'], data['weight'], data['height'],
+               data['hc'], z_scores['wfa'], statuses['wfa'], z_scores['hfa'], statuses['hfa'],
+               z_scores['wfh'], statuses['wfh'], z_scores['hcfa'], statuses['hcfa'],
+               risk, status_stunting, username, data.get('birth_date') or None, key, scoring_version(),
+               data.get('uid') or uuid.uuid4().hex, flags))
+    row = c.fetchone()
+    if row is None:
+        # Kiriman ulang dengan nilai yang sama (klik ganda, unggah ulang): tidak ada yang ditulis
+        count('measurement_upsert_total', result='sama')
+        c.execute(f"SELECT id FROM measurements WHERE child_key=? AND tanggal_pengukuran=? AND {NATURAL_KEY_WHERE}",
+                  (key, data['date']))
+        return c.fetchone()[0]
+    record_id, revision = row
+    if revision:
+        # Kunci alami sudah ada dengan nilai lain: baris lama diperbarui seperti edit
+        count('measurement_upsert_total', result='diperbarui')
+        c.execute("DELETE FROM growth_alerts WHERE measurement_id=?", (record_id,))
+        if not flags:
+            prev = get_previous_state(c, key, data['date'], record_id)
+            detect_growth_faltering(c, record_id, key, data, z_scores, prev)
+        refresh_child_state(c, key)
+        return record_id
+    if flags:
+        # Nilai tidak wajar: tidak dibandingkan & tidak menjadi kunjungan terakhir anak
+        return record_id
+
+    # Deteksi gagal tumbuh terhadap state terakhir anak (cache), lalu perbarui cache
+    prev = get_previous_state(c, key, data['date'], record_id)
+    detect_growth_faltering(c, record_id, key, data, z_scores, prev)
+    c.execute("SELECT last_date FROM child_state WHERE child_key=?", (key,))
+    cached = c.fetchone()
+    date = iso_date(data['date'])
+    if cached is None or cached[0] is None or date is None or cached[0] <= date:
+        count('child_state_cache_total', result='hit' if cached else 'miss')
+        c.execute('''INSERT OR REPLACE INTO child_state
+                     (child_key, last_measurement_id, last_date, last_age, wfa_zscore, hfa_zscore,
+                      wfa_velocity, hfa_velocity, updated_at)
+                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)''',
+                  (key, record_id, date, data['age'], z_scores['wfa'], z_scores['hfa'],
+                   z_velocity(prev, 'wfa', z_scores['wfa'], data['age']),
+                   z_velocity(prev, 'hfa', z_scores['hfa'], data['age'])))
+    else:
+        count('child_state_cache_total', result='refresh')
+        # Data susulan (tanggal lebih lama dari kunjungan terakhir): hitung ulang dari tabel
+        refresh_child_state(c, key)
+    return record_id
+
+@timed()
+def get_all_measurements(include_archive=False):
+    conn = get_connection()
+    table = 'measurements'
+    if include_archive and not storage.is_postgres(conn):
+        from .archive import attach_archives
+        table = attach_archives(conn)
+    df = pd.read_sql_query(f"SELECT * FROM {table} ORDER BY created_at DESC", conn)
+    conn.close()
+    count('db_rows_scanned_total', len(df), fn='get_all_measurements')
+    return df
+
+@timed()
+def update_measurement(record_id, data, z_scores, statuses, risk, status_stunting):
+    conn = get_connection()
+    try:
+        update_measurement_row(conn.cursor(), record_id, data, z_scores, statuses, risk, status_stunting)
+        conn.commit()
+    finally:
+        conn.close()
+
+def update_measurement_row(c, record_id, data, z_scores, statuses, risk, status_stunting):
+    c.execute("SELECT child_key FROM measurements WHERE id=?", (record_id,))
+    row = c.fetchone()
+    old_key = row[0] if row else None
+    key = resolve_child_key(c, make_child_key(data['name'], data.get('birth_date'), data['sex'], data['alamat']))
+    duplicate = None
+    if data.get('birth_date'):
+        c.execute(f"SELECT id FROM measurements WHERE child_key=? AND tanggal_pengukuran=? AND id<>? AND {NATURAL_KEY_WHERE}",
+                  (key, data['date'], record_id))
+        duplicate = c.fetchone()
+    if duplicate:
+        raise DuplicateMeasurement(f"Pengukuran {data['name']} tanggal {data['date']} sudah tersimpan (ID {duplicate[0]})")
+    flags = int(check_batch(c, record_columns([key], [(data, z_scores)]), exclude_ids=[record_id])[0])
+    c.execute('''UPDATE measurements 
+                 SET tanggal_pengukuran=?, nama_anak=?, usia_bulan=?, gender=?, alamat=?, 
+                     berat_badan=?, tinggi_badan=?, lingkar_kepala=?,
+                     wfa_zscore=?, wfa_status=?, hfa_zscore=?, hfa_status=?, 
+                     wfh_zscore=?, wfh_status=?, hcfa_zscore=?, hcfa_status=?,
+                     risiko_stunting_persen=?, status_stunting=?, tanggal_lahir=?, child_key=?, scoring_version=?,
+                     biv_flags=?, revision=revision + 1
+                 WHERE id=?''',
+              (data['date'], data['name'], data['age'], data['sex'], data['alamat'],
+               data['weight'], data['height'], data['hc'],
+               z_scores['wfa'], statuses['wfa'], z_scores['hfa'], statuses['hfa'],
+               z_scores['wfh'], statuses['wfh'], z_scores['hcfa'], statuses['hcfa'],
+               risk, status_stunting, data.get('birth_date') or None, key, scoring_version(), flags, record_id))
+
+    # Peringatan lama untuk record ini diganti dengan hasil deteksi ulang
+    c.execute("DELETE FROM growth_alerts WHERE measurement_id=?", (record_id,))
+    if not flags:
+        prev = get_previous_state(c, key, data['date'], record_id)
+        detect_growth_faltering(c, record_id, key, data, z_scores, prev)
+    refresh_child_state(c, key)
+    if old_key and old_key != key:
+        refresh_child_state(c, old_key)
+
+@timed()
+def delete_measurement(record_id):
+    conn = get_connection()
+    delete_measurement_row(conn.cursor(), record_id)
+    conn.commit()
+    conn.close()
+
+def delete_measurement_row(c, record_id):
+    c.execute("SELECT child_key FROM measurements WHERE id=?", (record_id,))
+    row = c.fetchone()
+    c.execute('DELETE FROM measurements WHERE id=?', (record_id,))
+    c.execute("DELETE FROM growth_alerts WHERE measurement_id=?", (record_id,))
+    if row and row[0]:
+        refresh_child_state(c, row[0])
+
+@timed()
+def get_measurement_by_id(record_id):
+    conn = get_connection()
+    conn.row_factory = sqlite3.Row
+    c = conn.cursor()
+    c.execute('SELECT * FROM measurements WHERE id=?', (record_id,))
+    result = c.fetchone()
+    conn.close()
+    return result
+
+
+@timed()
+def get_growth_alerts(include_done=False):
+    conn = get_connection()
+    query = '''SELECT id, tanggal_pengukuran, nama_anak, alamat, indikator, jenis,
+                      z_sebelum, z_sekarang, perubahan, kecepatan, measurement_id
+               FROM growth_alerts'''
+    if not include_done:
+        query += " WHERE selesai=0"
+    query += " ORDER BY created_at DESC, id DESC"
+    df = pd.read_sql_query(query, conn)
+    conn.close()
+    count('db_rows_scanned_total', len(df), fn='get_growth_alerts')
+    return df
+
+@timed()
+def resolve_growth_alert(alert_id):
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute("UPDATE growth_alerts SET selesai=1 WHERE id=?", (alert_id,))
+    conn.commit()
+    conn.close()
+
+@timed()
+def get_child_history(data):
+    conn = get_connection()
+    c = conn.cursor()
+    key = resolve_child_key(c, make_child_key(data['name'], data.get('birth_date'), data['sex'], data['alamat']))
+    df = pd.read_sql_query('''SELECT tanggal_pengukuran, usia_bulan, berat_badan, tinggi_badan, lingkar_kepala
+                              FROM measurements WHERE child_key=?
+                              ORDER BY tanggal_pengukuran, id''', conn, params=(key,))
+    conn.close()
+    count('db_rows_scanned_total', len(df), fn='get_child_history')
+    return df
+
+@timed()
+def get_dukuh_stats():
+    # Ringkasan per dukuh dihitung di SQL, tanpa memuat seluruh tabel; nilai tidak wajar tidak dihitung
+    conn = get_connection()
+    df = pd.read_sql_query('''SELECT alamat,
+                                     COUNT(*) AS total_anak,
+                                     SUM(CASE WHEN status_stunting <> 'Tidak Berisiko Stunting' THEN 1 ELSE 0 END) AS berisiko_stunting,
+                                     ROUND(AVG(hfa_zscore), 2) AS rata_rata_haz,
+                                     ROUND(AVG(wfa_zscore), 2) AS rata_rata_waz
+                              FROM measurements
+                              WHERE biv_flags = 0
+                              GROUP BY alamat
+                              ORDER BY berisiko_stunting DESC''', conn)
+    conn.close()
+    df['persentase'] = (df['berisiko_stunting'] / df['total_anak'] * 100).round(1)
+    return df
+
+def get_zscore_summary(indicator, year=None, gender=None, age_band=None, alamat=None):
+    # Dari tabel ringkasan distribution.py (dijaga trigger), bukan kolom *_zscore mentah
+    conn = get_connection()
+    histogram = get_zscore_histogram(conn, indicator, year, gender, age_band, alamat)
+    moments = get_zscore_moments(conn, indicator, gender, age_band, alamat)
+    conn.close()
+    return histogram, moments
@@ -0,0 +1,248 @@
+"""Distribusi Z-Score per dukuh dibanding standar WHO (normal baku), dari ringkasan kecil.
+
+Trigger database memperbarui dua tabel setiap kali ``measurements`` ditulis, jadi semua jalur
+tulis ikut (form, antrian, API, COPY, edit, hapus, skoring ulang, sinkronisasi):
+
+- ``zscore_moments``: n, Σz, Σz² per (bulan, dukuh, JK, kelompok usia, indikator) untuk
+  rata-rata, SD, dan tren bulanan;
+- ``zscore_histogram``: jumlah per bin 0,5 SD dari -6 s/d +6 per (tahun, dukuh, JK, kelompok
+  usia, indikator).
+
+Edit & hapus mengurangi kontribusi baris lama lalu menambah yang baru. Pemindahan ke arsip
+tahunan (archive.py) bukan penghapusan data: trigger hapus dilepas selama transaksi arsip,
+sehingga tren & histogram tahun lama tetap ada, dan hitung ulang membaca view gabungan arsip.
+Nilai tidak wajar (biv_flags ≠ 0) dan Z-Score kosong tidak dihitung. Unitnya pengukuran: anak
+yang datang tiap bulan terhitung sekali per kunjungan.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+from . import storage
+from .metrics import count, timed
+
+INDICATORS = {'wfa': 'BB/U (WAZ)', 'hfa': 'TB/U (HAZ)', 'wfh': 'BB/TB (WHZ)', 'hcfa': 'LK/U (HCZ)'}
+# (batas bawah usia bulan, label); label terakhir berlaku sampai 60 bulan
+AGE_BANDS = [(0, '0-5'), (6, '6-11'), (12, '12-23'), (24, '24-35'), (36, '36-47'), (48, '48-60')]
+BIN_WIDTH = 0.5
+Z_LIMIT = 6
+# Bin -1 = di bawah -6, bin N_BINS = +6 ke atas (tidak terjadi untuk baris wajar)
+N_BINS = int(2 * Z_LIMIT / BIN_WIDTH)
+MOMENT_KEY = ['bulan', 'alamat', 'gender', 'kelompok_usia', 'indikator']
+HISTOGRAM_KEY = ['tahun', 'alamat', 'gender', 'kelompok_usia', 'indikator', 'bin']
+# Populasi rujukan WHO = normal baku: rata-rata 0, SD 1, 2,3% < -2 SD, 0,1% < -3 SD
+WHO_REFERENCE = {'rata_rata': 0.0, 'sd': 1.0,
+                 'persen_bawah_2sd': 50 * math.erfc(2 / math.sqrt(2)),
+                 'persen_bawah_3sd': 50 * math.erfc(3 / math.sqrt(2))}
+# Kolom yang mengubah ringkasan; UPDATE kolom lain (status, created_by, child_key) tidak memicu trigger
+TRIGGER_COLUMNS = ['tanggal_pengukuran', 'alamat', 'gender', 'usia_bulan', 'biv_flags'] + \
+    [f'{k}_zscore' for k in INDICATORS]
+
+SUMMARY_SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS zscore_moments
+       (bulan TEXT NOT NULL,
+        alamat TEXT NOT NULL,
+        gender TEXT NOT NULL,
+        kelompok_usia TEXT NOT NULL,
+        indikator TEXT NOT NULL,
+        n INTEGER NOT NULL,
+        total DOUBLE PRECISION NOT NULL,
+        total_kuadrat DOUBLE PRECISION NOT NULL)''',
+    f"CREATE UNIQUE INDEX IF NOT EXISTS idx_zscore_moments_key ON zscore_moments({', '.join(MOMENT_KEY)})",
+    '''CREATE TABLE IF NOT EXISTS zscore_histogram
+       (tahun TEXT NOT NULL,
+        alamat TEXT NOT NULL,
+        gender TEXT NOT NULL,
+        kelompok_usia TEXT NOT NULL,
+        indikator TEXT NOT NULL,
+        bin INTEGER NOT NULL,
+        n INTEGER NOT NULL)''',
+]
+# Dibuat terakhir: penanda bahwa tabel, trigger & isi awal sudah lengkap (lihat db.init_database)
+HISTOGRAM_INDEX = f"CREATE UNIQUE INDEX idx_zscore_histogram_key ON zscore_histogram({', '.join(HISTOGRAM_KEY)})"
+
+# ========= EKSPRESI SQL
+def age_band_sql(column):
+    cases = ' '.join(f"WHEN {column} < {upper} THEN '{label}'"
+                     for (_, label), (upper, _) in zip(AGE_BANDS, AGE_BANDS[1:]))
+    return f"CASE {cases} ELSE '{AGE_BANDS[-1][1]}' END"
+
+def bin_sql(z, postgres):
+    # CAST di SQLite memotong ke arah nol (= floor karena nilainya ≥ 0); PostgreSQL membulatkan
+    scaled = f"({z} + {Z_LIMIT}) / {BIN_WIDTH}"
+    inner = f"CAST(FLOOR({scaled}) AS INTEGER)" if postgres else f"CAST({scaled} AS INTEGER)"
+    return f"CASE WHEN {z} < -{Z_LIMIT} THEN -1 WHEN {z} >= {Z_LIMIT} THEN {N_BINS} ELSE {inner} END"
+
+def row_values(row):
+    # Satu baris per indikator dari NEW/OLD (trigger) sebagai subquery (indikator, z)
+    return ' UNION ALL '.join(f"SELECT '{k}' AS indikator, {row}.{k}_zscore AS z" for k in INDICATORS)
+
+def summary_statements(row, sign, postgres):
+    """INSERT ... ON CONFLICT yang menambah (sign=1) atau mengurangi (sign=-1) kontribusi satu baris."""
+    where = (f"z IS NOT NULL AND {row}.biv_flags = 0 AND {row}.tanggal_pengukuran IS NOT NULL "
+             f"AND {row}.usia_bulan IS NOT NULL")
+    group = (f"COALESCE({row}.alamat, ''), COALESCE({row}.gender, ''), {age_band_sql(f'{row}.usia_bulan')}, "
+             f"v.indikator")
+    return [
+        f'''INSERT INTO zscore_moments ({', '.join(MOMENT_KEY)}, n, total, total_kuadrat)
+            SELECT substr({row}.tanggal_pengukuran, 1, 7), {group}, {sign}, {sign} * z, {sign} * z * z
+            FROM ({row_values(row)}) v
+            WHERE {where}
+            ON CONFLICT ({', '.join(MOMENT_KEY)}) DO UPDATE
+            SET n = zscore_moments.n + excluded.n,
+                total = CASE WHEN zscore_moments.n + excluded.n = 0 THEN 0
+                             ELSE zscore_moments.total + excluded.total END,
+                total_kuadrat = CASE WHEN zscore_moments.n + excluded.n = 0 THEN 0
+                                     ELSE zscore_moments.total_kuadrat + excluded.total_kuadrat END''',
+        f'''INSERT INTO zscore_histogram ({', '.join(HISTOGRAM_KEY)}, n)
+            SELECT substr({row}.tanggal_pengukuran, 1, 4), {group}, {bin_sql('z', postgres)}, {sign}
+            FROM ({row_values(row)}) v
+            WHERE {where}
+            ON CONFLICT ({', '.join(HISTOGRAM_KEY)}) DO UPDATE
+            SET n = zscore_histogram.n + excluded.n''',
+    ]
+
+def create_triggers(c, postgres):
+    insert, delete = summary_statements('NEW', 1, postgres), summary_statements('OLD', -1, postgres)
+    columns = ', '.join(TRIGGER_COLUMNS)
+    if postgres:
+        c.execute(f'''CREATE OR REPLACE FUNCTION zscore_summary_trigger() RETURNS trigger
+                      LANGUAGE plpgsql AS $$
+                      BEGIN
+                          IF TG_OP <> 'INSERT' THEN {'; '.join(delete)}; END IF;
+                          IF TG_OP <> 'DELETE' THEN {'; '.join(insert)}; END IF;
+                          RETURN NULL;
+                      END $$''')
+        c.execute("DROP TRIGGER IF EXISTS zscore_summary ON measurements")
+        c.execute(f'''CREATE TRIGGER zscore_summary
+                      AFTER INSERT OR UPDATE OF {columns} OR DELETE ON measurements
+                      FOR EACH ROW EXECUTE FUNCTION zscore_summary_trigger()''')
+        return
+    for name, event, statements in (('insert', 'INSERT', insert), ('update', f'UPDATE OF {columns}', delete + insert),
+                                    ('delete', 'DELETE', delete)):
+        for statement in sqlite_trigger(name, event, statements):
+            c.execute(statement)
+
+def sqlite_trigger(name, event, statements):
+    # (DROP, CREATE) satu trigger ringkasan SQLite
+    return (f"DROP TRIGGER IF EXISTS zscore_summary_{name}",
+            f'''CREATE TRIGGER zscore_summary_{name} AFTER {event} ON measurements
+                BEGIN {'; '.join(statements)}; END''')
+
+def delete_trigger_sql():
+    """(DROP, CREATE) trigger hapus SQLite; archive.py melepasnya selama pemindahan ke arsip."""
+    return sqlite_trigger('delete', 'DELETE', summary_statements('OLD', -1, False))
+
+# ========= MIGRASI & HITUNG ULANG
+@timed()
+def rebuild_summaries(c, source='measurements'):
+    """Hitung ulang kedua ringkasan (migrasi, atau jika diragukan).
+
+    `source` = tabel/view pengukuran; di SQLite view gabungan arsip dari archive.attach_archives
+    agar tahun yang sudah diarsipkan tetap masuk ringkasan.
+    """
+    postgres = isinstance(c, storage.PgCursor)
+    values = ' UNION ALL '.join(
+        f'''SELECT tanggal_pengukuran, alamat, gender, usia_bulan, '{k}' AS indikator, {k}_zscore AS z
+            FROM {source}
+            WHERE {k}_zscore IS NOT NULL AND biv_flags = 0 AND tanggal_pengukuran IS NOT NULL
+                  AND usia_bulan IS NOT NULL''' for k in INDICATORS)
+    group = f"COALESCE(alamat, ''), COALESCE(gender, ''), {age_band_sql('usia_bulan')}, indikator"
+    c.execute("DELETE FROM zscore_moments")
+    c.execute("DELETE FROM zscore_histogram")
+    c.execute(f'''INSERT INTO zscore_moments ({', '.join(MOMENT_KEY)}, n, total, total_kuadrat)
+                  SELECT substr(tanggal_pengukuran, 1, 7), {group}, COUNT(*), SUM(z), SUM(z * z)
+                  FROM ({values}) v
+                  GROUP BY substr(tanggal_pengukuran, 1, 7), {group}''')
+    c.execute(f'''INSERT INTO zscore_histogram ({', '.join(HISTOGRAM_KEY)}, n)
+                  SELECT substr(tanggal_pengukuran, 1, 4), {group}, {bin_sql('z', postgres)}, COUNT(*)
+                  FROM ({values}) v
+                  GROUP BY substr(tanggal_pengukuran, 1, 4), {group}, {bin_sql('z', postgres)}''')
+    c.execute("SELECT COUNT(*) FROM zscore_moments")
+    rows = c.fetchone()[0]
+    count('zscore_summary_rebuilds_total')
+    return rows
+
+def init_summaries(c, source='measurements'):
+    """Buat tabel & trigger ringkasan lalu isi dari `source` (sekali, dari init_database)."""
+    postgres = isinstance(c, storage.PgCursor)
+    for statement in SUMMARY_SCHEMA:
+        c.execute(statement)
+    create_triggers(c, postgres)
+    rebuild_summaries(c, source)
+    c.execute(HISTOGRAM_INDEX)
+
+# ========= BACA RINGKASAN
+def _filters(gender, age_band, alamat):
+    clauses, params = [], []
+    for column, value in (('gender', gender), ('kelompok_usia', age_band), ('alamat', alamat)):
+        if value:
+            clauses.append(f"{column} = ?")
+            params.append(value)
+    return clauses, params
+
+@timed()
+def get_zscore_histogram(conn, indicator, year=None, gender=None, age_band=None, alamat=None):
+    """Jumlah per (tahun, dukuh, bin) untuk satu indikator, dijumlah atas filter yang tidak dipilih."""
+    clauses, params = _filters(gender, age_band, alamat)
+    if year:
+        clauses.append("tahun = ?")
+        params.append(str(year))
+    where = ''.join(f" AND {clause}" for clause in clauses)
+    return pd.read_sql_query(f'''SELECT tahun, alamat, bin, SUM(n) AS n FROM zscore_histogram
+                                 WHERE indikator = ? AND n > 0{where}
+                                 GROUP BY tahun, alamat, bin ORDER BY tahun, alamat, bin''', conn, params=[indicator, *params])
+
+@timed()
+def get_zscore_moments(conn, indicator, gender=None, age_band=None, alamat=None):
+    """n, Σz, Σz² per (bulan, dukuh) untuk satu indikator."""
+    clauses, params = _filters(gender, age_band, alamat)
+    where = ''.join(f" AND {clause}" for clause in clauses)
+    return pd.read_sql_query(f'''SELECT bulan, alamat, SUM(n) AS n, SUM(total) AS total,
+                                        SUM(total_kuadrat) AS total_kuadrat
+                                 FROM zscore_moments
+                                 WHERE indikator = ? AND n > 0{where}
+                                 GROUP BY bulan, alamat ORDER BY bulan, alamat''', conn, params=[indicator, *params])
+
+def moment_stats(moments):
+    """Tambahkan rata-rata & SD (sampel) dari kolom n, total, total_kuadrat."""
+    n = moments['n'].astype(float)
+    mean = moments['total'] / n
+    variance = ((moments['total_kuadrat'] - n * mean ** 2) / (n - 1)).where(n > 1)
+    return moments.assign(rata_rata=mean, sd=np.sqrt(variance.clip(lower=0)))
+
+def bin_edges(bins):
+    lower = -Z_LIMIT + np.asarray(bins, dtype=float) * BIN_WIDTH
+    return lower, lower + BIN_WIDTH
+
+def distribution_table(histogram, moments):
+    """Per dukuh (+ baris 'Semua'): n, rata-rata Z, SD, % < -2 SD & < -3 SD, dan selisihnya
+    terhadap WHO_REFERENCE (kolom ``selisih_*``; positif = di atas rujukan).
+
+    Batas -2/-3 SD jatuh tepat di tepi bin, jadi persentasenya persis sama dengan data mentah.
+    """
+    rows = []
+    groups = list(histogram.groupby('alamat')) + [('Semua', histogram)]
+    for alamat, hist in groups:
+        stats = moments if alamat == 'Semua' else moments[moments['alamat'] == alamat]
+        total = stats[['n', 'total', 'total_kuadrat']].sum()
+        summary = moment_stats(pd.DataFrame([total])).iloc[0]
+        upper = bin_edges(hist['bin'])[1]
+        n = hist['n'].sum()
+        values = {
+            'rata_rata': summary['rata_rata'], 'sd': summary['sd'],
+            'persen_bawah_2sd': 100 * hist.loc[upper <= -2, 'n'].sum() / n if n else np.nan,
+            'persen_bawah_3sd': 100 * hist.loc[upper <= -3, 'n'].sum() / n if n else np.nan,
+        }
+        rows.append({
+            'alamat': alamat, 'n': int(n),
+            'rata_rata': round(values['rata_rata'], 2), 'sd': round(values['sd'], 2),
+            'persen_bawah_2sd': round(values['persen_bawah_2sd'], 1),
+            'persen_bawah_3sd': round(values['persen_bawah_3sd'], 1),
+            'selisih_rata_rata': round(values['rata_rata'] - WHO_REFERENCE['rata_rata'], 2),
+            'selisih_sd': round(values['sd'] - WHO_REFERENCE['sd'], 2),
+            'selisih_2sd': round(values['persen_bawah_2sd'] - WHO_REFERENCE['persen_bawah_2sd'], 1),
+            'selisih_3sd': round(values['persen_bawah_3sd'] - WHO_REFERENCE['persen_bawah_3sd'], 1),
+        })
+    return pd.DataFrame(rows)
@@ -0,0 +1,134 @@
+"""Mode antrian (grid): kader mengetik banyak anak sekaligus, lalu menyimpan dalam satu transaksi.
+
+Setiap rerun Streamlit mengirim seluruh isi grid. Hasil skoring disimpan per sidik baris
+(nilai input + tanggal ukur), sehingga hanya baris yang baru diketik/diubah yang diskor ulang,
+dalam satu panggilan score_frame (vektor).
+"""
+import pandas as pd
+
+from .db import get_connection
+from .growth import make_child_key, resolve_child_key
+from .metrics import count, timed
+from .plausibility import check_batch, flag_labels, record_columns
+from .reference import age_in_months_array
+from .scoring import SCORE_COLUMNS, score_frame, scored_records
+
+DUKUH = ["Karangasem", "Bentak", "Gonggangan", "Sukolelo", "Pijinan"]
+# Kolom yang diketik kader (nama kolom = kolom tabel measurements)
+INPUT_COLUMNS = ['nama_anak', 'tanggal_lahir', 'usia_bulan', 'gender', 'alamat',
+                 'berat_badan', 'tinggi_badan', 'lingkar_kepala']
+REQUIRED = {
+    'nama_anak': 'nama', 'gender': 'jenis kelamin', 'alamat': 'dukuh',
+    'berat_badan': 'BB', 'tinggi_badan': 'TB', 'lingkar_kepala': 'LK',
+}
+MAX_AGE = 60
+
+def empty_queue(rows=0):
+    """DataFrame kosong untuk st.data_editor (dtype tetap agar kolom tanggal & angka bisa diedit)."""
+    return pd.DataFrame({
+        'nama_anak': pd.Series([None] * rows, dtype=object),
+        'tanggal_lahir': pd.Series([pd.NaT] * rows, dtype='datetime64[ns]'),
+        'usia_bulan': pd.Series([None] * rows, dtype='Int64'),
+        'gender': pd.Series([None] * rows, dtype=object),
+        'alamat': pd.Series([None] * rows, dtype=object),
+        'berat_badan': pd.Series([None] * rows, dtype=float),
+        'tinggi_badan': pd.Series([None] * rows, dtype=float),
+        'lingkar_kepala': pd.Series([None] * rows, dtype=float),
+    })
+
+def prepare_queue(grid, measured_on):
+    """Normalisasi isi grid: buang baris kosong, tanggal → ISO, usia dari tanggal lahir jika ada."""
+    frame = grid.reindex(columns=INPUT_COLUMNS).copy()
+    frame['nama_anak'] = frame['nama_anak'].astype('string').str.strip().replace('', pd.NA)
+    frame = frame[frame.notna().any(axis=1)]
+
+    birth = pd.to_datetime(frame['tanggal_lahir'], errors='coerce')
+    frame['tanggal_lahir'] = birth.dt.strftime('%Y-%m-%d').astype(object).where(birth.notna(), None)
+    frame['tanggal_pengukuran'] = pd.Timestamp(measured_on).strftime('%Y-%m-%d')
+    computed = age_in_months_array(birth, frame['tanggal_pengukuran']).to_numpy()
+    typed = pd.to_numeric(frame['usia_bulan'], errors='coerce').to_numpy(dtype=float)
+    frame['usia_bulan'] = pd.Series(computed, index=frame.index).where(birth.notna(), typed).round().astype('Int64')
+    frame['nama_anak'] = frame['nama_anak'].astype(object).where(frame['nama_anak'].notna(), None)
+    return frame
+
+def queue_problems(frame):
+    """Catatan per baris (kosong = siap disimpan), dicek sekaligus untuk seluruh antrian."""
+    notes = pd.Series('', index=frame.index, dtype=object)
+    for column, label in REQUIRED.items():
+        notes = notes.mask(frame[column].isna(), notes + f"{label} kosong; ")
+    age = frame['usia_bulan']
+    notes = notes.mask(age.isna(), notes + "tanggal lahir/usia kosong; ")
+    notes = notes.mask(frame['tanggal_lahir'].fillna('') > frame['tanggal_pengukuran'],
+                       notes + "tanggal lahir setelah tanggal ukur; ")
+    notes = notes.mask((age > MAX_AGE).fillna(False), notes + f"usia > {MAX_AGE} bulan; ")
+    key = frame[['nama_anak', 'tanggal_lahir', 'gender', 'alamat']].astype('string').fillna('')
+    key = key['nama_anak'].str.lower() + '|' + key['tanggal_lahir'] + '|' + key['gender'] + '|' + key['alamat']
+    notes = notes.mask(key.duplicated(keep=False) & frame['nama_anak'].notna(), notes + "anak tercatat dua kali; ")
+    return notes.str.rstrip('; ')
+
+def row_signatures(frame):
+    columns = INPUT_COLUMNS + ['tanggal_pengukuran']
+    return pd.Series([repr(row) for row in frame[columns].itertuples(index=False, name=None)], index=frame.index)
+
+@timed()
+def score_queue(frame, cache):
+    """Skor antrian; `cache` (dict sidik baris -> skor) dipakai ulang antar-rerun dan dipangkas.
+
+    Hanya baris lengkap yang belum ada di cache yang dikirim ke score_frame.
+    Mengembalikan salinan frame dengan kolom SCORE_COLUMNS dan kolom 'catatan'.
+    """
+    frame = frame.assign(catatan=queue_problems(frame))
+    signatures = row_signatures(frame)
+    ready = frame['catatan'] == ''
+    missing = ready & ~signatures.isin(cache.keys())
+    if missing.any():
+        scored = score_frame(frame.loc[missing, INPUT_COLUMNS + ['tanggal_pengukuran']])
+        for signature, scores in zip(signatures[missing], scored[SCORE_COLUMNS].to_dict('records')):
+            cache[signature] = scores
+    count('grid_rows_scored_total', int(missing.sum()))
+    count('grid_rows_reused_total', int(ready.sum() - missing.sum()))
+
+    # Baris yang sudah dihapus/diubah dari grid tidak perlu disimpan lagi
+    for stale in set(cache) - set(signatures[ready]):
+        del cache[stale]
+    scores = pd.DataFrame([cache[s] if ok else {} for s, ok in zip(signatures, ready)],
+                          index=frame.index, columns=SCORE_COLUMNS)
+    return pd.concat([frame, scores], axis=1)
+
+def queue_records(scored):
+    """Baris siap simpan sebagai tuple (data, z_scores, statuses, risk, status) untuk save_measurements_bulk."""
+    ready = scored[scored['catatan'] == '']
+    return list(scored_records(ready.assign(usia_bulan=ready['usia_bulan'].astype(int))))
+
+@timed()
+def queue_flags(scored, cache=None):
+    """Label nilai tidak wajar (batas WHO & kunjungan sebelumnya) untuk baris siap simpan.
+
+    `cache` (dict sidik baris -> label) dipakai seperti di score_queue: antar-rerun hanya baris
+    baru/berubah yang dicek ke database. Aman per baris karena anak yang sama tidak boleh
+    tercatat dua kali dalam satu antrian (lihat queue_problems).
+    """
+    cache = {} if cache is None else cache
+    labels = pd.Series('', index=scored.index, dtype=object)
+    ready = scored['catatan'] == ''
+    signatures = row_signatures(scored)
+    missing = ready & ~signatures.isin(cache.keys())
+    if missing.any():
+        pending = scored[missing]
+        records = queue_records(pending)
+        conn = get_connection()
+        try:
+            c = conn.cursor()
+            keys = [resolve_child_key(c, make_child_key(d['name'], d['birth_date'], d['sex'], d['alamat']))
+                    for d, *_ in records]
+            flags = check_batch(c, record_columns(keys, records))
+        finally:
+            conn.close()
+        for signature, flag in zip(signatures[missing], flags):
+            cache[signature] = '; '.join(flag_labels(flag))
+    count('grid_rows_checked_total', int(missing.sum()))
+
+    for stale in set(cache) - set(signatures[ready]):
+        del cache[stale]
+    labels[ready] = [cache[s] for s in signatures[ready]]
+    return labels
@@ -0,0 +1,136 @@
+# ========= DETEKSI GAGAL TUMBUH (GROWTH FALTERING)
+# Penurunan z-score >= 0.67 SD antar kunjungan = melintasi satu garis centile utama
+FALTERING_DROP = 0.67
+FALTERING_THRESHOLDS = [-2, -3]
+FALTERING_INDICATORS = {'hfa': 'TB/U (HAZ)', 'wfa': 'BB/U (WAZ)'}
+
+def make_child_key(name, birth_date, sex, alamat):
+    # Nama dinormalisasi (huruf kecil, spasi tunggal) agar kunjungan berikutnya tetap terhubung
+    nama = " ".join(str(name or "").lower().split())
+    return f"{nama}|{iso_date(birth_date) or ''}|{sex or ''}|{alamat or ''}"
+
+def resolve_child_key(c, child_key):
+    c.execute("SELECT to_key FROM child_aliases WHERE from_key=?", (child_key,))
+    row = c.fetchone()
+    return row[0] if row else child_key
+
+def iso_date(value):
+    if value is None or value == "":
+        return None
+    return str(value)[:10]
+
+def get_previous_state(c, child_key, date, exclude_id):
+    """State kunjungan sebelumnya: dari cache child_state, atau lookup berindeks jika data susulan."""
+    c.execute('''SELECT last_measurement_id, last_date, last_age, wfa_zscore, hfa_zscore
+                 FROM child_state WHERE child_key=?''', (child_key,))
+    row = c.fetchone()
+    date = iso_date(date)
+    if row and row[0] != exclude_id and (date is None or row[1] is None or row[1] <= date):
+        return {'last_measurement_id': row[0], 'last_date': row[1], 'last_age': row[2],
+                'wfa_zscore': row[3], 'hfa_zscore': row[4]}
+
+    # Tanpa `? IS NULL`: PostgreSQL tidak bisa menebak tipe parameter yang bernilai NULL
+    date_filter, params = ('AND tanggal_pengukuran <= ?', (child_key, exclude_id, date)) if date \
+        else ('', (child_key, exclude_id))
+    c.execute(f'''SELECT id, tanggal_pengukuran, usia_bulan, wfa_zscore, hfa_zscore
+                  FROM measurements
+                  WHERE child_key=? AND id<>? AND biv_flags = 0 {date_filter}
+                  ORDER BY tanggal_pengukuran DESC, id DESC LIMIT 1''', params)
+    row = c.fetchone()
+    if not row:
+        return None
+    return {'last_measurement_id': row[0], 'last_date': row[1], 'last_age': row[2],
+            'wfa_zscore': row[3], 'hfa_zscore': row[4]}
+
+def z_velocity(prev, indicator, z_now, age_now):
+    # Kecepatan perubahan z-score per bulan
+    if prev is None or z_now is None or prev[f'{indicator}_zscore'] is None:
+        return None
+    months = (age_now or 0) - (prev['last_age'] or 0)
+    if months <= 0:
+        return None
+    return round((z_now - prev[f'{indicator}_zscore']) / months, 3)
+
+def refresh_child_state(c, child_key):
+    # Hitung ulang cache dari dua kunjungan wajar terakhir anak (lookup berindeks)
+    c.execute('''SELECT id, tanggal_pengukuran, usia_bulan, wfa_zscore, hfa_zscore
+                 FROM measurements WHERE child_key=? AND biv_flags = 0
+                 ORDER BY tanggal_pengukuran DESC, id DESC LIMIT 2''', (child_key,))
+    rows = c.fetchall()
+    if not rows:
+        c.execute("DELETE FROM child_state WHERE child_key=?", (child_key,))
+        return
+    last = rows[0]
+    prev = None
+    if len(rows) > 1:
+        prev = {'last_measurement_id': rows[1][0], 'last_date': rows[1][1], 'last_age': rows[1][2],
+                'wfa_zscore': rows[1][3], 'hfa_zscore': rows[1][4]}
+    c.execute('''INSERT OR REPLACE INTO child_state
+                 (child_key, last_measurement_id, last_date, last_age, wfa_zscore, hfa_zscore,
+                  wfa_velocity, hfa_velocity, updated_at)
+                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)''',
+              (child_key, last[0], last[1], last[2], last[3], last[4],
+               z_velocity(prev, 'wfa', last[3], last[2]),
+               z_velocity(prev, 'hfa', last[4], last[2])))
+
+def faltering_alerts(prev, data, z_scores):
+    """Peringatan (indikator, jenis, z_sebelum, z_sekarang, perubahan, kecepatan) terhadap kunjungan sebelumnya."""
+    if prev is None:
+        return []
+
+    alerts = []
+    for indicator, label in FALTERING_INDICATORS.items():
+        z_now = z_scores.get(indicator)
+        z_prev = prev[f'{indicator}_zscore']
+        if z_now is None or z_prev is None:
+            continue
+        delta = round(z_now - z_prev, 2)
+        velocity = z_velocity(prev, indicator, z_now, data['age'])
+
+        if delta <= -FALTERING_DROP:
+            alerts.append((label, f"Penurunan Z-Score {delta} SD", z_prev, z_now, delta, velocity))
+        for threshold in FALTERING_THRESHOLDS:
+            if z_prev >= threshold > z_now:
+                alerts.append((label, f"Melewati Batas {threshold} SD", z_prev, z_now, delta, velocity))
+    return alerts
+
+def detect_growth_faltering(c, measurement_id, child_key, data, z_scores, prev):
+    """Bandingkan z-score kunjungan ini dengan kunjungan sebelumnya dan tulis baris peringatan."""
+    alerts = faltering_alerts(prev, data, z_scores)
+    c.executemany('''INSERT INTO growth_alerts
+                     (measurement_id, child_key, nama_anak, alamat, tanggal_pengukuran, indikator, jenis,
+                      z_sebelum, z_sekarang, perubahan, kecepatan)
+                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                  [(measurement_id, child_key, data['name'], data['alamat'], data['date'], *alert)
+                   for alert in alerts])
+    return len(alerts)
+
+def rebuild_child_alerts(c, child_key):
+    """Hitung ulang semua peringatan anak dari urutan kunjungan wajarnya.
+
+    Dipakai setelah riwayat anak berubah sekaligus (penggabungan duplikat, skoring ulang).
+    Status selesai & waktu dibuat dipertahankan untuk peringatan yang sama (pengukuran,
+    indikator, jenis), jadi peringatan yang sudah ditangani tidak muncul lagi.
+    """
+    c.execute('''SELECT measurement_id, indikator, jenis, selesai, created_at FROM growth_alerts
+                 WHERE child_key=? OR measurement_id IN (SELECT id FROM measurements WHERE child_key=?)''',
+              (child_key, child_key))
+    existing = {tuple(r[:3]): (r[3], r[4]) for r in c.fetchall()}
+    c.execute('''DELETE FROM growth_alerts
+                 WHERE child_key=? OR measurement_id IN (SELECT id FROM measurements WHERE child_key=?)''',
+              (child_key, child_key))
+    c.execute('''SELECT id, tanggal_pengukuran, usia_bulan, wfa_zscore, hfa_zscore, nama_anak, alamat
+                 FROM measurements WHERE child_key=? AND biv_flags = 0
+                 ORDER BY tanggal_pengukuran, id''', (child_key,))
+    rows, prev = [], None
+    for record_id, date, age, waz, haz, name, alamat in c.fetchall():
+        for alert in faltering_alerts(prev, {'age': age}, {'wfa': waz, 'hfa': haz}):
+            selesai, created_at = existing.get((record_id, alert[0], alert[1]), (0, None))
+            rows.append((record_id, child_key, name, alamat, date, *alert, selesai, created_at))
+        prev = {'last_measurement_id': record_id, 'last_date': date, 'last_age': age,
+                'wfa_zscore': waz, 'hfa_zscore': haz}
+    c.executemany('''INSERT INTO growth_alerts
+                     (measurement_id, child_key, nama_anak, alamat, tanggal_pengukuran, indikator, jenis,
+                      z_sebelum, z_sekarang, perubahan, kecepatan, selesai, created_at)
+                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))''', rows)
+    return len(rows)
@@ -0,0 +1,259 @@
+import json
+from difflib import SequenceMatcher
+
+import pandas as pd
+
+from .db import (
+    DUPLICATE_VALUES, DuplicateMeasurement, get_connection, restore_measurement_row, set_aside_measurement,
+)
+from .growth import iso_date, make_child_key, rebuild_child_alerts, refresh_child_state
+from .metrics import count, timed
+
+# ========= DETEKSI DUPLIKAT & PENGGABUNGAN DATA ANAK (RECORD LINKAGE)
+# Kandidat hanya dibandingkan di dalam blok (dukuh, jenis kelamin, tanggal lahir) lewat
+# indeks fonetik dan trigram, sehingga tidak perlu perbandingan semua pasangan.
+LINKAGE_MIN_SCORE = 0.85
+LINKAGE_MAX_POSTING = 200  # trigram yang terlalu umum dalam satu blok diabaikan
+
+PHONETIC_RULES = [('sy', 's'), ('kh', 'k'), ('dz', 'z'), ('ph', 'f'), ('dj', 'j'),
+                  ('tj', 'c'), ('oe', 'u'), ('ch', 'c'), ('y', 'i'), ('q', 'k'), ('v', 'f')]
+
+def normalize_name(name):
+    return " ".join("".join(ch if ch.isalnum() else " " for ch in str(name or "").lower()).split())
+
+def phonetic_key(token):
+    # Kode fonetik sederhana untuk ejaan nama Indonesia: Aisyah / Aisah / Aishah -> "as"
+    t = token
+    for a, b in PHONETIC_RULES:
+        t = t.replace(a, b)
+    if not t:
+        return ""
+    code = t[0] + "".join(ch for ch in t[1:] if ch not in "aiueoh")
+    return "".join(ch for i, ch in enumerate(code) if i == 0 or ch != code[i - 1])
+
+def name_trigrams(name):
+    padded = f" {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def name_features(name):
+    norm = normalize_name(name)
+    tokens = norm.split()
+    return {'norm': norm, 'tokens': tokens, 'grams': name_trigrams(norm),
+            'phonetic': tuple(phonetic_key(t) for t in tokens)}
+
+def name_similarity(fa, fb, shared=None):
+    if fa['norm'] == fb['norm']:
+        return 1.0
+    # "aisyah" vs "aisyah putri": nama yang satu merupakan awalan nama lainnya
+    shorter, longer = sorted([fa['tokens'], fb['tokens']], key=len)
+    if shorter and longer[:len(shorter) - 1] == shorter[:-1] and longer[len(shorter) - 1].startswith(shorter[-1]):
+        return 0.9
+    if shared is None:
+        shared = len(fa['grams'] & fb['grams'])
+    score = shared / (len(fa['grams']) + len(fb['grams']) - shared)
+    if fa['phonetic'] == fb['phonetic']:
+        score = max(score, 0.85)
+    matcher = SequenceMatcher(None, fa['norm'], fb['norm'])
+    if score < LINKAGE_MIN_SCORE and matcher.quick_ratio() >= LINKAGE_MIN_SCORE:
+        score = max(score, matcher.ratio())
+    return round(score, 3)
+
+@timed()
+def find_duplicate_children(min_score=LINKAGE_MIN_SCORE):
+    """Usulan pasangan anak duplikat dalam satu blok (dukuh, jenis kelamin, tanggal lahir)."""
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute('''SELECT child_key, MAX(nama_anak), MAX(alamat), MAX(gender), MAX(tanggal_lahir), COUNT(*)
+                 FROM measurements WHERE child_key IS NOT NULL
+                 GROUP BY child_key''')
+
+    blocks = {}
+    for key, nama, alamat, gender, lahir, visits in c:
+        blocks.setdefault((alamat, gender, iso_date(lahir)), []).append((key, nama, visits))
+    conn.close()
+    count('db_rows_scanned_total', sum(len(b) for b in blocks.values()), fn='find_duplicate_children')
+
+    candidates = []
+    for (alamat, gender, lahir), children in blocks.items():
+        if len(children) < 2:
+            continue
+        features = [name_features(nama) for _, nama, _ in children]
+
+        # Indeks fonetik (token pertama) + indeks trigram di dalam blok
+        phonetic_index, gram_index = {}, {}
+        for i, f in enumerate(features):
+            if f['phonetic']:
+                phonetic_index.setdefault(f['phonetic'][0], []).append(i)
+            for gram in f['grams']:
+                gram_index.setdefault(gram, []).append(i)
+
+        shared = {}
+        for postings in gram_index.values():
+            if len(postings) > LINKAGE_MAX_POSTING:
+                continue
+            for x in range(len(postings)):
+                for y in range(x + 1, len(postings)):
+                    pair = (postings[x], postings[y])
+                    shared[pair] = shared.get(pair, 0) + 1
+
+        # Kandidat: kode fonetik sama, atau tumpang-tindih trigram (Dice) >= 0.5
+        pairs = {}
+        for (i, j), hits in shared.items():
+            if 2 * hits >= 0.5 * (len(features[i]['grams']) + len(features[j]['grams'])):
+                pairs[(i, j)] = hits
+        for postings in phonetic_index.values():
+            for x in range(len(postings)):
+                for y in range(x + 1, len(postings)):
+                    pair = (postings[x], postings[y])
+                    pairs.setdefault(pair, shared.get(pair, 0))
+
+        for (i, j), hits in pairs.items():
+            score = name_similarity(features[i], features[j], hits)
+            if score < min_score:
+                continue
+            a, b = children[i], children[j]
+            # Anak dengan kunjungan terbanyak dipertahankan sebagai data utama
+            keep, drop = (a, b) if a[2] >= b[2] else (b, a)
+            candidates.append({
+                'keep_key': keep[0], 'keep_nama': keep[1], 'keep_kunjungan': keep[2],
+                'drop_key': drop[0], 'drop_nama': drop[1], 'drop_kunjungan': drop[2],
+                'alamat': alamat, 'gender': gender, 'tanggal_lahir': lahir, 'skor': score,
+            })
+
+    df = pd.DataFrame(candidates)
+    if not df.empty:
+        df = df.sort_values('skor', ascending=False).reset_index(drop=True)
+    return df
+
+MERGE_REASON = 'penggabungan anak'
+
+@timed()
+def merge_children(keep_key, drop_key, username):
+    """Hubungkan ulang semua kunjungan drop_key ke keep_key dan catat aliasnya.
+
+    Nama, tanggal lahir, JK & dukuh tiap kunjungan tidak diubah, sehingga kunci asalnya tetap
+    bisa dihitung ulang dan penggabungan bisa dibatalkan (unmerge_children).
+    """
+    if keep_key == drop_key:
+        return 0
+    conn = get_connection()
+    c = conn.cursor()
+
+    # Kunjungan di kedua kunci pada tanggal yang sama melanggar kunci alami: hanya satu yang tersisa.
+    # Baris keep_key dipertahankan, kecuali nilainya tidak wajar sedangkan baris drop_key wajar.
+    # Baris yang kalah disisihkan ke measurement_duplicates, bukan dihapus
+    c.execute('''SELECT d.id, k.id, d.biv_flags, k.biv_flags
+                 FROM measurements d
+                 JOIN measurements k ON k.child_key=? AND k.tanggal_pengukuran=d.tanggal_pengukuran
+                 WHERE d.child_key=?''', (keep_key, drop_key))
+    removed = set()
+    for drop_id, keep_id, drop_flags, keep_flags in c.fetchall():
+        if drop_id in removed or keep_id in removed:
+            continue
+        loser, winner = (keep_id, drop_id) if keep_flags and not drop_flags else (drop_id, keep_id)
+        identical = set_aside_measurement(c, loser, winner, MERGE_REASON)
+        count('child_merge_same_date_total', result='identik' if identical else 'berbeda')
+        removed.add(loser)
+    c.execute("UPDATE measurements SET child_key=? WHERE child_key=?", (keep_key, drop_key))
+    moved = c.rowcount
+    # Alias lama yang menunjuk ke drop_key ikut diarahkan ke keep_key
+    c.execute("UPDATE child_aliases SET to_key=? WHERE to_key=?", (keep_key, drop_key))
+    c.execute("INSERT OR REPLACE INTO child_aliases (from_key, to_key, merged_by) VALUES (?, ?, ?)",
+              (drop_key, keep_key, username))
+    # Peringatan dihitung ulang: kunjungan sebelumnya bagi tiap kunjungan kini dari deret gabungan
+    for key in (keep_key, drop_key):
+        refresh_child_state(c, key)
+        rebuild_child_alerts(c, key)
+    conn.commit()
+    conn.close()
+    return moved
+
+@timed()
+def unmerge_children(from_key):
+    """Batalkan penggabungan from_key: kunjungan yang kunci asalnya from_key dipisah lagi.
+
+    Baris tanggal sama yang disisihkan saat penggabungan dipulihkan. Alias lain yang ikut
+    diarahkan ke anak tujuan (penggabungan berantai) tetap menunjuk ke anak tujuan.
+    """
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute("SELECT to_key FROM child_aliases WHERE from_key=?", (from_key,))
+    row = c.fetchone()
+    if row is None:
+        conn.close()
+        return 0
+    to_key = row[0]
+    c.execute("DELETE FROM child_aliases WHERE from_key=?", (from_key,))
+    c.execute("SELECT id, nama_anak, tanggal_lahir, gender, alamat FROM measurements WHERE child_key=?", (to_key,))
+    ids = [r[0] for r in c.fetchall() if make_child_key(r[1], r[2], r[3], r[4]) == from_key]
+    c.executemany("UPDATE measurements SET child_key=? WHERE id=?", [(from_key, record_id) for record_id in ids])
+
+    c.execute('''SELECT id, child_key, kept_id, data FROM measurement_duplicates
+                 WHERE alasan=? AND child_key IN (?, ?)''', (MERGE_REASON, from_key, to_key))
+    for duplicate_id, key, kept_id, data in c.fetchall():
+        if key != from_key and kept_id not in ids:
+            continue
+        try:
+            restore_measurement_row(c, json.loads(data))
+        except DuplicateMeasurement:
+            # Tanggal itu sudah terisi lagi sejak digabung: tetap di daftar untuk ditinjau admin
+            continue
+        c.execute("DELETE FROM measurement_duplicates WHERE id=?", (duplicate_id,))
+    for key in (to_key, from_key):
+        refresh_child_state(c, key)
+        rebuild_child_alerts(c, key)
+    conn.commit()
+    conn.close()
+    count('child_unmerge_total')
+    return len(ids)
+
+def get_child_merges():
+    """Riwayat penggabungan (alias) terbaru lebih dulu, dengan nama dari kunci anak."""
+    conn = get_connection()
+    df = pd.read_sql_query("SELECT from_key, to_key, merged_by, merged_at FROM child_aliases ORDER BY merged_at DESC",
+                           conn)
+    conn.close()
+    return df.assign(from_nama=df['from_key'].str.split('|').str[0], to_nama=df['to_key'].str.split('|').str[0])
+
+# ========= TINJAUAN PENGUKURAN GANDA
+def get_duplicate_measurements(include_done=False):
+    """Pengukuran ganda yang disisihkan, berdampingan dengan baris yang dipertahankan.
+
+    Kolom ``*_disisihkan`` berasal dari baris yang disisihkan; kolom tanpa akhiran dari baris
+    yang sekarang tersimpan.
+    """
+    conn = get_connection()
+    query = f'''SELECT d.id, d.created_at, d.alasan, d.tanggal_pengukuran, d.data, m.nama_anak,
+                      {', '.join(f'm.{column}' for column in DUPLICATE_VALUES)}
+               FROM measurement_duplicates d LEFT JOIN measurements m ON m.id = d.kept_id'''
+    if not include_done:
+        query += " WHERE d.selesai=0"
+    df = pd.read_sql_query(query + " ORDER BY d.id DESC", conn)
+    conn.close()
+    stored = [json.loads(text) for text in df.pop('data')]
+    for column in ['nama_anak'] + DUPLICATE_VALUES:
+        df[f'{column}_disisihkan'] = [row.get(column) for row in stored]
+    return df
+
+def use_duplicate_measurement(duplicate_id):
+    """Pakai baris yang disisihkan: baris yang tersimpan ganti disisihkan (selesai), lalu dipulihkan."""
+    conn = get_connection()
+    c = conn.cursor()
+    try:
+        c.execute("SELECT kept_id, data FROM measurement_duplicates WHERE id=?", (duplicate_id,))
+        kept_id, text = c.fetchone()
+        data = json.loads(text)
+        c.execute("SELECT 1 FROM measurements WHERE id=?", (kept_id,))
+        if c.fetchone():
+            set_aside_measurement(c, kept_id, data['id'], "diganti data yang disisihkan", resolved=True)
+        restore_measurement_row(c, data)
+        c.execute("DELETE FROM measurement_duplicates WHERE id=?", (duplicate_id,))
+        conn.commit()
+    finally:
+        conn.close()
+
+def resolve_duplicate_measurement(duplicate_id):
+    conn = get_connection()
+    conn.execute("UPDATE measurement_duplicates SET selesai=1 WHERE id=?", (duplicate_id,))
+    conn.commit()
+    conn.close()
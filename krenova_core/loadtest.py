@@ -0,0 +1,290 @@
+"""Uji beban: banyak sesi kader bersamaan menjalankan alur krenova.py yang sebenarnya.
+
+    python -m krenova_core loadtest --sessions 20 --duration 60 --ai-latency 2.5 --ai-error-rate 0.05
+
+Setiap sesi adalah satu AppTest Streamlit di prosesnya sendiri yang bergantian menjalankan
+skrining, filter admin, dan ekspor CSV pada database SQLite yang sama.
+Gemini diganti klien tiruan lokal lewat ``KRENOVA_AI_STUB`` sehingga tidak memakai kuota.
+Database yang dipakai adalah salinan sementara berisi populasi sintetis (lihat bench.py).
+"""
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from . import db, metrics
+
+APP_PATH = Path(__file__).resolve().parent.parent / 'krenova.py'
+SCENARIOS = {'skrining': 7, 'filter': 2, 'ekspor': 1}
+
+# ========= KLIEN GEMINI TIRUAN
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+class StubModels:
+    def __init__(self, latency, sigma, error_rate):
+        self.latency = latency
+        self.sigma = sigma
+        self.error_rate = error_rate
+
+    def generate_content(self, model, contents):
+        # Latensi log-normal (median = latency) seperti respons LLM; sebagian permintaan gagal
+        time.sleep(random.lognormvariate(np.log(self.latency), self.sigma) if self.latency > 0 else 0)
+        if random.random() < self.error_rate:
+            raise RuntimeError("503 UNAVAILABLE: model sedang sibuk (stub)")
+        return StubResponse(f"[stub {model}] Saran gizi untuk prompt {len(contents)} karakter.")
+
+class StubClient:
+    """Pengganti genai.Client dengan antarmuka models.generate_content yang sama."""
+    def __init__(self, latency=2.0, sigma=0.4, error_rate=0.02):
+        self.models = StubModels(latency, sigma, error_rate)
+
+    @classmethod
+    def from_spec(cls, spec):
+        # "latency=2.5,sigma=0.4,error_rate=0.05" (semua opsional)
+        options = dict(part.split('=', 1) for part in spec.split(',') if '=' in part)
+        return cls(**{k.strip(): float(v) for k, v in options.items()})
+
+# ========= PROBE KONTENSI LOCK SQLITE
+class LockProbe:
+    """Sampel berkala: apakah lock tulis database sedang dipegang penulis lain?
+
+    Tiap sampel mencoba BEGIN IMMEDIATE tanpa menunggu; persentase sampel yang gagal adalah
+    perkiraan porsi waktu lock tulis terpakai (antrean penulis terjadi jika mendekati 100%).
+    """
+    def __init__(self, db_path, interval=0.01):
+        self.db_path = db_path
+        self.interval = interval
+        self.samples = 0
+        self.busy = 0
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, name='krenova-lock-probe', daemon=True)
+
+    def run(self):
+        conn = sqlite3.connect(self.db_path, timeout=0, isolation_level=None)
+        while not self.stop_event.wait(self.interval):
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute("ROLLBACK")
+            except sqlite3.OperationalError:
+                self.busy += 1
+            self.samples += 1
+        conn.close()
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+        return self.busy / self.samples if self.samples else 0.0
+
+# ========= SESI KADER
+def find(widgets, label):
+    return next(w for w in widgets if w.label.strip() == label)
+
+class Session:
+    def __init__(self, index, population, seed, timeout):
+        from streamlit.testing.v1 import AppTest
+
+        self.index = index
+        self.population = population
+        self.rng = random.Random(seed)
+        self.app = AppTest.from_file(str(APP_PATH), default_timeout=timeout)
+        self.admin = None
+
+    def as_admin(self):
+        if self.admin is None:
+            from streamlit.testing.v1 import AppTest
+
+            self.admin = AppTest.from_file(str(APP_PATH), default_timeout=self.app.default_timeout)
+            self.admin.session_state.logged_in = True
+            self.admin.session_state.view_mode = 'admin'
+            self.admin.session_state.role = 'admin'
+            self.admin.session_state.username = f'kader{self.index}'
+            self.admin.session_state.nama_lengkap = f'Kader {self.index}'
+            self.admin.run()
+            find(self.admin.sidebar.radio, "Pilih Menu:").set_value(" Database (Admin)").run()
+        return self.admin
+
+    def skrining(self):
+        at = self.app
+        if not at.button:
+            at.run()
+        r = self.population.iloc[self.rng.randrange(len(self.population))]
+        find(at.date_input, "Tanggal Pengukuran").set_value(date.today())
+        find(at.text_input, "Nama Anak").input(r['nama_anak'])
+        find(at.selectbox, "Alamat Dukuh").set_value(self.rng.choice(find(at.selectbox, "Alamat Dukuh").options))
+        find(at.selectbox, "Jenis Kelamin").set_value(r['gender'])
+        find(at.number_input, "Usia (bulan)").set_value(max(int(r['usia_bulan']), 1))
+        find(at.number_input, "Berat Badan (kg)").set_value(float(r['berat_badan']))
+        find(at.number_input, "Panjang/Tinggi Badan (cm)").set_value(float(r['tinggi_badan']))
+        find(at.number_input, "Lingkar Kepala (cm)").set_value(float(r['lingkar_kepala']))
+        find(at.button, "Analisis Data").click().run()
+        return at
+
+    def filter(self):
+        at = self.as_admin()
+        alamat = find(at.selectbox, "Filter Alamat")
+        alamat.set_value(self.rng.choice(alamat.options))
+        name = self.population['nama_anak'].iloc[self.rng.randrange(len(self.population))].split()[0]
+        find(at.text_input, "Cari Nama Anak").input(name[:self.rng.randint(3, len(name))]).run()
+        return at
+
+    def ekspor(self):
+        # Tanpa filter: seluruh tabel dirender & dijadikan CSV untuk tombol unduh
+        at = self.as_admin()
+        find(at.selectbox, "Filter Alamat").set_value("Semua")
+        find(at.text_input, "Cari Nama Anak").input("").run()
+        return at
+
+def run_session(session, scenarios, deadline, think_time):
+    names, weights = zip(*scenarios.items())
+    records = []
+    while time.monotonic() < deadline:
+        scenario = session.rng.choices(names, weights)[0]
+        start = time.perf_counter()
+        error = None
+        try:
+            at = getattr(session, scenario)()
+            if at.exception:
+                error = at.exception[0].value.splitlines()[0][:200]
+            elif scenario == 'skrining' and not any('berhasil' in s.value for s in at.success):
+                error = "Data tidak tersimpan"
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"[:200]
+        records.append({'sesi': session.index, 'skenario': scenario,
+                        'latensi_s': time.perf_counter() - start, 'error': error})
+        time.sleep(session.rng.uniform(0, 2 * think_time))
+    return records
+
+def session_worker(index, population, seed, timeout, scenarios, duration, think_time, barrier, results):
+    """Satu proses per sesi: AppTest memakai Runtime global sehingga tidak bisa berjalan paralel
+    dalam satu proses. Antar-proses, semua sesi tetap berebut database SQLite yang sama."""
+    db.DB_PATH = os.environ['KRENOVA_DB']
+    records, session = [], None
+    try:
+        session = Session(index, population, seed, timeout)
+        session.app.run()  # pemanasan: import & cache_resource proses ini
+        metrics.reset()
+        # Peringatan deprecation Streamlit dicetak setiap rerun; diset setelah AppTest memuat config
+        from streamlit.logger import set_log_level
+        set_log_level('error')
+    except Exception as e:
+        records.append({'sesi': index, 'skenario': 'persiapan', 'latensi_s': 0.0,
+                        'error': f"{type(e).__name__}: {e}"[:200]})
+    finally:
+        barrier.wait()
+    try:
+        if session is not None:
+            records = run_session(session, scenarios, time.monotonic() + duration, think_time)
+    finally:
+        results.put((records, metrics.snapshot()))
+
+# ========= LAPORAN
+def report(records, wall, lock_busy):
+    df = pd.DataFrame(records, columns=['sesi', 'skenario', 'latensi_s', 'error'])
+    rows = []
+    for name, group in [('semua', df)] + list(df.groupby('skenario')):
+        latency = group['latensi_s'].to_numpy() * 1000
+        rows.append({
+            'skenario': name, 'aksi': len(group), 'aksi_per_detik': round(len(group) / wall, 2),
+            'error_persen': round(group['error'].notna().mean() * 100, 1) if len(group) else 0.0,
+            'p50_ms': round(float(np.percentile(latency, 50)), 1) if len(group) else None,
+            'p95_ms': round(float(np.percentile(latency, 95)), 1) if len(group) else None,
+            'p99_ms': round(float(np.percentile(latency, 99)), 1) if len(group) else None,
+            'maks_ms': round(float(latency.max()), 1) if len(group) else None,
+        })
+    timings, counters = metrics.summary()
+    locked = df['error'].fillna('').str.contains('database is locked').sum()
+    return {
+        'durasi_s': round(wall, 1),
+        'skenario': rows,
+        'sqlite': {
+            'lock_tulis_terpakai_persen': round(lock_busy * 100, 1),
+            'error_database_locked': int(locked),
+            # Waktu tulis termasuk menunggu lock (busy timeout) vs waktu kerja insert itu sendiri
+            'tulis': [t for t in timings if t['fungsi'] in ('db.save_measurement', 'db.insert_measurement')],
+        },
+        'ai': [t for t in timings if t['fungsi'] == 'ai.get_ai_analysis'],
+        'ai_gagal': [c for c in counters if c['counter'] == 'ai_failures_total'],
+        'ai_dialihkan': [c for c in counters if c['counter'] == 'ai_shed_total'],
+        'ditolak': [c for c in counters if c['counter'] == 'admission_rejected_total'],
+        'error_teratas': df['error'].value_counts().head(5).to_dict(),
+    }
+
+# ========= HARNESS
+def run_load_test(sessions=10, duration=60, scenarios=None, think_time=1.0, ai_latency=2.0, ai_sigma=0.4,
+                  ai_error_rate=0.02, seed_rows=10_000, db_path=None, timeout=120, seed=0, admission=False, log=print):
+    """Jalankan `sessions` sesi bersamaan selama `duration` detik; mengembalikan laporan (dict).
+
+    Tanpa `db_path`, database sementara diisi `seed_rows` pengukuran sintetis agar halaman admin
+    bekerja pada data yang realistis. Sesi publik mengirim jauh lebih cepat dari kader sungguhan,
+    jadi kontrol penerimaan (admission.py) dimatikan kecuali `admission=True`; batasnya berlaku
+    per proses, sehingga bucket global tidak dibagi antar-sesi di sini.
+    """
+    from .bench import generate_population, seed_database
+
+    scenarios = scenarios or SCENARIOS
+    original_db, original_cwd = db.DB_PATH, os.getcwd()
+    original_env = {k: os.environ.get(k) for k in ('KRENOVA_AI_STUB', 'KRENOVA_DB', 'KRENOVA_METRICS',
+                                                   'KRENOVA_ADMISSION')}
+    population = generate_population(max(seed_rows, 1_000), seed=seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            if db_path is None:
+                db_path = str(Path(tmp) / 'loadtest.db')
+                seed_database(population.iloc[:seed_rows], db_path)
+            db.DB_PATH = os.environ['KRENOVA_DB'] = str(db_path)
+            os.environ['KRENOVA_AI_STUB'] = f"latency={ai_latency},sigma={ai_sigma},error_rate={ai_error_rate}"
+            # krenova.py memakai path relatif (header, prompt.txt)
+            os.chdir(APP_PATH.parent)
+            os.environ['KRENOVA_METRICS'] = '1'
+            os.environ['KRENOVA_ADMISSION'] = '1' if admission else '0'
+            metrics.reset()
+
+            log(f"Menyiapkan {sessions} sesi (satu proses per sesi)...")
+            ctx = multiprocessing.get_context('spawn')
+            barrier, results = ctx.Barrier(sessions + 1), ctx.Queue()
+            workers = [ctx.Process(target=session_worker, name=f'krenova-sesi-{i}',
+                                   args=(i, population, seed + i, timeout, scenarios, duration, think_time,
+                                         barrier, results))
+                       for i in range(sessions)]
+            for w in workers:
+                w.start()
+            barrier.wait()
+
+            probe = LockProbe(db_path)
+            probe.start()
+            start = time.perf_counter()
+            records = []
+            for _ in workers:
+                session_records, state = results.get()
+                records.extend(session_records)
+                metrics.merge(state)
+            for w in workers:
+                w.join()
+            wall = time.perf_counter() - start
+            lock_busy = probe.stop()
+            result = report(records, wall, lock_busy)
+            result['konfigurasi'] = {'sessions': sessions, 'duration': duration, 'scenarios': scenarios,
+                                     'think_time': think_time, 'ai_latency': ai_latency, 'ai_sigma': ai_sigma,
+                                     'ai_error_rate': ai_error_rate, 'seed_rows': seed_rows, 'admission': admission}
+            return result
+        finally:
+            os.chdir(original_cwd)
+            db.DB_PATH = original_db
+            for k, v in original_env.items():
+                if v is None:
+                    os.environ.pop(k, None)
+                else:
+                    os.environ[k] = v
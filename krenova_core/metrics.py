@@ -0,0 +1,202 @@
+"""Instrumentasi performa: histogram durasi per fungsi & counter, format Prometheus.
+
+Aktif jika ``KRENOVA_METRICS=1`` atau dinyalakan dari panel admin. Saat nonaktif, fungsi
+yang diberi ``@timed()`` hanya menambah satu pengecekan flag per panggilan.
+"""
+import bisect
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+ENABLED = os.environ.get('KRENOVA_METRICS') == '1'
+
+# Batas bucket (detik): 1-1.5-2-3-5-7 per dekade, 0.1 ms s/d 100 detik
+BUCKETS = [round(m * 10.0 ** e, 6) for e in range(-4, 2) for m in (1, 1.5, 2, 3, 5, 7)] + [100.0]
+
+_lock = threading.Lock()
+_histograms = {}   # nama -> [jumlah per bucket (+inf di akhir), total detik, maks detik]
+_counters = {}     # (nama, label) -> nilai
+_caches = {}       # nama -> fungsi lru_cache, hit/miss dibaca dari cache_info() saat ekspor
+
+# ========= PENCATATAN
+def enable():
+    global ENABLED
+    ENABLED = True
+    path = os.environ.get('KRENOVA_METRICS_FILE')
+    if path:
+        start_file_exporter(path)
+
+def disable():
+    global ENABLED
+    ENABLED = False
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+def observe(name, seconds):
+    with _lock:
+        hist = _histograms.get(name)
+        if hist is None:
+            hist = _histograms[name] = [[0] * (len(BUCKETS) + 1), 0.0, 0.0]
+        hist[0][bisect.bisect_left(BUCKETS, seconds)] += 1
+        hist[1] += seconds
+        hist[2] = max(hist[2], seconds)
+
+def count(name, value=1, **labels):
+    if not ENABLED:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+def register_cache(name, fn):
+    # Tanpa overhead per panggilan: statistik diambil dari cache_info() saat ringkasan dibuat
+    _caches[name] = fn
+    return fn
+
+def cache_counters():
+    counters = {}
+    for name, fn in _caches.items():
+        info = fn.cache_info()
+        counters[('cache_hits_total', (('cache', name),))] = info.hits
+        counters[('cache_misses_total', (('cache', name),))] = info.misses
+    return counters
+
+def timed(name=None):
+    """Dekorator: catat durasi fungsi ke histogram `name` (default: modul.fungsi)."""
+    def decorate(fn):
+        metric = name or f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__name__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                observe(metric, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+@contextmanager
+def timer(name):
+    # Untuk blok kode di luar fungsi, mis. agregasi dashboard di krenova.py
+    if not ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start)
+
+def snapshot():
+    # Salinan mentah histogram & counter, untuk digabung dari proses lain (mis. uji beban)
+    with _lock:
+        return {name: [list(h[0]), h[1], h[2]] for name, h in _histograms.items()}, dict(_counters)
+
+def merge(state):
+    histograms, counters = state
+    with _lock:
+        for name, (buckets, total, peak) in histograms.items():
+            hist = _histograms.setdefault(name, [[0] * (len(BUCKETS) + 1), 0.0, 0.0])
+            hist[0] = [a + b for a, b in zip(hist[0], buckets)]
+            hist[1] += total
+            hist[2] = max(hist[2], peak)
+        for key, value in counters.items():
+            _counters[key] = _counters.get(key, 0) + value
+
+# ========= RINGKASAN
+def percentile(buckets, q):
+    # Interpolasi linear di dalam bucket tempat kuantil q berada
+    total = sum(buckets)
+    if total == 0:
+        return None
+    rank = q * total
+    seen = 0
+    for i, n in enumerate(buckets):
+        if n and seen + n >= rank:
+            lower = BUCKETS[i - 1] if i > 0 else 0.0
+            upper = BUCKETS[i] if i < len(BUCKETS) else BUCKETS[-1]
+            return lower + (upper - lower) * (rank - seen) / n
+        seen += n
+    return BUCKETS[-1]
+
+def summary():
+    """Baris per fungsi: jumlah panggilan, rata-rata, p50/p95/p99, maks (ms) dan counter."""
+    with _lock:
+        histograms = {name: (list(h[0]), h[1], h[2]) for name, h in _histograms.items()}
+        counters = {**_counters, **cache_counters()}
+    rows = []
+    for name, (buckets, total, peak) in sorted(histograms.items()):
+        n = sum(buckets)
+        rows.append({
+            'fungsi': name, 'panggilan': n, 'total_ms': round(total * 1000, 1),
+            'rata_ms': round(total / n * 1000, 2),
+            # Interpolasi bucket bisa melewati nilai maksimum yang benar-benar teramati
+            'p50_ms': round(min(percentile(buckets, 0.50), peak) * 1000, 2),
+            'p95_ms': round(min(percentile(buckets, 0.95), peak) * 1000, 2),
+            'p99_ms': round(min(percentile(buckets, 0.99), peak) * 1000, 2),
+            'maks_ms': round(peak * 1000, 2),
+        })
+    counter_rows = [{'counter': name, 'label': ', '.join(f"{k}={v}" for k, v in labels), 'nilai': value}
+                    for (name, labels), value in sorted(counters.items())]
+    return rows, counter_rows
+
+# ========= FORMAT PROMETHEUS
+def _labels(pairs):
+    return '{' + ','.join(f'{k}="{v}"' for k, v in pairs) + '}' if pairs else ''
+
+def prometheus_text():
+    with _lock:
+        histograms = {name: (list(h[0]), h[1]) for name, h in _histograms.items()}
+        counters = {**_counters, **cache_counters()}
+    lines = ['# HELP krenova_duration_seconds Durasi fungsi yang diinstrumentasi',
+             '# TYPE krenova_duration_seconds histogram']
+    for name, (buckets, total) in sorted(histograms.items()):
+        cumulative = 0
+        for bound, n in zip(BUCKETS + ['+Inf'], buckets):
+            cumulative += n
+            lines.append(f'krenova_duration_seconds_bucket{_labels([("fn", name), ("le", bound)])} {cumulative}')
+        lines.append(f'krenova_duration_seconds_sum{_labels([("fn", name)])} {total:.6f}')
+        lines.append(f'krenova_duration_seconds_count{_labels([("fn", name)])} {cumulative}')
+
+    typed = set()
+    for (name, labels), value in sorted(counters.items()):
+        if name not in typed:
+            lines.append(f'# TYPE krenova_{name} counter')
+            typed.add(name)
+        lines.append(f'krenova_{name}{_labels(labels)} {value}')
+    return '\n'.join(lines) + '\n'
+
+def write_prometheus(path):
+    # Tulis atomik (untuk textfile collector node_exporter)
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as f:
+        f.write(prometheus_text())
+    os.replace(tmp, path)
+
+_exporter = None
+
+def start_file_exporter(path, interval=15):
+    """Tulis metrik ke file setiap `interval` detik selama instrumentasi aktif (sekali per proses)."""
+    global _exporter
+    if _exporter is not None:
+        return
+
+    def run():
+        while True:
+            time.sleep(interval)
+            if ENABLED:
+                write_prometheus(path)
+
+    _exporter = threading.Thread(target=run, name='krenova-metrics-file', daemon=True)
+    _exporter.start()
+
+if ENABLED and os.environ.get('KRENOVA_METRICS_FILE'):
+    start_file_exporter(os.environ['KRENOVA_METRICS_FILE'])
@@ -0,0 +1,281 @@
+"""Cermin analitik kolumnar: salinan measurements dalam Parquet berpartisi untuk query ad-hoc.
+
+Analis dinas kesehatan menjalankan query berat (tren 3 tahun per kohort lahir & dukuh) di
+DuckDB atas file Parquet, bukan di database skrining. Cermin dibangun ulang secara berkala:
+
+- baris dibaca per chunk dalam satu statement (snapshot konsisten; di mode WAL tidak
+  memblokir penulis) termasuk arsip tahunan, lalu ditulis per partisi ``tahun=YYYY``;
+- setiap refresh menulis folder versi baru, lalu file ``CURRENT`` diganti secara atomik,
+  sehingga query yang sedang berjalan tetap membaca versi lama sampai selesai;
+- nama & kunci anak diganti ``anak_id`` (hash bergaram), jadi file bisa dibagikan ke analis.
+
+pyarrow (menulis Parquet) dan duckdb (query) terpasang lewat ``pip install -r requirements.txt``.
+"""
+import glob
+import hashlib
+import importlib.util
+import os
+import secrets
+import shutil
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from . import db, storage
+from .metrics import count, timed
+
+MIRROR_DIR = os.environ.get('KRENOVA_MIRROR', 'analitik')
+MIRROR_CHUNKSIZE = 50_000
+# Versi lama disimpan satu lagi untuk query yang masih membacanya saat refresh
+MIRROR_KEEP = 2
+# Batas sumber daya DuckDB per query dari halaman admin (server yang sama dengan aplikasi)
+QUERY_THREADS = 2
+QUERY_MEMORY = '512MB'
+QUERY_TIMEOUT = 30
+QUERY_MAX_ROWS = 10_000
+
+SOURCE_COLUMNS = ['id', 'child_key', 'tanggal_pengukuran', 'tanggal_lahir', 'usia_bulan', 'gender', 'alamat',
+                  'berat_badan', 'tinggi_badan', 'lingkar_kepala', 'wfa_zscore', 'wfa_status', 'hfa_zscore',
+                  'hfa_status', 'wfh_zscore', 'wfh_status', 'hcfa_zscore', 'hcfa_status', 'risiko_stunting_persen',
+                  'status_stunting', 'biv_flags', 'scoring_version', 'created_at']
+
+def parquet_schema():
+    import pyarrow as pa
+
+    text, real = pa.string(), pa.float64()
+    return pa.schema([
+        ('id', pa.int64()), ('anak_id', text), ('tanggal_pengukuran', pa.date32()), ('tanggal_lahir', pa.date32()),
+        ('tahun_lahir', pa.int32()), ('usia_bulan', pa.int32()), ('gender', text), ('alamat', text),
+        ('berat_badan', real), ('tinggi_badan', real), ('lingkar_kepala', real),
+        ('wfa_zscore', real), ('wfa_status', text), ('hfa_zscore', real), ('hfa_status', text),
+        ('wfh_zscore', real), ('wfh_status', text), ('hcfa_zscore', real), ('hcfa_status', text),
+        ('risiko_stunting_persen', real), ('status_stunting', text), ('biv_flags', pa.int32()),
+        ('scoring_version', text), ('created_at', pa.timestamp('s')),
+    ])
+
+# ========= REFRESH
+def mirror_salt(directory=MIRROR_DIR):
+    # Garam tetap antar-refresh agar anak_id stabil, tetapi tidak bisa ditebak dari nama
+    path = os.path.join(directory, '.salt')
+    if not os.path.exists(path):
+        os.makedirs(directory, exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(secrets.token_hex(16))
+    with open(path) as f:
+        return f.read().strip()
+
+def mirror_frame(chunk, salt):
+    """Chunk measurements -> kolom cermin (tanggal bertipe, anak_id, tahun partisi)."""
+    measured = pd.to_datetime(chunk['tanggal_pengukuran'], errors='coerce')
+    born = pd.to_datetime(chunk['tanggal_lahir'], errors='coerce')
+    frame = chunk.drop(columns=['child_key']).assign(
+        anak_id=[hashlib.sha1(f"{salt}|{key}".encode()).hexdigest()[:16] for key in chunk['child_key']],
+        tanggal_pengukuran=measured, tanggal_lahir=born, tahun_lahir=born.dt.year,
+        created_at=pd.to_datetime(chunk['created_at'], errors='coerce').dt.floor('s'),
+        biv_flags=chunk['biv_flags'].fillna(0),
+    )
+    # Tanpa tanggal ukur -> partisi tahun=0
+    return frame, measured.dt.year.fillna(0).astype(int)
+
+@timed()
+def refresh_mirror(directory=MIRROR_DIR, chunksize=MIRROR_CHUNKSIZE, include_archive=True, db_path=None):
+    """Bangun versi cermin baru dari database. Mengembalikan ringkasan (versi, baris, detik)."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    start = time.perf_counter()
+    salt = mirror_salt(directory)
+    version = datetime.now().strftime('measurements-%Y%m%d-%H%M%S-%f')
+    target = os.path.join(directory, version)
+    schema = parquet_schema()
+    writers, rows = {}, 0
+
+    conn = db.get_connection(db_path)
+    try:
+        table = 'measurements'
+        if include_archive and not storage.is_postgres(conn):
+            from .archive import attach_archives
+            table = attach_archives(conn, db_path)
+        query = f"SELECT {', '.join(SOURCE_COLUMNS)} FROM {table} ORDER BY id"
+        for chunk in pd.read_sql_query(query, conn, chunksize=chunksize):
+            frame, years = mirror_frame(chunk, salt)
+            for year, part in frame.groupby(years.to_numpy()):
+                if year not in writers:
+                    os.makedirs(os.path.join(target, f"tahun={year}"), exist_ok=True)
+                    writers[year] = pq.ParquetWriter(os.path.join(target, f"tahun={year}", 'data.parquet'),
+                                                     schema, compression='zstd')
+                arrays = pa.Table.from_pandas(part, preserve_index=False).select(schema.names).cast(schema)
+                writers[year].write_table(arrays)
+            rows += len(chunk)
+    except BaseException:
+        # Versi setengah jadi dibuang; CURRENT tetap menunjuk versi lama
+        for writer in writers.values():
+            writer.close()
+        shutil.rmtree(target, ignore_errors=True)
+        raise
+    finally:
+        conn.close()
+    for writer in writers.values():
+        writer.close()
+
+    if rows == 0:
+        shutil.rmtree(target, ignore_errors=True)
+        return {'versi': None, 'baris': 0, 'detik': round(time.perf_counter() - start, 2)}
+    # Ganti pointer secara atomik, lalu hapus versi lama (satu versi sebelumnya dipertahankan)
+    with open(os.path.join(directory, 'CURRENT.tmp'), 'w') as f:
+        f.write(version)
+    os.replace(os.path.join(directory, 'CURRENT.tmp'), os.path.join(directory, 'CURRENT'))
+    for old in sorted(glob.glob(os.path.join(directory, 'measurements-*')))[:-MIRROR_KEEP]:
+        shutil.rmtree(old, ignore_errors=True)
+    count('mirror_rows_total', rows)
+    return {'versi': version, 'baris': rows, 'partisi': len(writers),
+            'detik': round(time.perf_counter() - start, 2)}
+
+def current_version(directory=MIRROR_DIR):
+    try:
+        with open(os.path.join(directory, 'CURRENT')) as f:
+            return os.path.join(directory, f.read().strip())
+    except FileNotFoundError:
+        return None
+
+def mirror_status(directory=MIRROR_DIR):
+    """Versi aktif, waktu refresh, jumlah baris & ukuran per partisi (dari metadata Parquet)."""
+    path = current_version(directory)
+    if path is None or not os.path.isdir(path):
+        return None
+    import pyarrow.parquet as pq
+
+    partitions = []
+    for file in sorted(glob.glob(os.path.join(path, 'tahun=*', '*.parquet'))):
+        partitions.append({'tahun': int(os.path.basename(os.path.dirname(file)).split('=')[1]),
+                           'baris': pq.ParquetFile(file).metadata.num_rows,
+                           'ukuran_kb': round(os.path.getsize(file) / 1024, 1)})
+    return {'versi': os.path.basename(path), 'diperbarui': datetime.fromtimestamp(os.path.getmtime(path)),
+            'baris': sum(p['baris'] for p in partitions), 'partisi': partitions}
+
+_scheduler = None
+
+def start_mirror_scheduler(directory=MIRROR_DIR, interval_minutes=60):
+    """Refresh berkala di thread latar (sekali per proses), mis. dari krenova.py."""
+    global _scheduler
+    if _scheduler is not None:
+        return
+
+    def run():
+        while True:
+            path = current_version(directory)
+            last = os.path.getmtime(path) if path and os.path.isdir(path) else 0
+            wait = last + interval_minutes * 60 - time.time()
+            if wait > 0:
+                time.sleep(min(wait, 600))
+                continue
+            try:
+                refresh_mirror(directory)
+            except Exception:
+                count('mirror_failures_total')
+                time.sleep(600)
+
+    _scheduler = threading.Thread(target=run, name='krenova-mirror', daemon=True)
+    _scheduler.start()
+
+# ========= QUERY (DuckDB)
+class MirrorUnavailable(RuntimeError):
+    """Cermin belum dibangun atau DuckDB belum terpasang."""
+
+def missing_packages():
+    # pyarrow menulis Parquet, duckdb menjalankan query; keduanya ada di requirements.txt, tapi
+    # instalasi lama yang belum diperbarui tetap diberi pesan, bukan error import
+    return [name for name in ('pyarrow', 'duckdb') if importlib.util.find_spec(name) is None]
+
+def connect(directory=MIRROR_DIR):
+    """Koneksi DuckDB in-memory dengan view `measurements` di atas versi cermin aktif.
+
+    Akses file di luar folder cermin dimatikan dan konfigurasi dikunci, sehingga SQL dari
+    halaman admin tidak bisa membaca/menulis file lain atau menaikkan batas sumber daya.
+    """
+    try:
+        import duckdb
+    except ImportError:
+        raise MirrorUnavailable("DuckDB belum terpasang: pip install -r requirements.txt")
+    path = current_version(directory)
+    if path is None or not os.path.isdir(path):
+        raise MirrorUnavailable("Cermin analitik belum dibangun: python -m krenova_core mirror refresh")
+
+    path = os.path.abspath(path)
+    con = duckdb.connect(':memory:')
+    con.execute(f"SET threads={QUERY_THREADS}")
+    con.execute(f"SET memory_limit='{QUERY_MEMORY}'")
+    con.execute(f"SET allowed_directories=['{path}/']")
+    con.execute("SET enable_external_access=false")
+    con.execute(f'''CREATE VIEW measurements AS
+                    SELECT * FROM read_parquet('{path}/tahun=*/*.parquet', hive_partitioning=true)''')
+    con.execute("SET lock_configuration=true")
+    return con
+
+@timed()
+def run_query(sql, directory=MIRROR_DIR, max_rows=QUERY_MAX_ROWS, timeout=QUERY_TIMEOUT):
+    """Jalankan satu SELECT di cermin. Mengembalikan (DataFrame, terpotong?).
+
+    Kesalahan SQL, statement selain SELECT, dan query melewati `timeout` menjadi ValueError.
+    """
+    import duckdb
+
+    con = connect(directory)
+    timer = threading.Timer(timeout, con.interrupt)
+    timer.start()
+    try:
+        relation = con.sql(sql)
+        if relation is None:
+            raise ValueError("Hanya query SELECT yang didukung")
+        df = relation.limit(max_rows + 1).df()
+    except duckdb.InterruptException:
+        raise ValueError(f"Query dihentikan: lebih dari {timeout} detik")
+    except duckdb.Error as e:
+        # Kesalahan SQL dari analis ditampilkan apa adanya (tanpa traceback)
+        raise ValueError(str(e))
+    finally:
+        timer.cancel()
+        con.close()
+    count('mirror_queries_total')
+    return df.head(max_rows), len(df) > max_rows
+
+# ========= LAPORAN SIAP PAKAI
+# Nilai tidak wajar (biv_flags) tidak dihitung; per anak dipakai pengukuran terakhir di tiap tahun
+REPORTS = {
+    "Prevalensi stunting per kohort lahir & dukuh (3 tahun terakhir)": '''
+        WITH terakhir AS (
+            SELECT * FROM measurements
+            WHERE biv_flags = 0 AND tahun >= (SELECT MAX(tahun) FROM measurements) - 2 AND tahun_lahir IS NOT NULL
+            QUALIFY ROW_NUMBER() OVER (PARTITION BY anak_id, tahun ORDER BY tanggal_pengukuran DESC) = 1
+        )
+        SELECT tahun, alamat, tahun_lahir AS kohort_lahir,
+               COUNT(*) AS anak,
+               ROUND(100.0 * AVG(CASE WHEN hfa_zscore < -2 THEN 1 ELSE 0 END), 1) AS persen_stunting,
+               ROUND(AVG(hfa_zscore), 2) AS rata_haz
+        FROM terakhir
+        GROUP BY ALL
+        ORDER BY tahun, alamat, kohort_lahir''',
+    "Tren bulanan per dukuh": '''
+        SELECT date_trunc('month', tanggal_pengukuran) AS bulan, alamat,
+               COUNT(*) AS pengukuran,
+               ROUND(100.0 * AVG(CASE WHEN hfa_zscore < -2 THEN 1 ELSE 0 END), 1) AS persen_stunting,
+               ROUND(100.0 * AVG(CASE WHEN wfh_zscore < -2 THEN 1 ELSE 0 END), 1) AS persen_wasting,
+               ROUND(100.0 * AVG(CASE WHEN wfa_zscore < -2 THEN 1 ELSE 0 END), 1) AS persen_underweight
+        FROM measurements
+        WHERE biv_flags = 0 AND tanggal_pengukuran IS NOT NULL
+        GROUP BY ALL
+        ORDER BY bulan, alamat''',
+    "Rata-rata Z-Score per kelompok usia & jenis kelamin": '''
+        SELECT CASE WHEN usia_bulan < 6 THEN '0-5' WHEN usia_bulan < 12 THEN '6-11'
+                    WHEN usia_bulan < 24 THEN '12-23' WHEN usia_bulan < 36 THEN '24-35'
+                    WHEN usia_bulan < 48 THEN '36-47' ELSE '48-60' END AS kelompok_usia,
+               gender, COUNT(*) AS pengukuran,
+               ROUND(AVG(wfa_zscore), 2) AS rata_waz, ROUND(AVG(hfa_zscore), 2) AS rata_haz,
+               ROUND(AVG(wfh_zscore), 2) AS rata_whz, ROUND(AVG(hcfa_zscore), 2) AS rata_hcz
+        FROM measurements
+        WHERE biv_flags = 0
+        GROUP BY ALL
+        ORDER BY min(usia_bulan), gender''',
+}
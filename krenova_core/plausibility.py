@@ -0,0 +1,147 @@
+"""Penanda nilai tidak wajar secara biologis (biologically implausible values, BIV).
+
+Salah ketik (BB 1,2 kg padahal 12,0 kg) menghasilkan Z-Score ekstrem yang merusak rata-rata
+per dukuh. Setiap pengukuran diberi bitmask ``biv_flags``:
+
+- batas pembersihan WHO (igrowup): BB/U < -6 atau > +5, TB/U di luar ±6, BB/TB & LK/U di luar ±5;
+- pemeriksaan antar kunjungan terhadap kunjungan wajar terakhir anak yang sama: tinggi turun
+  lebih dari MAX_HEIGHT_LOSS cm, atau BB/U / TB/U melompat lebih dari MAX_Z_JUMP SD.
+
+Baris bertanda tetap disimpan (bisa dikoreksi admin), tetapi tidak ikut agregat dashboard,
+deteksi gagal tumbuh, maupun cache child_state. Semua pemeriksaan berupa operasi array.
+"""
+import numpy as np
+import pandas as pd
+
+from .growth import iso_date
+from .metrics import count, timed
+
+# indikator -> (batas bawah, batas atas) Z-Score
+WHO_LIMITS = {'wfa': (-6, 5), 'hfa': (-6, 6), 'wfh': (-5, 5), 'hcfa': (-5, 5)}
+# Toleransi ukur: tinggi berdiri ±0,7 cm lebih pendek dari panjang badan (pergantian di usia 24 bulan)
+MAX_HEIGHT_LOSS = 2.0
+MAX_Z_JUMP = 3.0
+
+FLAG_BITS = {
+    'wfa': 1, 'hfa': 2, 'wfh': 4, 'hcfa': 8,
+    'tb_turun': 16, 'lompatan_waz': 32, 'lompatan_haz': 64,
+}
+FLAG_LABELS = {
+    'wfa': "BB/U di luar -6/+5 SD",
+    'hfa': "TB/U di luar ±6 SD",
+    'wfh': "BB/TB di luar ±5 SD",
+    'hcfa': "LK/U di luar ±5 SD",
+    'tb_turun': f"Tinggi turun > {MAX_HEIGHT_LOSS:g} cm dari kunjungan sebelumnya",
+    'lompatan_waz': f"BB/U berubah > {MAX_Z_JUMP:g} SD dari kunjungan sebelumnya",
+    'lompatan_haz': f"TB/U berubah > {MAX_Z_JUMP:g} SD dari kunjungan sebelumnya",
+}
+CUTOFF_MASK = sum(FLAG_BITS[k] for k in WHO_LIMITS)
+VISIT_MASK = sum(FLAG_BITS.values()) - CUTOFF_MASK
+# Kolom yang dibandingkan antar kunjungan
+HISTORY_COLUMNS = ['tinggi_badan', 'wfa_zscore', 'hfa_zscore']
+
+def cutoff_flags(z):
+    """Bit batas WHO untuk dict indikator -> array Z-Score (NaN = tidak diperiksa)."""
+    flags = 0
+    for indicator, (low, high) in WHO_LIMITS.items():
+        values = np.asarray(z[indicator], dtype=float)
+        with np.errstate(invalid='ignore'):
+            flags = flags | np.where((values < low) | (values > high), FLAG_BITS[indicator], 0)
+    return np.asarray(flags, dtype=int)
+
+def cutoff_sql():
+    """Ekspresi SQL yang setara cutoff_flags, untuk mengisi baris lama tanpa memuatnya ke Python."""
+    return ' + '.join(f"(CASE WHEN {k}_zscore < {low} OR {k}_zscore > {high} THEN {FLAG_BITS[k]} ELSE 0 END)"
+                      for k, (low, high) in WHO_LIMITS.items())
+
+def visit_flags(current, previous):
+    """Bit antar kunjungan; `current` & `previous` berisi array HISTORY_COLUMNS (NaN = tidak ada)."""
+    height, prev_height = (np.asarray(v['tinggi_badan'], dtype=float) for v in (current, previous))
+    with np.errstate(invalid='ignore'):
+        flags = np.where(prev_height - height > MAX_HEIGHT_LOSS, FLAG_BITS['tb_turun'], 0)
+        for indicator, name in (('wfa', 'lompatan_waz'), ('hfa', 'lompatan_haz')):
+            delta = np.asarray(current[f'{indicator}_zscore'], dtype=float) - \
+                np.asarray(previous[f'{indicator}_zscore'], dtype=float)
+            flags = flags | np.where(np.abs(delta) > MAX_Z_JUMP, FLAG_BITS[name], 0)
+    return flags.astype(int)
+
+def flag_labels(mask):
+    mask = int(mask or 0)
+    return [label for name, label in FLAG_LABELS.items() if mask & FLAG_BITS[name]]
+
+def load_history(c, keys, exclude_ids=()):
+    """Kunjungan wajar (biv_flags = 0) yang sudah tersimpan untuk anak-anak `keys`."""
+    keys = list(dict.fromkeys(keys))
+    rows = []
+    # Per 500 kunci: di bawah batas parameter SQLite
+    for start in range(0, len(keys), 500):
+        chunk = keys[start:start + 500]
+        c.execute(f'''SELECT id, child_key, tanggal_pengukuran, {', '.join(HISTORY_COLUMNS)}
+                      FROM measurements
+                      WHERE child_key IN ({', '.join('?' * len(chunk))}) AND biv_flags = 0
+                            AND tanggal_pengukuran IS NOT NULL''', chunk)
+        rows.extend(c.fetchall())
+    history = pd.DataFrame(rows, columns=['id', 'child_key', 'tanggal_pengukuran'] + HISTORY_COLUMNS)
+    return history[~history['id'].isin(list(exclude_ids))]
+
+def previous_visit(c, child_key, date, exclude_ids=()):
+    exclude = list(exclude_ids)
+    c.execute(f'''SELECT {', '.join(HISTORY_COLUMNS)} FROM measurements
+                  WHERE child_key=? AND tanggal_pengukuran < ? AND biv_flags = 0
+                        {f"AND id NOT IN ({', '.join('?' * len(exclude))})" if exclude else ''}
+                  ORDER BY tanggal_pengukuran DESC, id DESC LIMIT 1''', [child_key, date, *exclude])
+    row = c.fetchone()
+    return dict(zip(HISTORY_COLUMNS, ([v] for v in row))) if row else None
+
+@timed()
+def check_batch(c, batch, exclude_ids=()):
+    """Bitmask biv_flags untuk satu batch pengukuran (satu baris untuk submit tunggal).
+
+    `batch` = dict kolom dari record_columns. Kunjungan sebelumnya diambil dari database (satu
+    query per 500 anak) dan dari batch itu sendiri; baris tersimpan dengan tanggal yang sama
+    dianggap akan ditimpa. Submit tunggal tidak membuat DataFrame (jalur form skrining).
+    """
+    flags = cutoff_flags({k: batch[f'{k}_zscore'] for k in WHO_LIMITS})
+    dated = np.array([day is not None for day in batch['tanggal_pengukuran']])
+    if len(dated) == 1 and dated[0]:
+        # Submit tunggal: kunjungan sebelumnya cukup diambil lewat indeks (child_key, tanggal)
+        previous = previous_visit(c, batch['child_key'][0], batch['tanggal_pengukuran'][0], exclude_ids)
+        if previous is not None:
+            flags = flags | visit_flags(batch, previous)
+    elif dated.any():
+        batch = pd.DataFrame(batch)
+        history = load_history(c, batch.loc[dated, 'child_key'], exclude_ids)
+        replaced = history.set_index(['child_key', 'tanggal_pengukuran']).index.isin(
+            batch.set_index(['child_key', 'tanggal_pengukuran']).index)
+        history = history[~replaced].assign(pos=-1)
+        incoming = batch.loc[dated, ['child_key', 'tanggal_pengukuran'] + HISTORY_COLUMNS].assign(
+            pos=np.flatnonzero(dated))
+        visits = pd.concat([history.drop(columns='id'), incoming], ignore_index=True)
+        visits = visits.sort_values(['child_key', 'tanggal_pengukuran', 'pos'], kind='stable')
+        is_new = visits['pos'].to_numpy() >= 0
+        positions = visits.loc[is_new, 'pos'].to_numpy()
+
+        # Kunjungan pembanding = kunjungan wajar terakhir sebelumnya. Baris batch yang ditandai
+        # tidak boleh jadi pembanding; diulang sampai stabil (biasanya 1–2 putaran).
+        for _ in range(len(batch)):
+            usable = ~is_new.copy()
+            usable[is_new] = flags[positions] == 0
+            masked = visits[HISTORY_COLUMNS].where(pd.Series(usable, index=visits.index), axis=0)
+            previous = masked.groupby(visits['child_key']).shift(1).groupby(visits['child_key']).ffill()
+            new_flags = (flags[positions] & CUTOFF_MASK) | visit_flags(
+                {col: visits.loc[is_new, col] for col in HISTORY_COLUMNS},
+                {col: previous.loc[is_new, col] for col in HISTORY_COLUMNS})
+            if np.array_equal(new_flags, flags[positions]):
+                break
+            flags[positions] = new_flags
+    count('biv_flagged_total', int(np.count_nonzero(flags)))
+    return flags
+
+def record_columns(keys, records):
+    """Kolom check_batch dari tuple (data, z_scores, statuses, risk, status); None -> NaN."""
+    return {
+        'child_key': list(keys),
+        'tanggal_pengukuran': [iso_date(d['date']) for d, *_ in records],
+        'tinggi_badan': np.array([d['height'] for d, *_ in records], dtype=float),
+        **{f'{k}_zscore': np.array([z[k] for _, z, *_ in records], dtype=float) for k in WHO_LIMITS},
+    }
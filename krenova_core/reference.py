@@ -0,0 +1,194 @@
+import os
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .metrics import register_cache
+
+# ========= BACA DATA
+# Tabel LMS WHO ada di root repositori (sejajar dengan krenova.py)
+DATA_DIR = Path(os.environ.get('KRENOVA_DATA_DIR', Path(__file__).resolve().parent.parent))
+
+REFERENCE_FILES = {'wfa': "wfa-all.csv", 'hfa': "lhfa-all.csv", 'wfh': "wfh-all.csv", 'hcfa': "hcfa-all.csv"}
+
+# Dibaca saat pertama kali dibutuhkan (sekali per proses), bukan saat import: halaman yang tidak
+# menghitung Z-Score tidak ikut membayar pembacaan CSV
+@lru_cache(maxsize=None)
+def load_reference():
+    return {name: pd.read_csv(DATA_DIR / filename) for name, filename in REFERENCE_FILES.items()}
+
+# Grid numpy (posisi usia/tinggi, gender, pengukuran) -> L, M, S untuk lookup vektor tanpa pandas
+def build_lms_grid(table, x_col, step, type_col=None):
+    x = table[x_col].to_numpy(dtype=float)
+    x0 = x.min()
+    xi = np.rint((x - x0) / step).astype(int)
+    si = (table['Gender'] == 'P').to_numpy().astype(int)
+    ti = (table[type_col] == 'Height').to_numpy().astype(int) if type_col else np.zeros(len(table), dtype=int)
+    grid = np.full((xi.max() + 1, 2, 2, 3), np.nan)
+    grid[xi, si, ti] = table[['L', 'M', 'S']].to_numpy(dtype=float)
+    return x0, step, grid
+
+@lru_cache(maxsize=None)
+def lms_grid():
+    tables = load_reference()
+    return {
+        'wfa': build_lms_grid(tables['wfa'], 'Usia', 1),
+        'hfa': build_lms_grid(tables['hfa'], 'Usia', 1),
+        'hcfa': build_lms_grid(tables['hcfa'], 'Usia', 1),
+        'wfh': build_lms_grid(tables['wfh'], 'Tinggi', 0.5, 'Pengukuran'),
+    }
+
+# ========== FUNGSI Z-Score
+def who_zscore(x, L, M, S):
+    if L == 0:
+        return np.log(x/M)/S
+    return ((x / M) ** L - 1) / (L * S)
+
+## Versi array dari who_zscore (NaN jika referensi tidak ditemukan)
+def who_zscore_array(x, L, M, S):
+    x, L, M, S = (np.asarray(v, dtype=float) for v in (x, L, M, S))
+    safe_L = np.where(L == 0, 1.0, L)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        box_cox = ((x / M) ** safe_L - 1) / (safe_L * S)
+        return np.where(L == 0, np.log(x / M) / S, box_cox)
+
+## Kebalikan Z-Score: nilai pengukuran pada Z-Score tertentu (bisa berupa array)
+def who_inverse(z, L, M, S):
+    z, L, M, S = (np.asarray(v, dtype=float) for v in (z, L, M, S))
+    safe_L = np.where(L == 0, 1.0, L)
+    box_cox = M * np.power(np.maximum(1 + safe_L * S * z, 0), 1 / safe_L)
+    return np.where(L == 0, M * np.exp(S * z), box_cox)
+
+def lookup_lms(indicator, x, sex, m_type=None):
+    """L, M, S untuk setiap baris (array), NaN jika tidak ada di tabel WHO.
+
+    x = usia (bulan) atau tinggi (sudah dibulatkan 0.5 cm); m_type = "Length"/"Height" untuk BB/TB.
+    """
+    x0, step, grid = lms_grid()[indicator]
+    x = np.asarray(x, dtype=float)
+    sex = np.asarray(sex, dtype=object)
+    with np.errstate(invalid='ignore'):
+        pos = (x - x0) / step
+        xi = np.rint(pos)
+        valid = (np.abs(pos - xi) < 1e-9) & (xi >= 0) & (xi < grid.shape[0]) & ((sex == 'L') | (sex == 'P'))
+    ti = 0 if m_type is None else (np.asarray(m_type, dtype=object) == 'Height').astype(int)
+    lms = grid[np.where(valid, xi, 0).astype(int), (sex == 'P').astype(int), ti]
+    lms[~valid] = np.nan
+    return lms[:, 0], lms[:, 1], lms[:, 2]
+
+## Usia dalam bulan penuh pada tanggal pengukuran
+def age_in_months(birth_date, on_date):
+    months = (on_date.year - birth_date.year) * 12 + (on_date.month - birth_date.month)
+    if on_date.day < birth_date.day:
+        months -= 1
+    return max(months, 0)
+
+def age_in_months_array(birth_dates, on_dates):
+    birth = pd.to_datetime(pd.Series(birth_dates), errors='coerce')
+    on = pd.to_datetime(pd.Series(on_dates), errors='coerce')
+    months = (on.dt.year - birth.dt.year) * 12 + (on.dt.month - birth.dt.month)
+    months = months - (on.dt.day < birth.dt.day)
+    return months.clip(lower=0)
+
+# ========== FUNGSI INDIKATOR
+## BB Terhadap Usia
+def calc_wfa(age, sex, weight):
+    wfa = load_reference()['wfa']
+    ref = wfa[
+        (wfa['Usia'] == age) &
+        (wfa['Gender'] == sex)
+    ]
+    if ref.empty:
+        return None
+
+    L, M, S = ref[["L", "M", "S"]].values[0]
+    return who_zscore(weight, L, M, S)
+
+## TB Terhadap Usia
+def calc_hfa(age, sex, height):
+    hfa = load_reference()['hfa']
+    ref = hfa[
+        (hfa['Usia'] == age) &
+        (hfa['Gender'] == sex)
+        ]
+    if ref.empty:
+        return None
+
+    L, M, S = ref[["L", "M", "S"]].values[0]
+    return who_zscore(height, L, M, S)
+
+## BB Terhadap Panjang/Tinggi Badan
+def measurement_type(age):
+    # Tentukan tipe pengukuran berdasarkan usia
+    return "Length" if age < 24 else "Height"
+
+def calc_wfh(age, sex, weight, body_cm):
+    m_type = measurement_type(age)
+
+    rounded_height = round(body_cm * 2) / 2  # Pembulatan ke 0.5 terdekat
+    wfh = load_reference()['wfh']
+
+    # Filter data WHO sesuai kolom dataset kamu
+    ref = wfh[
+        (wfh["Gender"] == sex) &
+        (wfh["Pengukuran"] == m_type) &
+        (wfh["Tinggi"] == rounded_height)
+    ]
+
+    if ref.empty:
+        return None
+
+    L, M, S = ref[["L", "M", "S"]].values[0]
+    return who_zscore(weight, L, M, S)
+
+## LK Berdasarkan Usia
+def calc_hcfa(age, sex, hc):
+    hcfa = load_reference()['hcfa']
+    ref = hcfa[
+        (hcfa['Usia'] == age) &
+        (hcfa['Gender'] == sex)
+    ]
+    if ref.empty:
+        return None
+    L, M, S = ref[["L", "M", "S"]].values[0]
+    return who_zscore(hc, L, M, S)
+
+## ======= TABEL TARGET PENGUKURAN (KEBALIKAN LMS)
+TARGET_SD = [-3, -2, -1, 0, 1, 2, 3]
+
+def inverse_lms_table(table, sd_values=TARGET_SD):
+    """Nilai pengukuran pada tiap SD untuk setiap baris tabel LMS (vektorisasi penuh)."""
+    z = np.asarray(sd_values, dtype=float)[None, :]
+    values = who_inverse(z, table['L'].values[:, None], table['M'].values[:, None], table['S'].values[:, None])
+    result = table.drop(columns=['L', 'M', 'S']).reset_index(drop=True)
+    for i, sd in enumerate(sd_values):
+        result[f'sd_{sd}'] = np.round(values[:, i], 2)
+    return result
+
+@lru_cache(maxsize=None)
+def get_target_table():
+    # Dihitung sekali per proses: {(indikator, gender, pengukuran, usia/tinggi): {sd: nilai}}
+    tables = load_reference()
+    frames = {
+        'wfa': inverse_lms_table(tables['wfa']).rename(columns={'Usia': 'x'}),
+        'hfa': inverse_lms_table(tables['hfa']).rename(columns={'Usia': 'x'}),
+        'hcfa': inverse_lms_table(tables['hcfa']).rename(columns={'Usia': 'x'}),
+        'wfh': inverse_lms_table(tables['wfh']).rename(columns={'Tinggi': 'x'}),
+    }
+    lookup = {}
+    for indicator, frame in frames.items():
+        m_types = frame['Pengukuran'] if 'Pengukuran' in frame.columns else [None] * len(frame)
+        sd_cols = frame[[f'sd_{sd}' for sd in TARGET_SD]].values
+        for x, sex, m_type, row in zip(frame['x'], frame['Gender'], m_types, sd_cols):
+            lookup[(indicator, sex, m_type, float(x))] = dict(zip(TARGET_SD, row.tolist()))
+    return frames, lookup
+
+register_cache('target_table', get_target_table)
+
+def target_measurements(indicator, sex, x, m_type=None):
+    # x = usia (bulan) untuk BB/U, TB/U, LK/U; tinggi dibulatkan ke 0.5 cm untuk BB/TB
+    if indicator == 'wfh':
+        x = round(x * 2) / 2
+    return get_target_table()[1].get((indicator, sex, m_type if indicator == 'wfh' else None, float(x)))
@@ -0,0 +1,152 @@
+import hashlib
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from . import status as status_rules
+from .metrics import timed
+from .reference import (
+    DATA_DIR, REFERENCE_FILES, age_in_months_array, calc_hcfa, calc_hfa, calc_wfa, calc_wfh, lookup_lms,
+    measurement_type, target_measurements, who_zscore_array,
+)
+from .status import (
+    hcaf_status, hcaf_status_array, hfa_status, hfa_status_array, safe_round, stunting_risk,
+    stunting_status, stunting_status_array, wfa_status, wfa_status_array, wfh_status, wfh_status_array,
+)
+
+# Kolom hasil skoring, sama dengan kolom tabel measurements
+SCORE_COLUMNS = [
+    'wfa_zscore', 'wfa_status', 'hfa_zscore', 'hfa_status', 'wfh_zscore', 'wfh_status',
+    'hcfa_zscore', 'hcfa_status', 'risiko_stunting_persen', 'status_stunting',
+]
+
+# ========= VERSI SKORING
+# Naikkan jika logika skoring berubah di luar tabel WHO & aturan status (mis. perhitungan usia, pembulatan)
+SCORING_REVISION = 1
+
+@lru_cache(maxsize=None)
+def scoring_version():
+    """Sidik jari tabel LMS WHO + aturan status + SCORING_REVISION, disimpan per baris measurements."""
+    digest = hashlib.sha1(f"r{SCORING_REVISION}".encode())
+    for name in REFERENCE_FILES.values():
+        digest.update((DATA_DIR / name).read_bytes())
+    rules = {k: v for k, v in vars(status_rules).items() if k.isupper()}
+    digest.update(repr(sorted(rules.items())).encode())
+    return digest.hexdigest()[:12]
+
+# ========= SKORING SATU ANAK
+@timed()
+def score_measurement(data):
+    """Z-Score (dibulatkan), label status, risiko, dan status stunting untuk satu pengukuran."""
+    waz_z = calc_wfa(data["age"], data["sex"], data["weight"])
+    haz_z = calc_hfa(data["age"], data["sex"], data["height"])
+    whz_z = calc_wfh(data["age"], data["sex"], data["weight"], data["height"])
+    hcz_z = calc_hcfa(data["age"], data["sex"], data["hc"])
+
+    z_scores = {'wfa': safe_round(waz_z), 'hfa': safe_round(haz_z), 'wfh': safe_round(whz_z), 'hcfa': safe_round(hcz_z)}
+    statuses = {'wfa': wfa_status(waz_z), 'hfa': hfa_status(haz_z), 'wfh': wfh_status(whz_z), 'hcfa': hcaf_status(hcz_z)}
+    risk = stunting_risk(safe_round(haz_z)) if haz_z is not None else None
+    status = stunting_status(haz_z) if haz_z is not None else None
+    return z_scores, statuses, risk, status
+
+# ========= SKORING BATCH (VEKTOR)
+@timed()
+def score_arrays(age, sex, weight, height, hc):
+    """Inti skoring vektor (numpy saja): dict kolom SCORE_COLUMNS -> array."""
+    age = np.asarray(age, dtype=float)
+    sex = np.asarray(sex, dtype=object)
+    weight = np.asarray(weight, dtype=float)
+    height = np.asarray(height, dtype=float)
+    hc = np.asarray(hc, dtype=float)
+
+    m_type = np.where(age < 24, measurement_type(0), measurement_type(24)).astype(object)
+    rounded_height = np.round(height * 2) / 2
+
+    waz = who_zscore_array(weight, *lookup_lms('wfa', age, sex))
+    haz = who_zscore_array(height, *lookup_lms('hfa', age, sex))
+    whz = who_zscore_array(weight, *lookup_lms('wfh', rounded_height, sex, m_type))
+    hcz = who_zscore_array(hc, *lookup_lms('hcfa', age, sex))
+
+    return {
+        'wfa_zscore': np.round(waz, 2),
+        'wfa_status': wfa_status_array(waz),
+        'hfa_zscore': np.round(haz, 2),
+        'hfa_status': hfa_status_array(haz),
+        'wfh_zscore': np.round(whz, 2),
+        'wfh_status': wfh_status_array(whz),
+        'hcfa_zscore': np.round(hcz, 2),
+        'hcfa_status': hcaf_status_array(hcz),
+        'risiko_stunting_persen': stunting_risk(np.round(haz, 2)),
+        'status_stunting': stunting_status_array(haz),
+    }
+
+@timed()
+def score_frame(df):
+    """Skoring vektor untuk DataFrame berkolom usia_bulan, gender, berat_badan, tinggi_badan, lingkar_kepala.
+
+    Usia yang kosong (kolom tidak ada, atau NaN per baris) dihitung dari tanggal_lahir dan
+    tanggal_pengukuran, jadi baris berusia & baris bertanggal bisa dicampur dalam satu frame.
+    Mengembalikan salinan df dengan kolom SCORE_COLUMNS.
+    """
+    out = df.drop(columns=[c for c in SCORE_COLUMNS if c in df.columns])
+    if 'usia_bulan' not in out.columns:
+        out = out.assign(usia_bulan=age_in_months_array(out['tanggal_lahir'], out['tanggal_pengukuran']).values)
+    elif {'tanggal_lahir', 'tanggal_pengukuran'} <= set(out.columns) and out['usia_bulan'].isna().any():
+        age = age_in_months_array(out['tanggal_lahir'], out['tanggal_pengukuran'])
+        out = out.assign(usia_bulan=pd.to_numeric(out['usia_bulan'], errors='coerce').fillna(age))
+
+    scores = score_arrays(
+        pd.to_numeric(out['usia_bulan'], errors='coerce'),
+        out['gender'].to_numpy(dtype=object),
+        pd.to_numeric(out['berat_badan'], errors='coerce'),
+        pd.to_numeric(out['tinggi_badan'], errors='coerce'),
+        pd.to_numeric(out['lingkar_kepala'], errors='coerce'),
+    )
+    return pd.concat([out, pd.DataFrame(scores, index=out.index)], axis=1)
+
+def scored_records(scored):
+    """Ubah hasil score_frame menjadi (data, z_scores, statuses, risk, status) untuk disimpan.
+
+    Baris tanpa usia (usia bulan & tanggal lahir kosong) menghasilkan age None dan Z-Score kosong;
+    pemanggil memutuskan apakah baris itu ditolak.
+    """
+    columns = ['tanggal_pengukuran', 'nama_anak', 'usia_bulan', 'gender', 'alamat', 'berat_badan',
+               'tinggi_badan', 'lingkar_kepala', 'tanggal_lahir'] + SCORE_COLUMNS
+    rows = scored.reindex(columns=columns).astype(object)
+    rows = rows.where(rows.notna(), None)
+    for r in rows.to_dict('records'):
+        data = {
+            'date': r['tanggal_pengukuran'], 'name': r['nama_anak'], 'age': None if r['usia_bulan'] is None else int(r['usia_bulan']),
+            'sex': r['gender'], 'alamat': r['alamat'], 'weight': r['berat_badan'],
+            'height': r['tinggi_badan'], 'hc': r['lingkar_kepala'], 'birth_date': r['tanggal_lahir'],
+        }
+        z_scores = {k: r[f'{k}_zscore'] for k in ('wfa', 'hfa', 'wfh', 'hcfa')}
+        statuses = {k: r[f'{k}_status'] for k in ('wfa', 'hfa', 'wfh', 'hcfa')}
+        yield data, z_scores, statuses, r['risiko_stunting_persen'], r['status_stunting']
+
+# ========= SELISIH TERHADAP TARGET
+@timed()
+def target_gap_table(data):
+    """Selisih pengukuran anak terhadap batas -2 SD dan median dari tabel target."""
+    m_type = measurement_type(data['age'])
+    rows = [
+        ('BB/U', 'wfa', data['age'], data['weight'], 'kg'),
+        ('TB/U', 'hfa', data['age'], data['height'], 'cm'),
+        ('BB/TB', 'wfh', data['height'], data['weight'], 'kg'),
+        ('LK/U', 'hcfa', data['age'], data['hc'], 'cm'),
+    ]
+    result = []
+    for label, indicator, x, value, unit in rows:
+        target = target_measurements(indicator, data['sex'], x, m_type)
+        if target is None:
+            continue
+        result.append({
+            'Indikator': label,
+            'Nilai Anak': f"{value:.1f} {unit}",
+            'Batas -2 SD': f"{target[-2]:.1f} {unit}",
+            'Selisih ke -2 SD': f"{value - target[-2]:+.1f} {unit}",
+            'Median': f"{target[0]:.1f} {unit}",
+            'Selisih ke Median': f"{value - target[0]:+.1f} {unit}",
+        })
+    return pd.DataFrame(result)
@@ -0,0 +1,35 @@
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+# ========= PROFIL STARTUP
+# Waktu tiap fase startup (ms) saat pertama kali dijalankan di proses ini (cold start).
+PROCESS_START = time.perf_counter()
+PHASES = {}
+
+@contextmanager
+def phase(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        PHASES.setdefault(name, round((time.perf_counter() - start) * 1000, 1))
+
+def mark(name):
+    # Catat waktu sejak proses mulai, mis. "first_paint" setelah header pertama tampil
+    PHASES.setdefault(name, round((time.perf_counter() - PROCESS_START) * 1000, 1))
+
+def import_profile(module='krenova_core', top=15):
+    """Waktu import kumulatif (ms) per modul dari `python -X importtime` di proses baru."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            capture_output=True, text=True, cwd=Path(__file__).resolve().parent.parent)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len('import time:'):].split('|'))
+        rows.append((name, int(self_us) / 1000, int(cumulative_us) / 1000))
+    rows.sort(key=lambda row: row[2], reverse=True)
+    return rows[:top]
@@ -0,0 +1,157 @@
+import numpy as np
+
+# ========= ATURAN STATUS
+# Setiap aturan: (operator, batas Z-Score, label). Dievaluasi berurutan, label pertama yang
+# cocok dipakai; jika tidak ada yang cocok dipakai label normal. Versi skalar dan versi
+# array (untuk batch) sama-sama membaca tabel ini sehingga hasilnya selalu identik.
+
+## Berat/Usia
+WFA_RULES = [
+    ('<', -3, "Berat Anak Sangat Kurang\n(Z-Score normal -2 s/d +2)"),
+    ('<', -2, "Berat Anak Kurang\n(Z-Score normal -2 s/d +2)"),
+    ('>', 3, "Anak Obesitas\n(Z-Score normal -2 s/d +2)"),
+    ('>', 2, "Berat Badan Anak Berlebih\n(Z-Score normal -2 s/d +2)"),
+]
+WFA_NORMAL = "Berat Badan Anak Normal\n(Z-Score normal -2 s/d +2)"
+WFA_MISSING = None
+
+## Tinggi/Usia
+HFA_RULES = [
+    ('<', -3, "Anak Sangat Pendek\n(Z-Score normal -2 s/d +3)"),
+    ('<', -2, "Anak Pendek\n(Z-Score normal -2 s/d +3)"),
+    ('>', 3, "Anak Tinggi\n(Z-Score normal -2 s/d +3)"),
+]
+HFA_NORMAL = "Tinggi Anak Normal\n(Z-Score normal -2 s/d +3)"
+HFA_MISSING = None
+
+## Berat/Tinggi
+WFH_RULES = [
+    ('<', -3, "Gizi Anak Buruk\n(Z-Score normal -2 s/d +2)"),
+    ('<', -2, "Gizi Anak Kurang\n(Z-Score normal -2 s/d +2)"),
+    ('>', 3, "Anak Obesitas\n(Z-Score normal -2 s/d +2)"),
+    ('>', 2, "Anak Overweight\n(Z-Score normal -2 s/d +2)"),
+]
+WFH_NORMAL = "Gizi Anak Baik/Normal\n(Z-Score normal -2 s/d +2) "
+WFH_MISSING = "Tinggi Badan atau Berat Badan Di Luar Rentang Database"
+
+## Lingkar Kepala/Usia
+HCFA_RULES = [
+    ('<', -2, "Anak Terindikasi Microcephaly. Berisiko keterlambatan kognitif, motorik, dan belajar jangka panjang, serta gangguan neurologis\n(Z-Score normal -2 s/d +2)"),
+    ('>', 2, "Anak Terindikasi Macrocephaly. Indikasi adanya hydrocephalus atau masalah genetik, memerlukan skrining dini\n(Z-Score normal -2 s/d +2)"),
+]
+HCFA_NORMAL = "Lingkar Kepala Anak Normal\n(Z-Score normal -2 s/d +2)"
+HCFA_MISSING = None
+
+## Stunting (TB/U)
+STUNTING_CUTOFF = -2
+STUNTING_YES = "Berisiko Stunting"
+STUNTING_NO = "Tidak Berisiko Stunting"
+
+def _classify(z, rules, normal, missing):
+    if z is None:
+        return missing
+    for op, limit, label in rules:
+        if (z < limit) if op == '<' else (z > limit):
+            return label
+    return normal
+
+def _classify_array(z, rules, normal, missing):
+    z = np.asarray(z, dtype=float)
+    conditions = [(z < limit) if op == '<' else (z > limit) for op, limit, _ in rules]
+    labels = np.select(conditions, [label for _, _, label in rules], default=normal).astype(object)
+    labels[np.isnan(z)] = missing
+    return labels
+
+## ======= STATUS STUNTING (HFA)
+def stunting_status(z):
+    if z < STUNTING_CUTOFF:
+        return STUNTING_YES
+    return STUNTING_NO
+
+def stunting_status_array(z):
+    z = np.asarray(z, dtype=float)
+    labels = np.where(z < STUNTING_CUTOFF, STUNTING_YES, STUNTING_NO).astype(object)
+    labels[np.isnan(z)] = None
+    return labels
+
+## ======= EVALUASI GIZI
+### Berat/Usia
+def wfa_status(z):
+    return _classify(z, WFA_RULES, WFA_NORMAL, WFA_MISSING)
+
+### Tinggi/Usia
+def hfa_status(z):
+    return _classify(z, HFA_RULES, HFA_NORMAL, HFA_MISSING)
+
+### Berat/Tinggi
+def wfh_status(z):
+    return _classify(z, WFH_RULES, WFH_NORMAL, WFH_MISSING)
+
+### Lingkar Kepala/Usia
+def hcaf_status(z):
+    return _classify(z, HCFA_RULES, HCFA_NORMAL, HCFA_MISSING)
+
+### Versi array untuk skoring batch
+def wfa_status_array(z):
+    return _classify_array(z, WFA_RULES, WFA_NORMAL, WFA_MISSING)
+
+def hfa_status_array(z):
+    return _classify_array(z, HFA_RULES, HFA_NORMAL, HFA_MISSING)
+
+def wfh_status_array(z):
+    return _classify_array(z, WFH_RULES, WFH_NORMAL, WFH_MISSING)
+
+def hcaf_status_array(z):
+    return _classify_array(z, HCFA_RULES, HCFA_NORMAL, HCFA_MISSING)
+
+## ======= SAFE ROUND
+def safe_round(x):
+    return round(x, 2) if x is not None else None
+
+## ======= RISK STUNTING (%)
+def stunting_risk(hfa):
+    # score = 0
+
+    # if hfa < -2:
+    #     score += 60
+    # if wfa < -2:
+    #     score += 40
+    # return min(score, 100)
+    return hfa
+
+## ======= PENJELASAN LOKAL (tanpa AI)
+# Dipakai saat antrean AI penuh atau terlalu lama (lihat admission.py): kader tetap mendapat
+# penjelasan ringkas dari label status yang sama, dengan format mirip keluaran prompt.txt
+INDICATOR_NAMES = {
+    'waz': "Berat Badan menurut Usia (BB/U)",
+    'haz': "Tinggi Badan menurut Usia (TB/U)",
+    'whz': "Berat Badan menurut Tinggi (BB/TB)",
+    'hcz': "Lingkar Kepala menurut Usia (LK/U)",
+}
+NORMAL_LABELS = {WFA_NORMAL, HFA_NORMAL, WFH_NORMAL, HCFA_NORMAL}
+
+def local_explanation(data_anak, status_z):
+    lines = ["**1. Ringkasan Hasil Skrining**", ""]
+    concerns = []
+    for key, name in INDICATOR_NAMES.items():
+        z, label = status_z[f'{key}_z'], status_z[f'{key}_label']
+        if z is None or label is None:
+            lines.append(f"- **{name}:** —")
+            continue
+        lines.append(f"- **{name}:** Z-Score {z} — {label.splitlines()[0]}")
+        if label not in NORMAL_LABELS:
+            concerns.append(label.splitlines()[0])
+
+    lines += ["", "**2. Interpretasi Risiko**", ""]
+    if concerns:
+        lines.append(f"- Ada indikator yang perlu perhatian: {'; '.join(concerns)}.")
+        lines.append("- Sarankan orang tua membawa anak ke bidan desa atau puskesmas untuk pemeriksaan lanjutan.")
+        lines.append("- Timbang dan ukur ulang anak di posyandu bulan depan untuk melihat perkembangannya.")
+    else:
+        lines.append("- Semua indikator berada dalam rentang normal WHO.")
+        lines.append("- Lanjutkan penimbangan rutin setiap bulan di posyandu dan pemberian makan bergizi seimbang.")
+
+    lines += ["", "**3. Catatan Penting**", "",
+              "- Hasil ini adalah skrining awal, **bukan diagnosis**. Konfirmasi tetap dilakukan oleh tenaga kesehatan.",
+              "- Penjelasan ini dibuat otomatis oleh sistem karena layanan AI sedang sibuk."]
+    return '\n'.join(lines)
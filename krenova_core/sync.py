@@ -0,0 +1,284 @@
+"""Sinkronisasi delta dari perangkat offline (posyandu) ke database pusat.
+
+Perangkat menjalankan aplikasi dengan database lokal (skoring tetap memakai tabel LMS yang
+dibundel). Trigger SQLite mencatat setiap insert/edit/hapus pengukuran ke ``change_log``
+dengan nomor urut (seq). Saat ada koneksi, hanya baris yang berubah sejak sinkronisasi
+terakhir yang dikirim dalam batch JSON terkompresi gzip; pusat menskor ulang dengan aturan
+yang sama dan mendeteksi konflik lewat nomor revisi baris.
+"""
+import gzip
+import json
+import socket
+import urllib.request
+
+import pandas as pd
+
+from .db import (
+    DuplicateMeasurement, delete_measurement_row, get_connection, insert_measurement, update_measurement_row,
+)
+from .growth import make_child_key, resolve_child_key
+from .metrics import timed
+from .scoring import score_frame, scored_records
+
+# Kolom input yang disinkronkan; Z-Score & status dihitung ulang di pusat
+SYNC_COLUMNS = ['tanggal_pengukuran', 'nama_anak', 'usia_bulan', 'gender', 'alamat', 'berat_badan',
+                'tinggi_badan', 'lingkar_kepala', 'tanggal_lahir', 'created_by']
+BATCH_FORMAT = 1
+
+# ========= JURNAL PERANGKAT
+def init_journal(device=None, server=None, db_path=None):
+    """Aktifkan jurnal perubahan di database lokal perangkat (idempoten)."""
+    conn = get_connection(db_path)
+    c = conn.cursor()
+    c.execute('''CREATE TABLE IF NOT EXISTS change_log
+                 (seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                  op TEXT NOT NULL,
+                  uid TEXT NOT NULL,
+                  base_revision INTEGER,
+                  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+    c.execute('''CREATE TABLE IF NOT EXISTS sync_state
+                 (key TEXT PRIMARY KEY, value TEXT)''')
+
+    # Edit hanya dicatat jika kolom input berubah (skoring ulang / penggabungan child_key tidak ikut)
+    c.execute('''CREATE TRIGGER IF NOT EXISTS journal_insert AFTER INSERT ON measurements
+                 BEGIN
+                     INSERT INTO change_log (op, uid, base_revision) VALUES ('insert', NEW.uid, NULL);
+                 END''')
+    c.execute(f'''CREATE TRIGGER IF NOT EXISTS journal_update AFTER UPDATE OF {', '.join(SYNC_COLUMNS)} ON measurements
+                  BEGIN
+                      INSERT INTO change_log (op, uid, base_revision) VALUES ('update', NEW.uid, OLD.sync_revision);
+                  END''')
+    c.execute('''CREATE TRIGGER IF NOT EXISTS journal_delete AFTER DELETE ON measurements
+                 BEGIN
+                     INSERT INTO change_log (op, uid, base_revision) VALUES ('delete', OLD.uid, OLD.sync_revision);
+                 END''')
+
+    # Baris yang sudah ada sebelum jurnal aktif ikut dikirim pada sinkronisasi pertama
+    c.execute("SELECT value FROM sync_state WHERE key='device'")
+    if c.fetchone() is None:
+        c.execute('''INSERT INTO change_log (op, uid, base_revision)
+                     SELECT 'insert', uid, NULL FROM measurements WHERE sync_revision IS NULL ORDER BY id''')
+    set_state(c, 'device', device or get_state(c, 'device') or socket.gethostname())
+    if server:
+        set_state(c, 'server', server)
+    conn.commit()
+    conn.close()
+
+def get_state(c, key, default=None):
+    c.execute("SELECT value FROM sync_state WHERE key=?", (key,))
+    row = c.fetchone()
+    return row[0] if row else default
+
+def set_state(c, key, value):
+    c.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)", (key, str(value)))
+
+def compact_changes(log):
+    """Satu perubahan akhir per uid: insert+hapus offline saling meniadakan, insert+edit tetap insert."""
+    changes = []
+    for uid, ops in log.groupby('uid', sort=False):
+        last = ops.iloc[-1]
+        inserted = (ops['op'] == 'insert').any()
+        if last['op'] == 'delete':
+            if inserted:
+                continue
+            op = 'delete'
+        else:
+            op = 'insert' if inserted else 'update'
+        base = None if op == 'insert' or pd.isna(last['base_revision']) else int(last['base_revision'])
+        changes.append((int(last['seq']), op, uid, base))
+    return sorted(changes)
+
+@timed()
+def collect_batch(db_path=None):
+    """Batch perubahan sejak sinkronisasi terakhir (belum dikompres)."""
+    conn = get_connection(db_path)
+    c = conn.cursor()
+    pushed = int(get_state(c, 'pushed_seq', 0))
+    log = pd.read_sql_query("SELECT seq, op, uid, base_revision FROM change_log WHERE seq > ? ORDER BY seq",
+                            conn, params=(pushed,))
+    changes = compact_changes(log)
+
+    uids = [uid for _, op, uid, _ in changes if op != 'delete']
+    values = {}
+    for i in range(0, len(uids), 500):
+        part = uids[i:i + 500]
+        c.execute(f"SELECT uid, {', '.join(SYNC_COLUMNS)} FROM measurements WHERE uid IN ({', '.join('?' * len(part))})",
+                  part)
+        values.update((row[0], list(row[1:])) for row in c.fetchall())
+    batch = {
+        'format': BATCH_FORMAT,
+        'device': get_state(c, 'device'),
+        'seq_from': pushed,
+        'seq_to': int(log['seq'].max()) if not log.empty else pushed,
+        'columns': SYNC_COLUMNS,
+        'changes': [[seq, op, uid, base, values.get(uid)] for seq, op, uid, base in changes],
+    }
+    conn.close()
+    return batch
+
+def acknowledge(result, db_path=None):
+    """Terapkan hasil dari pusat: simpan revisi pusat per uid lalu buang jurnal yang sudah terkirim."""
+    conn = get_connection(db_path)
+    c = conn.cursor()
+    revisions = result['revisions']
+    # Kunjungan yang sudah dicatat perangkat lain di pusat: baris lokal mengikuti uid pusat
+    for uid, central_uid in result.get('uids', {}).items():
+        c.execute("UPDATE measurements SET uid=? WHERE uid=?", (central_uid, uid))
+        c.execute("UPDATE change_log SET uid=? WHERE uid=?", (central_uid, uid))
+    c.executemany("UPDATE measurements SET sync_revision=? WHERE uid=?",
+                  [(rev, uid) for uid, rev in revisions.items()])
+    # Perubahan yang tercatat setelah batch dikumpulkan harus memakai revisi pusat yang baru
+    c.executemany("UPDATE change_log SET base_revision=? WHERE uid=? AND seq > ?",
+                  [(rev, uid, result['seq_to']) for uid, rev in revisions.items()])
+    c.execute("DELETE FROM change_log WHERE seq <= ?", (result['seq_to'],))
+    set_state(c, 'pushed_seq', result['seq_to'])
+    conn.commit()
+    conn.close()
+
+# ========= ENCODING BATCH
+def encode(payload):
+    return gzip.compress(json.dumps(payload, separators=(',', ':'), default=str).encode())
+
+def decode(body):
+    return json.loads(gzip.decompress(body))
+
+# ========= PUSAT: TERAPKAN BATCH
+@timed()
+def apply_batch(batch, conn):
+    """Terapkan batch perangkat ke database pusat dalam satu transaksi.
+
+    Idempoten per (perangkat, seq): batch yang dikirim ulang setelah respons hilang dilewati.
+    Edit/hapus ditolak sebagai konflik jika revisi baris di pusat sudah berbeda dari revisi
+    yang terakhir dilihat perangkat; konflik disimpan di sync_conflicts untuk ditinjau admin.
+
+    Insert yang kunci alaminya (anak + tanggal ukur) sudah ada di pusat dengan uid lain (dua
+    perangkat mencatat kunjungan yang sama) tidak menimpa baris pusat. Nilai sama: uid perangkat
+    dipetakan ke uid pusat (``uids`` di hasil). Nilai berbeda: dicatat sebagai konflik.
+    """
+    if batch.get('format') != BATCH_FORMAT:
+        raise ValueError(f"Format batch tidak dikenal: {batch.get('format')}")
+    device, columns = batch['device'], batch['columns']
+    c = conn.cursor()
+    c.execute("SELECT last_seq FROM sync_devices WHERE device=?", (device,))
+    row = c.fetchone()
+    last_seq = row[0] if row else 0
+    changes = [ch for ch in batch['changes'] if ch[0] > last_seq]
+
+    # Perubahan yang sudah diterima sebelumnya: cukup laporkan revisi pusat saat ini
+    revisions, conflicts, uid_map = {}, [], {}
+    for _, op, uid, _, _ in batch['changes'][:len(batch['changes']) - len(changes)]:
+        c.execute("SELECT revision FROM measurements WHERE uid=?", (uid,))
+        current = c.fetchone()
+        if current:
+            revisions[uid] = current[0]
+
+    # Skor semua insert/edit sekaligus (vektor), urutannya sama dengan changes
+    rows = [dict(zip(columns, values)) for _, op, _, _, values in changes if op != 'delete']
+    scored = iter(scored_records(score_frame(pd.DataFrame(rows, columns=columns)))) if rows else iter(())
+
+    try:
+        for (seq, op, uid, base, values), record in zip(changes, _records_for(changes, scored)):
+            c.execute("SELECT id, revision FROM measurements WHERE uid=?", (uid,))
+            current = c.fetchone()
+            reason = None
+            if record is not None and record[0]['age'] is None:
+                # Tanpa usia & tanggal lahir baris tidak bisa diskor: ditolak per baris, batch tetap jalan
+                reason = "Usia tidak diketahui (usia bulan & tanggal lahir kosong)"
+            elif op == 'insert':
+                existing = natural_key_row(c, record[0]) if current is None else None
+                if current is not None:
+                    revisions[uid] = current[1]  # sudah diterima pada batch sebelumnya
+                elif existing is None:
+                    data, z_scores, statuses, risk, status = record
+                    insert_measurement(c, {**data, 'uid': uid}, z_scores, statuses, risk, status,
+                                       dict(zip(columns, values)).get('created_by') or device)
+                    revisions[uid] = 0
+                elif existing[3:] == tuple(record[0][k] for k in ('age', 'weight', 'height', 'hc')):
+                    # Kunjungan yang sama dari perangkat lain: perangkat memakai uid & revisi pusat
+                    uid_map[uid] = existing[1]
+                    revisions[existing[1]] = existing[2]
+                else:
+                    current = (existing[0], existing[2])
+                    reason = "Pengukuran anak ini pada tanggal tersebut sudah dicatat perangkat lain"
+            elif current is None:
+                if op == 'update':
+                    reason = "Data sudah dihapus di pusat"
+            elif current[1] != base:
+                reason = "Data sudah diubah di pusat"
+            elif op == 'update':
+                try:
+                    update_measurement_row(c, current[0], *record)
+                    revisions[uid] = current[1] + 1
+                except DuplicateMeasurement:
+                    reason = "Pengukuran anak ini pada tanggal tersebut sudah ada di pusat"
+            else:
+                delete_measurement_row(c, current[0])
+
+            if reason:
+                conflicts.append(uid)
+                c.execute('''INSERT INTO sync_conflicts (device, uid, op, base_revision, central_revision, data, alasan)
+                             VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                          (device, uid, op, base, current[1] if current else None,
+                           json.dumps(dict(zip(columns, values)) if values else None, default=str), reason))
+
+        c.execute('''INSERT OR REPLACE INTO sync_devices (device, last_seq, last_sync_at)
+                     VALUES (?, ?, CURRENT_TIMESTAMP)''', (device, max(last_seq, batch['seq_to'])))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return {'seq_to': batch['seq_to'], 'applied': len(changes) - len(conflicts),
+            'skipped': len(batch['changes']) - len(changes), 'revisions': revisions, 'conflicts': conflicts,
+            'uids': uid_map}
+
+def natural_key_row(c, data):
+    # (id, uid, revision, usia, BB, TB, LK) baris pusat dengan kunci alami yang sama, atau None.
+    # Anak tanpa tanggal lahir tidak punya kunci alami (lihat db.NATURAL_KEY_WHERE)
+    if not data.get('birth_date'):
+        return None
+    key = resolve_child_key(c, make_child_key(data['name'], data.get('birth_date'), data['sex'], data['alamat']))
+    c.execute('''SELECT id, uid, revision, usia_bulan, berat_badan, tinggi_badan, lingkar_kepala
+                 FROM measurements WHERE child_key=? AND tanggal_pengukuran=?''', (key, data['date']))
+    row = c.fetchone()
+    return tuple(row) if row else None
+
+def _records_for(changes, scored):
+    # Pasangkan tiap perubahan dengan hasil skoringnya (hapus tidak punya hasil skoring)
+    for change in changes:
+        yield None if change[1] == 'delete' else next(scored)
+
+def get_sync_conflicts(include_done=False, db_path=None):
+    conn = get_connection(db_path)
+    query = '''SELECT id, created_at, device, op, alasan, base_revision, central_revision, data, uid
+               FROM sync_conflicts'''
+    if not include_done:
+        query += " WHERE selesai=0"
+    df = pd.read_sql_query(query + " ORDER BY id DESC", conn)
+    conn.close()
+    return df
+
+def resolve_sync_conflict(conflict_id, db_path=None):
+    conn = get_connection(db_path)
+    conn.execute("UPDATE sync_conflicts SET selesai=1 WHERE id=?", (conflict_id,))
+    conn.commit()
+    conn.close()
+
+# ========= TRANSPORT
+def push(server=None, db_path=None, timeout=60):
+    """Kirim batch ke `krenova serve` pusat (POST /sync). Mengembalikan (hasil, byte terkirim)."""
+    batch = collect_batch(db_path)
+    if batch['seq_to'] == batch['seq_from']:
+        return None, 0
+    conn = get_connection(db_path)
+    server = server or get_state(conn.cursor(), 'server')
+    conn.close()
+    if not server:
+        raise ValueError("Alamat server pusat belum diatur (sync init --server URL atau sync push --server URL)")
+
+    body = encode(batch)
+    request = urllib.request.Request(server.rstrip('/') + '/sync', data=body,
+                                     headers={'Content-Type': 'application/gzip'})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        result = decode(response.read())
+    acknowledge(result, db_path)
+    return result, len(body)
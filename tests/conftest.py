@@ -0,0 +1,39 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from krenova_core import db  # noqa: E402
+
+@pytest.fixture(autouse=True)
+def repo_cwd(monkeypatch):
+    # Tabel referensi WHO (*.csv) dibaca relatif terhadap root repo
+    monkeypatch.chdir(ROOT)
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    """Database SQLite sementara yang sudah diinisialisasi."""
+    path = str(tmp_path / 'krenova_test.db')
+    monkeypatch.setattr(db, 'DB_PATH', path)
+    db.init_database()
+    return path
+
+def measurement(**overrides):
+    """Satu baris input ala form/API; kolom bisa diganti lewat keyword."""
+    row = {'tanggal_pengukuran': '2025-03-10', 'nama_anak': 'Ayu', 'tanggal_lahir': '2024-03-01',
+           'usia_bulan': None, 'gender': 'P', 'alamat': 'Bentak', 'berat_badan': 9.0,
+           'tinggi_badan': 74.0, 'lingkar_kepala': 45.0}
+    row.update(overrides)
+    return row
+
+def save(username='tester', **overrides):
+    """Skor lalu simpan satu pengukuran lewat jalur form; mengembalikan id baris."""
+    import pandas as pd
+
+    from krenova_core.scoring import score_frame, scored_records
+
+    record = next(scored_records(score_frame(pd.DataFrame([measurement(**overrides)]))))
+    return db.save_measurement(*record, username)
@@ -0,0 +1,39 @@
+import threading
+
+import pytest
+
+from krenova_core import admission
+
+@pytest.fixture
+def limits(monkeypatch):
+    monkeypatch.setattr(admission, 'ENABLED', True)
+    monkeypatch.setattr(admission, 'global_bucket', admission.TokenBucket(60, 3))
+    monkeypatch.setattr(admission, 'ai_queue', admission.AIQueue(1, 1))
+
+def test_session_limit_then_global_limit_refunds_the_session_token(limits):
+    session = admission.TokenBucket(6, 2)
+    assert [admission.admit_submit(session)[0] for _ in range(3)] == [True, True, False]
+    admitted, wait, reason = admission.admit_submit(session)
+    assert not admitted and reason == 'sesi' and 0 < wait <= 10
+
+    other = admission.TokenBucket(6, 2)
+    assert admission.admit_submit(other)[0]
+    # Bucket global (burst 3) habis: sesi lain ditolak tanpa kehilangan jatahnya
+    admitted, _, reason = admission.admit_submit(other)
+    assert not admitted and reason == 'global' and other.level() >= 1
+
+def test_run_ai_falls_back_when_queue_is_full_or_wait_too_long(limits):
+    release = threading.Event()
+    assert admission.run_ai(lambda: 'saran') == ('saran', True)
+
+    # Satu pekerja sibuk + satu antre = kapasitas penuh
+    busy = admission.ai_queue.submit(release.wait)
+    assert admission.run_ai(lambda: 'saran', timeout=0.05) == (None, False)
+    assert admission.ai_queue.status()['antre'] == 0
+    assert admission.ai_queue.submit(lambda: None) is not None
+    assert admission.run_ai(lambda: 'saran') == (None, False)
+    release.set()
+    busy.result(timeout=5)
+
+    with pytest.raises(ZeroDivisionError):
+        admission.run_ai(lambda: 1 / 0)
@@ -0,0 +1,36 @@
+import asyncio
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from krenova_core.api import create_app, score_records
+
+from conftest import measurement
+
+def test_mixed_batch_scores_date_only_rows():
+    # Baris berusia & baris bertanggal dari permintaan berbeda bisa jatuh di satu micro-batch
+    with_age = {'gender': 'L', 'berat_badan': 9.0, 'tinggi_badan': 74.0, 'lingkar_kepala': 45.0, 'usia_bulan': 12}
+    date_only = {'gender': 'P', 'berat_badan': 9.0, 'tinggi_badan': 74.0, 'lingkar_kepala': 45.0,
+                 'tanggal_lahir': '2024-01-10', 'tanggal_pengukuran': '2025-01-15'}
+    batch = score_records([with_age, date_only])
+    assert batch[0] == score_records([with_age])[0]
+    assert batch[1] == score_records([date_only])[0]
+    assert batch[1]['hfa_zscore'] is not None
+
+def post_measurements(rows):
+    async def run():
+        async with TestClient(TestServer(create_app(pool_size=1))) as client:
+            response = await client.post('/measurements', json=rows)
+            return response.status, await response.json()
+    return asyncio.run(run())
+
+def test_measurements_rejects_bad_dates(db_path):
+    status, body = post_measurements([measurement(), measurement(tanggal_lahir='10/13/2024x')])
+    assert status == 400
+    assert body['error'].startswith('Baris 1: tanggal_lahir')
+    status, _ = post_measurements([measurement(tanggal_lahir='2025-04-01')])
+    assert status == 400
+
+def test_measurements_scores_mixed_rows(db_path):
+    status, body = post_measurements([measurement(usia_bulan=12, tanggal_lahir=None), measurement()])
+    assert status == 201
+    assert body['inserted'] == 2
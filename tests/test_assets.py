@@ -0,0 +1,53 @@
+import functools
+import os
+
+import pytest
+
+PIL = pytest.importorskip('PIL.Image')
+
+from krenova_core import assets  # noqa: E402
+
+@pytest.fixture
+def static_dir(tmp_path, monkeypatch):
+    """Sumber PNG kecil & folder static sementara (bukan static/ milik repo)."""
+    source_dir = tmp_path / 'src'
+    source_dir.mkdir()
+    PIL.new('RGB', (2400, 600), (138, 166, 36)).save(source_dir / 'header situmbuh.png')
+    static = str(tmp_path / 'static')
+    bytes_in_tmp = functools.lru_cache(functools.partial(assets.asset_bytes.__wrapped__, static_dir=static))
+    monkeypatch.setattr(assets, 'asset_bytes', bytes_in_tmp)
+    yield str(source_dir), static
+    for cached in (assets.asset_url, assets.image_size):
+        cached.cache_clear()
+
+def test_build_assets_resizes_and_skips_fresh_variants(static_dir):
+    source_dir, static = static_dir
+    formats = assets.supported_formats()
+    rows = assets.build_assets(source_dir=source_dir, static_dir=static)
+    # Foto profil tidak ada di folder sumber: dilewati, bukan error
+    assert {(r['gambar'], r['format']) for r in rows} == {('header', fmt) for fmt in formats}
+    path = os.path.join(static, assets.variant_name('header', 'webp'))
+    with PIL.open(path) as image:
+        assert image.size == (1200, 300)
+
+    # Varian lebih baru dari sumbernya tidak ditulis ulang; sumber yang berubah memicu build ulang
+    source = os.path.join(source_dir, 'header situmbuh.png')
+    os.utime(path, (100, 100))
+    os.utime(source, (50, 50))
+    assets.build_assets(source_dir=source_dir, static_dir=static)
+    assert os.path.getmtime(path) == 100
+    os.utime(source, (200, 200))
+    assets.build_assets(source_dir=source_dir, static_dir=static)
+    assert os.path.getmtime(path) > 200
+    assert not [f for f in os.listdir(static) if f.endswith('.tmp')]
+
+def test_picture_html_versions_urls_by_content(static_dir):
+    source_dir, static = static_dir
+    assets.build_assets(source_dir=source_dir, static_dir=static)
+    html = assets.picture_html('header', 'Header', lazy=True, formats=['avif', 'webp'])
+    assert html.count('?v=') == 2 and 'width="1200" height="300"' in html and 'loading="lazy"' in html
+    assert html.index('image/avif') < html.index('<img src="app/static/header-1200.webp')
+
+    PIL.new('RGB', (2400, 600), (255, 255, 255)).save(os.path.join(source_dir, 'header situmbuh.png'))
+    assets.build_assets(source_dir=source_dir, static_dir=static, force=True)
+    assert assets.picture_html('header', 'Header', formats=['avif', 'webp']) != html
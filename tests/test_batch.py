@@ -0,0 +1,33 @@
+from krenova_core import db
+from krenova_core.batch import rescore_measurements
+
+from conftest import save
+
+def alerts():
+    conn = db.get_connection()
+    rows = conn.execute("SELECT measurement_id, jenis, z_sebelum, z_sekarang FROM growth_alerts "
+                        "ORDER BY measurement_id, jenis").fetchall()
+    conn.close()
+    return rows
+
+def test_rescore_recomputes_alerts_from_new_zscores(db_path):
+    save(tanggal_pengukuran='2025-01-05', berat_badan=9.0)
+    save(tanggal_pengukuran='2025-02-05', berat_badan=9.2)
+    march = save(tanggal_pengukuran='2025-03-05', berat_badan=8.0)
+    expected = alerts()
+    assert expected and {r[0] for r in expected} == {march}
+
+    # Versi skoring lama: z-score berbeda & peringatan dari z-score itu
+    conn = db.get_connection()
+    conn.execute("UPDATE measurements SET scoring_version='lama', wfa_zscore=wfa_zscore - 1 WHERE id<>?", (march,))
+    conn.execute("UPDATE growth_alerts SET z_sebelum=z_sebelum - 1, selesai=1")
+    conn.commit()
+    conn.close()
+
+    total, _ = rescore_measurements(pause=0)
+    assert total == 2
+    assert alerts() == expected
+    # Peringatan yang sudah ditandai selesai tetap selesai
+    conn = db.get_connection()
+    assert conn.execute("SELECT MIN(selesai) FROM growth_alerts").fetchone()[0] == 1
+    conn.close()
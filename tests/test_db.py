@@ -0,0 +1,70 @@
+import pytest
+
+from krenova_core import db
+from krenova_core.storage import index_exists
+
+from conftest import save
+
+def rows():
+    conn = db.get_connection()
+    result = conn.execute("SELECT id, nama_anak, berat_badan, revision FROM measurements ORDER BY id").fetchall()
+    conn.close()
+    return result
+
+def test_resend_is_idempotent_and_changed_values_update(db_path):
+    first = save()
+    assert save() == first
+    assert rows() == [(first, 'Ayu', 9.0, 0)]
+    assert save(berat_badan=9.4) == first
+    assert rows() == [(first, 'Ayu', 9.4, 1)]
+
+def test_children_without_birth_date_have_no_natural_key(db_path):
+    # Dua anak bernama Budi di dukuh yang sama, tanpa tanggal lahir: tidak boleh saling menimpa
+    first = save(nama_anak='Budi', gender='L', tanggal_lahir=None, usia_bulan=12, berat_badan=9.0)
+    second = save(nama_anak='Budi', gender='L', tanggal_lahir=None, usia_bulan=30, berat_badan=12.5)
+    assert first != second and [r[2] for r in rows()] == [9.0, 12.5]
+
+def test_edit_onto_existing_natural_key_is_rejected(db_path):
+    save(tanggal_pengukuran='2025-03-10')
+    other = save(tanggal_pengukuran='2025-04-10')
+    conn = db.get_connection()
+    with pytest.raises(db.DuplicateMeasurement):
+        db.update_measurement_row(conn.cursor(), other, {
+            'date': '2025-03-10', 'name': 'Ayu', 'age': 12, 'sex': 'P', 'alamat': 'Bentak', 'weight': 9.0,
+            'height': 74.0, 'hc': 45.0, 'birth_date': '2024-03-01'}, *[dict.fromkeys(['wfa', 'hfa', 'wfh', 'hcfa'])] * 2,
+            0, 'Tidak Berisiko Stunting')
+    conn.close()
+
+def copy_row(conn, record_id, **changes):
+    columns = ['tanggal_pengukuran', 'nama_anak', 'usia_bulan', 'gender', 'alamat', 'berat_badan', 'tinggi_badan',
+               'lingkar_kepala', 'tanggal_lahir', 'child_key']
+    conn.execute(f'''INSERT INTO measurements ({', '.join(columns)}, uid)
+                     SELECT {', '.join(columns)}, lower(hex(randomblob(16))) FROM measurements WHERE id=?''',
+                 (record_id,))
+    new_id = conn.execute("SELECT MAX(id) FROM measurements").fetchone()[0]
+    for column, value in changes.items():
+        conn.execute(f"UPDATE measurements SET {column}=? WHERE id=?", (value, new_id))
+    return new_id
+
+def test_migration_sets_duplicates_aside(db_path):
+    ayu = save()
+    budi = save(nama_anak='Budi', gender='L', tanggal_lahir=None, usia_bulan=12)
+    # Database lama tanpa indeks unik: klik ganda (sama) & salah ketik (berbeda)
+    conn = db.get_connection()
+    conn.execute("DROP INDEX idx_measurements_natural")
+    typo = copy_row(conn, ayu, berat_badan=96.0)
+    newest = copy_row(conn, ayu)
+    no_birth_date = copy_row(conn, budi)
+    conn.commit()
+    conn.close()
+
+    db.init_database()
+    assert [r[0] for r in rows()] == [budi, newest, no_birth_date]
+    conn = db.get_connection()
+    c = conn.cursor()
+    assert index_exists(c, 'idx_measurements_natural')
+    set_aside = c.execute('''SELECT measurement_id, kept_id, identik, selesai FROM measurement_duplicates
+                             ORDER BY measurement_id''').fetchall()
+    conn.close()
+    # Klik ganda langsung selesai; salah ketik menunggu tinjauan admin
+    assert set_aside == [(ayu, newest, 1, 1), (typo, newest, 0, 0)]
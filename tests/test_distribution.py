@@ -0,0 +1,81 @@
+import datetime
+
+import pandas as pd
+
+from krenova_core import db
+from krenova_core.archive import archive_files, archive_measurements, attach_archives
+from krenova_core.distribution import distribution_table, rebuild_summaries
+
+from conftest import save
+
+def summaries():
+    conn = db.get_connection()
+    frames = [pd.read_sql_query(f"SELECT * FROM {table} WHERE n <> 0 ORDER BY 1, 2, 3, 4, 5, 6", conn)
+              for table in ('zscore_moments', 'zscore_histogram')]
+    conn.close()
+    return frames
+
+def rebuild():
+    conn = db.get_connection()
+    rebuild_summaries(conn.cursor(), attach_archives(conn))
+    conn.commit()
+    conn.close()
+    return summaries()
+
+def assert_same(left, right):
+    for a, b in zip(left, right):
+        pd.testing.assert_frame_equal(a, b)
+
+def fill():
+    for i, (date, weight) in enumerate([('2020-05-02', 9.0), ('2020-06-03', 8.4), ('2025-05-02', 9.6)]):
+        save(nama_anak=f'Anak {i}', tanggal_lahir=None, usia_bulan=12, tanggal_pengukuran=date, berat_badan=weight)
+
+def test_incremental_matches_rebuild(db_path):
+    fill()
+    record_id = save(nama_anak='Dewi', tanggal_lahir=None, usia_bulan=30, tanggal_pengukuran='2025-06-01',
+                     tinggi_badan=88.0)
+    conn = db.get_connection()
+    conn.execute("UPDATE measurements SET hfa_zscore = -2.5, alamat = 'Pijinan' WHERE id=?", (record_id,))
+    conn.execute("DELETE FROM measurements WHERE nama_anak='Anak 1'")
+    conn.commit()
+    conn.close()
+    assert_same(summaries(), rebuild())
+
+def test_archive_keeps_archived_years_in_summaries(db_path):
+    fill()
+    before = summaries()
+    assert set(before[1]['tahun']) == {'2020', '2025'}
+
+    moved = archive_measurements(older_than_years=3, today=datetime.date(2026, 10, 19))
+    assert moved == {2020: 2} and list(archive_files()) == [2020]
+    assert_same(summaries(), before)
+    # Hitung ulang dari view gabungan arsip menghasilkan ringkasan yang sama
+    assert_same(rebuild(), before)
+    # Hapus biasa setelah arsip tetap mengurangi ringkasan
+    conn = db.get_connection()
+    conn.execute("DELETE FROM measurements WHERE tanggal_pengukuran='2025-05-02'")
+    conn.commit()
+    conn.close()
+    assert set(summaries()[1]['tahun']) == {'2020'}
+
+def test_migration_fills_from_archives(db_path):
+    fill()
+    before = summaries()
+    archive_measurements(older_than_years=3, today=datetime.date(2026, 10, 19))
+    conn = db.get_connection()
+    conn.execute("DROP TABLE zscore_moments")
+    conn.execute("DROP TABLE zscore_histogram")
+    conn.commit()
+    conn.close()
+    db.init_database()
+    assert_same(summaries(), before)
+
+def test_distribution_table_compares_with_who(db_path):
+    for weight in (9.0, 7.0, 6.0):
+        save(nama_anak=f'Anak {weight}', berat_badan=weight)
+    histogram, moments = db.get_zscore_summary('wfa', year=2025)
+    table = distribution_table(histogram, moments).set_index('alamat')
+    overall = table.loc['Semua']
+    assert overall['n'] == 3 and overall['persen_bawah_2sd'] == 66.7
+    assert overall['selisih_2sd'] == 64.4 and overall['selisih_3sd'] == 33.2
+    assert overall['selisih_rata_rata'] == overall['rata_rata'] and overall['selisih_sd'] == round(overall['sd'] - 1, 2)
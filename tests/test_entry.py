@@ -0,0 +1,43 @@
+import datetime
+
+from krenova_core import entry
+from krenova_core.entry import empty_queue, prepare_queue, queue_flags, score_queue
+
+from conftest import save
+
+def grid(weights):
+    frame = empty_queue(len(weights))
+    frame['nama_anak'] = [f'Anak {i}' for i in range(len(weights))]
+    frame['usia_bulan'] = 12
+    frame['gender'] = 'L'
+    frame['alamat'] = 'Bentak'
+    frame['berat_badan'] = weights
+    frame['tinggi_badan'] = 75.0
+    frame['lingkar_kepala'] = 46.0
+    return prepare_queue(frame, datetime.date(2025, 3, 10))
+
+def test_queue_flags_only_checks_new_rows(db_path, monkeypatch):
+    calls = []
+    check_batch = entry.check_batch
+    monkeypatch.setattr(entry, 'check_batch', lambda c, batch: calls.append(len(batch['child_key'])) or
+                        check_batch(c, batch))
+    flags, scores = {}, {}
+    first = queue_flags(score_queue(grid([9.5, 1.0]), scores), flags)
+    assert calls == [2]
+    assert first.iloc[0] == '' and first.iloc[1] != ''
+
+    # Rerun tanpa perubahan: tidak ada query; satu baris diubah: hanya baris itu yang dicek
+    again = queue_flags(score_queue(grid([9.5, 1.0]), scores), flags)
+    edited = queue_flags(score_queue(grid([9.5, 9.8]), scores), flags)
+    assert calls == [2, 1]
+    assert again.equals(first)
+    assert edited.tolist() == ['', '']
+    assert len(flags) == 2
+
+def test_queue_flags_matches_uncached_check(db_path):
+    save(nama_anak='Anak 0', usia_bulan=11, tanggal_lahir=None, tanggal_pengukuran='2025-02-10',
+         gender='L', tinggi_badan=80.0)
+    scored = score_queue(grid([9.5, 9.6]), {})
+    cached = queue_flags(scored, {})
+    assert cached.equals(queue_flags(scored))
+    assert 'Tinggi turun' in cached.iloc[0]
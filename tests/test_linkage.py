@@ -0,0 +1,70 @@
+from krenova_core import db
+from krenova_core.growth import make_child_key
+from krenova_core.linkage import get_duplicate_measurements, merge_children, unmerge_children
+
+from conftest import save
+
+BIRTH = '2024-01-01'
+
+def measurement_rows():
+    conn = db.get_connection()
+    rows = conn.execute("SELECT id, nama_anak, berat_badan, child_key FROM measurements ORDER BY id").fetchall()
+    conn.close()
+    return rows
+
+def alert_rows():
+    conn = db.get_connection()
+    rows = conn.execute("SELECT measurement_id, child_key, jenis FROM growth_alerts ORDER BY id").fetchall()
+    conn.close()
+    return rows
+
+def test_merge_recomputes_alerts_against_merged_series(db_path):
+    jan = save(nama_anak='Ayu', tanggal_lahir=BIRTH, tanggal_pengukuran='2025-01-05', berat_badan=9.0)
+    mar = save(nama_anak='Ayu', tanggal_lahir=BIRTH, tanggal_pengukuran='2025-03-05', berat_badan=8.0)
+    # Sebelum digabung, Maret dibandingkan dengan Januari
+    assert {r[0] for r in alert_rows()} == {mar}
+    feb = save(nama_anak='Aiyu', tanggal_lahir=BIRTH, tanggal_pengukuran='2025-02-05', berat_badan=8.0)
+
+    keep, drop = (make_child_key(name, BIRTH, 'P', 'Bentak') for name in ('Ayu', 'Aiyu'))
+    assert merge_children(keep, drop, 'admin') == 1
+    # Penurunan kini terjadi di Februari; Maret dibandingkan dengan Februari (tidak turun)
+    alerts = alert_rows()
+    assert {r[0] for r in alerts} == {feb}
+    assert {r[1] for r in alerts} == {keep}
+    assert jan not in {r[0] for r in alerts}
+
+def test_merge_keeps_plausible_row_on_same_date(db_path):
+    save(nama_anak='Ayu', tanggal_lahir=BIRTH, tanggal_pengukuran='2025-01-05', berat_badan=9.0)
+    # Salah ketik BB (1,0 kg) di kunci utama, nilai benar di kunci duplikat pada tanggal yang sama
+    save(nama_anak='Ayu', tanggal_lahir=BIRTH, tanggal_pengukuran='2025-02-05', berat_badan=1.0)
+    good = save(nama_anak='Aiyu', tanggal_lahir=BIRTH, tanggal_pengukuran='2025-02-05', berat_badan=9.1)
+
+    keep, drop = (make_child_key(name, BIRTH, 'P', 'Bentak') for name in ('Ayu', 'Aiyu'))
+    merge_children(keep, drop, 'admin')
+    conn = db.get_connection()
+    rows = conn.execute("SELECT id, berat_badan, child_key FROM measurements "
+                        "WHERE tanggal_pengukuran='2025-02-05'").fetchall()
+    conn.close()
+    assert rows == [(good, 9.1, keep)]
+    # Baris salah ketik disisihkan (bukan dihapus) dan tampil untuk ditinjau admin
+    duplicates = get_duplicate_measurements()
+    assert duplicates[['berat_badan', 'berat_badan_disisihkan']].values.tolist() == [[9.1, 1.0]]
+
+def test_unmerge_restores_names_keys_and_same_date_rows(db_path):
+    save(nama_anak='Ayu', tanggal_lahir=BIRTH, tanggal_pengukuran='2025-01-05', berat_badan=9.0)
+    save(nama_anak='Ayu', tanggal_lahir=BIRTH, tanggal_pengukuran='2025-02-05', berat_badan=9.2)
+    save(nama_anak='Aiyu', tanggal_lahir=BIRTH, tanggal_pengukuran='2025-02-05', berat_badan=9.3)
+    save(nama_anak='Aiyu', tanggal_lahir=BIRTH, tanggal_pengukuran='2025-03-05', berat_badan=9.4)
+    before = measurement_rows()
+
+    keep, drop = (make_child_key(name, BIRTH, 'P', 'Bentak') for name in ('Ayu', 'Aiyu'))
+    merge_children(keep, drop, 'admin')
+    merged = measurement_rows()
+    # Nama asli tiap kunjungan tetap; kunjungan Aiyu 5 Feb disisihkan
+    assert [r[1] for r in merged] == ['Ayu', 'Ayu', 'Aiyu'] and {r[3] for r in merged} == {keep}
+
+    assert unmerge_children(drop) == 1
+    assert measurement_rows() == before and get_duplicate_measurements().empty
+    conn = db.get_connection()
+    assert conn.execute("SELECT COUNT(*) FROM child_aliases").fetchone()[0] == 0
+    conn.close()
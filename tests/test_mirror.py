@@ -0,0 +1,47 @@
+import os
+
+import pytest
+
+pytest.importorskip('pyarrow')
+pytest.importorskip('duckdb')
+
+from krenova_core import mirror  # noqa: E402
+
+from conftest import save  # noqa: E402
+
+def test_refresh_writes_year_partitions_and_query_reads_them(db_path, tmp_path):
+    directory = str(tmp_path / 'analitik')
+    save(tanggal_pengukuran='2024-06-01', usia_bulan=3, tanggal_lahir=None)
+    save(tanggal_pengukuran='2025-03-10')
+    save(nama_anak='Budi', gender='L', tanggal_pengukuran='2025-04-10', tinggi_badan=70.0)
+
+    result = mirror.refresh_mirror(directory)
+    assert result['baris'] == 3 and result['partisi'] == 2
+    status = mirror.mirror_status(directory)
+    assert {p['tahun']: p['baris'] for p in status['partisi']} == {2024: 1, 2025: 2}
+
+    df, truncated = mirror.run_query("SELECT tahun, COUNT(*) AS n FROM measurements GROUP BY tahun ORDER BY tahun",
+                                     directory)
+    assert not truncated and df.to_dict('list') == {'tahun': [2024, 2025], 'n': [1, 2]}
+    # Nama & kunci anak tidak ikut ke cermin; kunjungan anak yang sama tetap satu anak_id
+    df, _ = mirror.run_query("SELECT * FROM measurements", directory)
+    assert 'nama_anak' not in df.columns and 'child_key' not in df.columns
+    assert df['anak_id'].nunique() == 3
+    for sql in mirror.REPORTS.values():
+        mirror.run_query(sql, directory)
+
+def test_refresh_keeps_previous_version_and_query_is_sandboxed(db_path, tmp_path):
+    directory = str(tmp_path / 'analitik')
+    save()
+    first = mirror.refresh_mirror(directory)['versi']
+    save(tanggal_pengukuran='2025-04-10')
+    second = mirror.refresh_mirror(directory)['versi']
+    assert mirror.current_version(directory) == os.path.join(directory, second)
+    assert os.path.isdir(os.path.join(directory, first))
+
+    df, truncated = mirror.run_query("SELECT * FROM measurements", directory, max_rows=1)
+    assert truncated and len(df) == 1
+    with pytest.raises(ValueError):
+        mirror.run_query(f"SELECT * FROM read_csv('{os.path.abspath(db_path)}')", directory)
+    with pytest.raises(ValueError):
+        mirror.run_query("SET threads=64", directory)
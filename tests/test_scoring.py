@@ -0,0 +1,12 @@
+import pandas as pd
+
+from krenova_core.scoring import score_frame
+
+from conftest import measurement
+
+def test_score_frame_fills_missing_age_per_row():
+    rows = [measurement(usia_bulan=12, tanggal_lahir=None), measurement(nama_anak='Budi')]
+    scored = score_frame(pd.DataFrame(rows))
+    assert scored['usia_bulan'].tolist() == [12, 12]
+    alone = score_frame(pd.DataFrame([measurement(nama_anak='Budi')]))
+    assert scored['hfa_zscore'].iloc[1] == alone['hfa_zscore'].iloc[0]
@@ -0,0 +1,44 @@
+import ast
+import os
+import subprocess
+import sys
+
+from krenova_core import startup
+
+from conftest import ROOT
+
+# Modul yang hanya dipakai halaman admin, analitik, atau grid antrian
+FEATURE_MODULES = ['archive', 'charts', 'entry', 'linkage', 'mirror', 'sync']
+
+def test_phase_keeps_the_cold_start_timing(monkeypatch):
+    monkeypatch.setattr(startup, 'PHASES', {})
+    with startup.phase('import contoh'):
+        pass
+    first = startup.PHASES['import contoh']
+    with startup.phase('import contoh'):
+        sum(range(100_000))
+    startup.mark('first_paint')
+    startup.mark('first_paint')
+    assert startup.PHASES['import contoh'] == first
+    assert list(startup.PHASES) == ['import contoh', 'first_paint'] and startup.PHASES['first_paint'] > 0
+
+def test_import_does_not_load_feature_modules_or_reference_tables():
+    code = ('import sys, krenova_core\n'
+            'from krenova_core.reference import load_reference\n'
+            f'print([m for m in {FEATURE_MODULES!r} if "krenova_core." + m in sys.modules])\n'
+            'print(load_reference.cache_info().currsize)\n'
+            'krenova_core.calc_wfa(12, "P", 9.0)\n'
+            'print(load_reference.cache_info().currsize)\n')
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, cwd=ROOT, check=True)
+    # Tabel WHO baru dibaca saat Z-Score pertama dihitung
+    assert result.stdout.split('\n')[:3] == ['[]', '0', '1']
+
+def test_app_imports_feature_modules_inside_their_pages():
+    with open(os.path.join(ROOT, 'krenova.py'), encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    # Import di tingkat modul (termasuk blok `with phase(...)`) berjalan di setiap halaman
+    top_level = [node for stmt in tree.body for node in ast.walk(stmt)
+                 if isinstance(stmt, (ast.Import, ast.ImportFrom, ast.With))
+                 and isinstance(node, ast.ImportFrom)]
+    modules = {node.module for node in top_level}
+    assert not modules & {f'krenova_core.{m}' for m in FEATURE_MODULES}
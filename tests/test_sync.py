@@ -0,0 +1,93 @@
+import pandas as pd
+import pytest
+
+from krenova_core import db, sync
+from krenova_core.scoring import score_measurement
+
+from conftest import save
+
+@pytest.fixture
+def devices(db_path, tmp_path, monkeypatch):
+    """Dua database perangkat ber-jurnal; db.DB_PATH tetap menunjuk ke pusat."""
+    paths = {}
+    for name in ('hp-a', 'hp-b'):
+        path = str(tmp_path / f'{name}.db')
+        monkeypatch.setattr(db, 'DB_PATH', path)
+        db.init_database()
+        sync.init_journal(device=name, db_path=path)
+        paths[name] = path
+    monkeypatch.setattr(db, 'DB_PATH', db_path)
+    return paths
+
+def on_device(monkeypatch, path, fn, *args, **kwargs):
+    central = db.DB_PATH
+    monkeypatch.setattr(db, 'DB_PATH', path)
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        monkeypatch.setattr(db, 'DB_PATH', central)
+
+def push(path):
+    conn = db.get_connection()
+    result = sync.apply_batch(sync.collect_batch(path), conn)
+    conn.close()
+    sync.acknowledge(result, path)
+    return result
+
+def central_rows():
+    conn = db.get_connection()
+    rows = pd.read_sql_query("SELECT uid, berat_badan, revision FROM measurements", conn)
+    conn.close()
+    return rows
+
+def test_same_visit_from_two_devices_maps_uid(devices, monkeypatch):
+    on_device(monkeypatch, devices['hp-a'], save, berat_badan=9.0)
+    on_device(monkeypatch, devices['hp-b'], save, berat_badan=9.0)
+    first = push(devices['hp-a'])
+    second = push(devices['hp-b'])
+
+    central = central_rows()
+    assert len(central) == 1 and second['conflicts'] == []
+    central_uid = central['uid'].iloc[0]
+    assert list(first['revisions']) == [central_uid]
+    assert list(second['uids'].values()) == [central_uid]
+    # Edit berikutnya dari perangkat kedua diterapkan ke baris pusat, bukan ditolak sebagai "dihapus"
+    record_id = on_device(monkeypatch, devices['hp-b'], lambda: int(db.get_all_measurements()['id'].iloc[0]))
+    row = on_device(monkeypatch, devices['hp-b'], db.get_measurement_by_id, record_id)
+    assert row['uid'] == central_uid
+    data = {'date': row['tanggal_pengukuran'], 'name': row['nama_anak'], 'age': row['usia_bulan'],
+            'sex': row['gender'], 'alamat': row['alamat'], 'weight': 9.3, 'height': row['tinggi_badan'],
+            'hc': row['lingkar_kepala'], 'birth_date': row['tanggal_lahir']}
+    on_device(monkeypatch, devices['hp-b'], db.update_measurement, record_id, data, *score_measurement(data))
+    third = push(devices['hp-b'])
+    assert third['conflicts'] == []
+    assert central_rows()[['berat_badan', 'revision']].values.tolist() == [[9.3, 1]]
+
+def test_different_values_from_two_devices_is_conflict(devices, monkeypatch):
+    on_device(monkeypatch, devices['hp-a'], save, berat_badan=9.0)
+    on_device(monkeypatch, devices['hp-b'], save, berat_badan=9.6)
+    push(devices['hp-a'])
+    second = push(devices['hp-b'])
+
+    # Baris pusat tidak ditimpa diam-diam & uid perangkat kedua tidak dilaporkan sebagai revisi 0
+    assert central_rows()[['berat_badan', 'revision']].values.tolist() == [[9.0, 0]]
+    assert len(second['conflicts']) == 1 and second['revisions'] == {} and second['uids'] == {}
+    conflicts = sync.get_sync_conflicts()
+    assert conflicts['device'].tolist() == ['hp-b']
+    assert conflicts['alasan'].iloc[0].startswith("Pengukuran anak ini pada tanggal tersebut")
+
+def test_row_without_age_is_rejected_per_row(devices, monkeypatch):
+    on_device(monkeypatch, devices['hp-a'], save, nama_anak='Ayu')
+    on_device(monkeypatch, devices['hp-a'], save, nama_anak='Budi', gender='L')
+    batch = sync.collect_batch(devices['hp-a'])
+    # Baris dari versi aplikasi lama: usia & tanggal lahir kosong
+    values = batch['changes'][1][4]
+    values[batch['columns'].index('usia_bulan')] = None
+    values[batch['columns'].index('tanggal_lahir')] = None
+
+    conn = db.get_connection()
+    result = sync.apply_batch(batch, conn)
+    conn.close()
+    assert result['applied'] == 1 and result['conflicts'] == [batch['changes'][1][2]]
+    assert central_rows()['uid'].tolist() == [batch['changes'][0][2]]
+    assert sync.get_sync_conflicts()['alasan'].tolist() == ["Usia tidak diketahui (usia bulan & tanggal lahir kosong)"]